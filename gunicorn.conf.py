@@ -0,0 +1,98 @@
+"""
+Gunicorn configuration for the shahin_auto container.
+
+    gunicorn -c gunicorn.conf.py shahin_auto.wsgi:application
+
+Every value can be overridden with the GUNICORN_* environment variables
+below; command line flags take precedence over this file.
+"""
+import math
+import multiprocessing
+import os
+import random
+
+
+def cpu_quota():
+    """
+    CPUs allowed by a CFS quota (``docker run --cpus``), rounded up, or None.
+    Quotas throttle CPU time without changing the affinity mask, so they are
+    read from the cgroup: cpu.max on cgroup v2, cpu.cfs_* files on v1.
+    """
+    try:
+        with open('/sys/fs/cgroup/cpu.max') as f:
+            quota, period = f.read().split()[:2]
+    except (OSError, ValueError):
+        try:
+            with open('/sys/fs/cgroup/cpu/cpu.cfs_quota_us') as f:
+                quota = f.read().strip()
+            with open('/sys/fs/cgroup/cpu/cpu.cfs_period_us') as f:
+                period = f.read().strip()
+        except OSError:
+            return None
+    if quota in ('max', '-1'):
+        return None
+    try:
+        return max(1, math.ceil(int(quota) / int(period)))
+    except (ValueError, ZeroDivisionError):
+        return None
+
+
+# CPUs this process may use: inside a container cpu_count() reports the host's
+# CPUs, while the affinity mask reflects a cpuset and the cgroup a --cpus quota
+if hasattr(os, 'sched_getaffinity'):
+    cpu_count = len(os.sched_getaffinity(0))
+else:
+    cpu_count = multiprocessing.cpu_count()
+cpu_count = min(cpu_count, cpu_quota() or cpu_count)
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+
+# gthread: a few processes, each serving several requests on threads, so a
+# request waiting on MySQL, Redis or S3 no longer blocks a whole process
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+if worker_class == 'sync':
+    default_workers = cpu_count * 2 + 1
+else:
+    default_workers = cpu_count + 1
+workers = int(os.environ.get('GUNICORN_WORKERS', default_workers))
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+
+# Import Django once in the master; workers share its memory copy-on-write
+preload_app = os.environ.get('GUNICORN_PRELOAD', 'True').lower() == 'true'
+
+# Recycle workers regularly so slow leaks can't grow unbounded; the jitter
+# keeps all workers from restarting at the same moment
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', 100))
+
+# A sync worker is silent to the master for a whole request, so its timeout
+# must outlast a dashboard event stream (DASHBOARD_EVENTS_MAX_AGE) or the
+# stream's worker is killed; threaded workers keep heartbeating meanwhile
+if worker_class == 'sync':
+    default_timeout = int(os.environ.get('DASHBOARD_EVENTS_MAX_AGE', 300)) + 30
+else:
+    default_timeout = 120
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', default_timeout))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+# nginx keeps upstream connections open between requests
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+
+accesslog = '-'
+errorlog = '-'
+
+
+def pre_fork(server, worker):
+    # With preload_app the master has imported Django; make sure it holds no
+    # database socket that the new worker would inherit
+    if server.cfg.preload_app:
+        from django.db import connections
+        connections.close_all()
+
+
+def post_fork(server, worker):
+    if server.cfg.preload_app:
+        from django.db import connections
+        connections.close_all()
+    # Forked workers inherit the master's random state; reseed so request
+    # sampling (QUERY_INSPECTION_SAMPLE_RATE) differs between workers
+    random.seed()
@@ -4,13 +4,14 @@ from . import api_views
 urlpatterns = [
     # Lecture API endpoints
     path('lectures/', api_views.LectureListAPIView.as_view(), name='api_lecture_list'),
-    path('lectures/<slug:slug>/', api_views.LectureDetailAPIView.as_view(), name='api_lecture_detail'),
+    # Fixed paths before the slug patterns, which would otherwise match them
     path('lectures/recent/', api_views.recent_lectures_api, name='api_recent_lectures'),
+    path('lectures/<slug:slug>/', api_views.LectureDetailAPIView.as_view(), name='api_lecture_detail'),
     
     # Service API endpoints
     path('services/', api_views.ServiceListAPIView.as_view(), name='api_service_list'),
-    path('services/<slug:slug>/', api_views.ServiceDetailAPIView.as_view(), name='api_service_detail'),
     path('services/all/', api_views.all_services_api, name='api_all_services'),
+    path('services/<slug:slug>/', api_views.ServiceDetailAPIView.as_view(), name='api_service_detail'),
     
     # Site settings API endpoint
     path('settings/', api_views.SiteSettingsAPIView.as_view(), name='api_site_settings'),
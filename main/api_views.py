@@ -1,7 +1,11 @@
+from functools import lru_cache
+
 from rest_framework import generics, status
 from rest_framework.decorators import api_view, permission_classes
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import IsAuthenticated, IsAuthenticatedOrReadOnly
 from rest_framework.response import Response
+from django.http import HttpResponse
 from django.shortcuts import get_object_or_404
 from django.contrib.auth import authenticate
 from django.contrib.auth.models import User
@@ -9,12 +13,72 @@ from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
 import json
 
+from . import catalog, content_cache, metrics
 from .models import Lecture, Service, ContactMessage, SiteSettings, Appointment, AppointmentRequest
 from django.db.models import Q
-from .serializers import LectureSerializer, ServiceSerializer, ContactMessageSerializer, SiteSettingsSerializer, AppointmentSerializer
+from .serializers import (
+    LectureSerializer, LectureListSerializer, ServiceSerializer, ServiceListSerializer,
+    ContactMessageSerializer, SiteSettingsSerializer, AppointmentSerializer, ValuesRenderer,
+)
+
+
+@lru_cache(maxsize=None)
+def _field_names(serializer_class):
+    return frozenset(serializer_class().fields)
+
+
+def requested_fields(request, serializer_class):
+    """
+    ``?fields=id,title`` as a sorted list of distinct field names, or None for
+    all of them. Output follows the serializer's field order either way, so
+    the sorted list doubles as a canonical cache key part.
+    """
+    raw = request.query_params.get('fields')
+    if not raw:
+        return None
+    fields = sorted({name.strip() for name in raw.split(',') if name.strip()})
+    unknown = [name for name in fields if name not in _field_names(serializer_class)]
+    if unknown:
+        raise ValidationError({'fields': [f'فیلد نامعتبر: {name}' for name in unknown]})
+    return fields
+
+
+class SparseFieldsViewMixin:
+    """``?fields=`` narrows both the serializer and, for reads, the SELECT"""
+
+    def selected_fields(self):
+        if self.request.method != 'GET':
+            return None
+        if not hasattr(self, '_selected_fields'):
+            self._selected_fields = requested_fields(self.request, self.get_serializer_class())
+        return self._selected_fields
+
+    def get_serializer(self, *args, **kwargs):
+        kwargs.setdefault('fields', self.selected_fields())
+        return super().get_serializer(*args, **kwargs)
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        fields = self.selected_fields()
+        if fields is not None:
+            columns = self.get_serializer_class()(fields=fields).columns()
+            queryset = queryset.only(*(c for c in columns if c not in queryset.query.annotations))
+        return queryset
 
 
-class LectureListAPIView(generics.ListCreateAPIView):
+class ValuesListMixin(SparseFieldsViewMixin):
+    """List GETs rendered from ``.values()`` rows by ValuesRenderer"""
+
+    def list(self, request, *args, **kwargs):
+        renderer = ValuesRenderer(self.get_serializer_class(), self.selected_fields(), request)
+        queryset = renderer.values(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(renderer.render(page))
+        return Response(renderer.render(queryset))
+
+
+class LectureListAPIView(ValuesListMixin, generics.ListCreateAPIView):
     """API view for listing and creating lectures"""
     queryset = Lecture.objects.filter(is_published=True)
     serializer_class = LectureSerializer
@@ -30,7 +94,7 @@ class LectureListAPIView(generics.ListCreateAPIView):
         return queryset.order_by('-created_at')
 
 
-class LectureDetailAPIView(generics.RetrieveUpdateDestroyAPIView):
+class LectureDetailAPIView(SparseFieldsViewMixin, generics.RetrieveUpdateDestroyAPIView):
     """API view for retrieving, updating and deleting individual lectures"""
     queryset = Lecture.objects.all()
     serializer_class = LectureSerializer
@@ -38,7 +102,7 @@ class LectureDetailAPIView(generics.RetrieveUpdateDestroyAPIView):
     permission_classes = [IsAuthenticatedOrReadOnly]
 
 
-class ServiceListAPIView(generics.ListCreateAPIView):
+class ServiceListAPIView(ValuesListMixin, generics.ListCreateAPIView):
     """API view for listing and creating services"""
     queryset = Service.objects.filter(is_published=True)
     serializer_class = ServiceSerializer
@@ -54,7 +118,7 @@ class ServiceListAPIView(generics.ListCreateAPIView):
         return queryset.order_by('-created_at')
 
 
-class ServiceDetailAPIView(generics.RetrieveUpdateDestroyAPIView):
+class ServiceDetailAPIView(SparseFieldsViewMixin, generics.RetrieveUpdateDestroyAPIView):
     """API view for retrieving, updating and deleting individual services"""
     queryset = Service.objects.all()
     serializer_class = ServiceSerializer
@@ -80,24 +144,36 @@ def contact_form_api(request):
     serializer = ContactMessageSerializer(data=request.data)
     if serializer.is_valid():
         serializer.save()
+        metrics.record_form_submission('contact', 'accepted')
         return Response({'success': True, 'message': 'پیام شما با موفقیت ارسال شد'}, status=status.HTTP_201_CREATED)
+    metrics.record_form_submission('contact', 'invalid')
     return Response({'success': False, 'errors': serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
 
 
 @api_view(['GET'])
 def recent_lectures_api(request):
-    """API endpoint for getting recent lectures"""
-    lectures = Lecture.objects.filter(is_published=True)[:3]
-    serializer = LectureSerializer(lectures, many=True)
-    return Response(serializer.data)
+    """API endpoint for getting recent lectures, served from the content cache"""
+    fields = requested_fields(request, LectureListSerializer)
+
+    def build():
+        renderer = ValuesRenderer(LectureListSerializer, fields)
+        return renderer.render(renderer.values(Lecture.objects.listing().filter(is_published=True))[:3])
+
+    body = content_cache.get_or_build_json('recent_lectures', ['main.Lecture'], build, ','.join(fields or ['*']))
+    return HttpResponse(body, content_type='application/json')
 
 
 @api_view(['GET'])
 def all_services_api(request):
-    """API endpoint for getting all services"""
-    services = Service.objects.filter(is_published=True)
-    serializer = ServiceSerializer(services, many=True)
-    return Response(serializer.data)
+    """API endpoint for getting all services, served from the content cache"""
+    fields = requested_fields(request, ServiceListSerializer)
+
+    def build():
+        renderer = ValuesRenderer(ServiceListSerializer, fields)
+        return renderer.render(renderer.values(Service.objects.listing().filter(is_published=True)))
+
+    body = content_cache.get_or_build_json('all_services', ['main.Service'], build, ','.join(fields or ['*']))
+    return HttpResponse(body, content_type='application/json')
 
 
 @api_view(['POST'])
@@ -118,12 +194,14 @@ def appointment_form_api(request):
             message=data.get('message', '')
         )
         
+        metrics.record_form_submission('appointment_request', 'accepted')
         return Response({
             'success': True, 
             'message': 'درخواست رزرو شما با موفقیت ثبت شد. در اولین فرصت با شما تماس خواهیم گرفت.'
         }, status=status.HTTP_201_CREATED)
         
     except Exception as e:
+        metrics.record_form_submission('appointment_request', 'error')
         return Response({
             'success': False, 
             'message': 'خطا در ثبت درخواست. لطفاً دوباره تلاش کنید.'
@@ -141,15 +219,16 @@ def appointment_booking_api(request):
         required_fields = ['name', 'phone', 'service_id', 'appointment_date', 'appointment_time', 'car_model']
         for field in required_fields:
             if not data.get(field):
+                metrics.record_form_submission('booking', 'invalid')
                 return Response({
                     'success': False,
                     'message': f'فیلد {field} الزامی است'
                 }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Get service
-        try:
-            service = Service.objects.get(id=data['service_id'])
-        except Service.DoesNotExist:
+        # Get service from the cached catalog of bookable services
+        service = catalog.get_bookable(data['service_id'])
+        if service is None:
+            metrics.record_form_submission('booking', 'invalid')
             return Response({
                 'success': False,
                 'message': 'سرویس انتخاب شده یافت نشد'
@@ -160,24 +239,27 @@ def appointment_booking_api(request):
             name=data['name'],
             phone=data['phone'],
             email=data.get('email', ''),
-            service=service,
+            # Only the pk is saved; the name is there for the dashboard event
+            service=Service(id=service['id'], name=service['name']),
             car_model=data['car_model'],
             car_year=data.get('car_year', ''),
             car_plate=data.get('car_plate', ''),
             appointment_date=data['appointment_date'],
             appointment_time=data['appointment_time'],
             message=data.get('message', ''),
-            estimated_duration=service.duration or '',
-            estimated_price=service.min_price
+            estimated_duration=service['duration'] or '',
+            estimated_price=service['min_price']
         )
         
+        metrics.record_form_submission('booking', 'accepted')
         return Response({
             'success': True,
-            'message': f'نوبت شما برای {service.name} در تاریخ {data["appointment_date"]} ساعت {data["appointment_time"]} با موفقیت ثبت شد. در اولین فرصت با شما تماس خواهیم گرفت.',
+            'message': f'نوبت شما برای {service["name"]} در تاریخ {data["appointment_date"]} ساعت {data["appointment_time"]} با موفقیت ثبت شد. در اولین فرصت با شما تماس خواهیم گرفت.',
             'appointment_id': appointment.id
         }, status=status.HTTP_201_CREATED)
         
     except Exception as e:
+        metrics.record_form_submission('booking', 'error')
         return Response({
             'success': False,
             'message': 'خطا در ثبت نوبت. لطفاً دوباره تلاش کنید.'
@@ -190,6 +272,6 @@ def appointments_list_api(request):
     if not request.user.is_authenticated or not request.user.is_staff:
         return Response({'success': False, 'message': 'دسترسی غیرمجاز'}, status=status.HTTP_403_FORBIDDEN)
     
-    appointments = Appointment.objects.all().order_by('-created_at')
+    appointments = Appointment.objects.select_related('service').order_by('-created_at')
     serializer = AppointmentSerializer(appointments, many=True)
     return Response(serializer.data)
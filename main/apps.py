@@ -1,6 +1,14 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
 
 
 class MainConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'main'
\ No newline at end of file
+    name = 'main'
+
+    def ready(self):
+        from . import content_cache, events
+        from .instrumentation import install_query_hook
+        connection_created.connect(install_query_hook, dispatch_uid='main.install_query_hook')
+        events.connect()
+        content_cache.connect()
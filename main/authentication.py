@@ -0,0 +1,18 @@
+from django.conf import settings
+from rest_framework.authentication import SessionAuthentication
+
+
+class SessionCookieAuthentication(SessionAuthentication):
+    """
+    Session authentication that leaves the session alone for visitors without
+    a session cookie.
+
+    DRF authenticates every request up front, and loading the session for an
+    anonymous visitor makes SessionMiddleware add ``Vary: Cookie`` to public
+    API responses. Without a cookie there is no session to find anyway.
+    """
+
+    def authenticate(self, request):
+        if settings.SESSION_COOKIE_NAME not in request.COOKIES:
+            return None
+        return super().authenticate(request)
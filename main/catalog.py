@@ -0,0 +1,44 @@
+"""
+The catalog of bookable services: the few fields the appointment page and
+booking API need, built with one query per content version and shared by
+both, so validating a booking needs no service lookup.
+"""
+from . import content_cache
+from .models import Service
+from .serializers import format_price_range
+
+
+def _build():
+    rows = (
+        Service.objects.listing()
+        .filter(is_published=True)
+        .values('id', 'name', 'image', 'excerpt', 'duration', 'min_price', 'max_price', 'category__name')
+    )
+    storage = Service._meta.get_field('image').storage
+    return {
+        row['id']: {
+            'id': row['id'],
+            'name': row['name'],
+            'image': storage.url(row['image']) if row['image'] else None,
+            'excerpt': row['excerpt'],
+            'duration': row['duration'],
+            'min_price': row['min_price'],
+            'max_price': row['max_price'],
+            'price_range': format_price_range(row['min_price'], row['max_price']),
+            'category': row['category__name'],
+        }
+        for row in rows
+    }
+
+
+def bookable_services():
+    """Published services by id, in listing order"""
+    return content_cache.get_or_build('bookable_services', ['main.Service', 'main.ServiceCategory'], _build)
+
+
+def get_bookable(service_id):
+    """The catalog entry for ``service_id`` as sent by a client, or None"""
+    try:
+        return bookable_services().get(int(service_id))
+    except (TypeError, ValueError):
+        return None
@@ -0,0 +1,78 @@
+"""
+Versioned cache for data derived from site content.
+
+Every cached model has a version number in the default cache (Redis in
+production). Saving or deleting a row bumps its model's version once the
+transaction commits, so keys built from the old version are simply never
+read again and expire after CONTENT_CACHE_SECONDS. Nothing has to know
+which keys a change affects.
+"""
+import time
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+
+from .fast_json import ORJSONRenderer
+
+
+# Models whose changes invalidate cached content
+MODELS = ['main.Lecture', 'main.Service', 'main.ServiceCategory']
+
+
+def _version_key(label):
+    return f'content:version:{label}'
+
+
+def versions(*labels):
+    """Current version of each model label, as one string for cache keys"""
+    keys = [_version_key(label) for label in labels]
+    found = cache.get_many(keys)
+    for key in keys:
+        if key not in found:
+            # Start from the clock, not 1, so an evicted version can't come
+            # back to a number that old entries were cached under
+            cache.add(key, time.time_ns(), None)
+            found[key] = cache.get(key)
+    return '.'.join(str(found[key]) for key in keys)
+
+
+def bump(label):
+    try:
+        cache.incr(_version_key(label))
+    except ValueError:
+        cache.set(_version_key(label), time.time_ns(), None)
+
+
+def get_or_build(name, labels, build, *parts):
+    """
+    ``build()`` cached under the current versions of ``labels``; ``parts``
+    distinguish variants such as a ``?fields=`` selection.
+    """
+    key = ':'.join(['content', name, versions(*labels), *map(str, parts)])
+    value = cache.get(key)
+    if value is None:
+        value = build()
+        cache.set(key, value, settings.CONTENT_CACHE_SECONDS)
+    return value
+
+
+def get_or_build_json(name, labels, build, *parts):
+    """Like get_or_build, but caches the rendered JSON bytes of ``build()``"""
+    return get_or_build(name, labels, lambda: ORJSONRenderer().render(build()), *parts)
+
+
+def content_changed(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    transaction.on_commit(partial(bump, sender._meta.label), using=instance._state.db)
+
+
+def connect():
+    from django.apps import apps
+    for label in MODELS:
+        model = apps.get_model(label)
+        post_save.connect(content_changed, sender=model, dispatch_uid=f'content_cache.save.{label}')
+        post_delete.connect(content_changed, sender=model, dispatch_uid=f'content_cache.delete.{label}')
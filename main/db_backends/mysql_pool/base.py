@@ -0,0 +1,164 @@
+"""
+MySQL backend that borrows connections from an in-process pool.
+
+Use it with CONN_MAX_AGE = 0: Django still "closes" the connection at the end
+of every request, but the socket goes back to the pool instead of being torn
+down, so the next request on any thread of the worker skips the TCP and
+authentication handshake. Pool settings are read from the database entry:
+
+    POOL_SIZE     maximum connections per worker process (default 5)
+    POOL_RECYCLE  seconds after which a connection is replaced (default 1800)
+    POOL_TIMEOUT  seconds to wait for a free connection (default 10)
+"""
+import os
+import threading
+import time
+
+from django.db import DatabaseError
+from django.db.backends.mysql import base as mysql
+
+
+class PoolTimeout(DatabaseError):
+    pass
+
+
+class ConnectionPool:
+    """Thread-safe LIFO pool of DB-API connections created by ``connect``"""
+
+    def __init__(self, connect, size=5, recycle=1800, timeout=10, ping=True):
+        self.connect = connect
+        self.size = size
+        self.recycle = recycle
+        self.timeout = timeout
+        self.ping = ping
+        self.pid = os.getpid()
+        self.idle = []
+        self.created_at = {}
+        self.total = 0
+        self.condition = threading.Condition()
+
+    def acquire(self):
+        """Return ``(connection, reused)``, waiting up to ``timeout`` for a free slot"""
+        deadline = time.monotonic() + self.timeout
+        while True:
+            with self.condition:
+                conn = self._take_idle()
+                if conn is None:
+                    if self.total < self.size:
+                        self.total += 1
+                    else:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            raise PoolTimeout(f'No database connection available within {self.timeout}s')
+                        self.condition.wait(remaining)
+                        continue
+            if conn is None:
+                return self._create(), False
+            if self._alive(conn):
+                return conn, True
+            self.discard(conn)
+
+    def release(self, conn):
+        with self.condition:
+            created_at = self.created_at.get(id(conn))
+            if created_at is not None and time.monotonic() - created_at < self.recycle:
+                self.idle.append(conn)
+                self.condition.notify()
+                return
+        self.discard(conn)
+
+    def discard(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+        with self.condition:
+            if self.created_at.pop(id(conn), None) is not None:
+                self.total -= 1
+            self.condition.notify()
+
+    def _take_idle(self):
+        while self.idle:
+            conn = self.idle.pop()
+            if time.monotonic() - self.created_at[id(conn)] < self.recycle:
+                return conn
+            try:
+                conn.close()
+            except Exception:
+                pass
+            del self.created_at[id(conn)]
+            self.total -= 1
+        return None
+
+    def _create(self):
+        try:
+            conn = self.connect()
+        except Exception:
+            with self.condition:
+                self.total -= 1
+                self.condition.notify()
+            raise
+        with self.condition:
+            self.created_at[id(conn)] = time.monotonic()
+        return conn
+
+    def _alive(self, conn):
+        if not self.ping:
+            return True
+        try:
+            conn.ping(reconnect=False)
+        except Exception:
+            return False
+        return True
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class DatabaseWrapper(mysql.DatabaseWrapper):
+    """MySQL wrapper whose connections are pooled per worker process"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._reused = False
+
+    def get_pool(self, conn_params):
+        settings_dict = self.settings_dict
+        key = (self.alias, settings_dict['HOST'], settings_dict['PORT'], settings_dict['USER'], settings_dict['NAME'])
+        with _pools_lock:
+            pool = _pools.get(key)
+            # After a fork the parent's sockets must not be shared
+            if pool is None or pool.pid != os.getpid():
+                pool = _pools[key] = ConnectionPool(
+                    lambda: super(DatabaseWrapper, self).get_new_connection(conn_params),
+                    size=settings_dict.get('POOL_SIZE', 5),
+                    recycle=settings_dict.get('POOL_RECYCLE', 1800),
+                    timeout=settings_dict.get('POOL_TIMEOUT', 10),
+                    ping=settings_dict.get('CONN_HEALTH_CHECKS', True),
+                )
+            return pool
+
+    def get_new_connection(self, conn_params):
+        connection, self._reused = self.get_pool(conn_params).acquire()
+        return connection
+
+    def init_connection_state(self):
+        # Session variables set on first use survive in the pool
+        if not self._reused:
+            super().init_connection_state()
+
+    def _close(self):
+        if self.connection is None:
+            return
+        pool = self.get_pool(self.get_connection_params())
+        if self.errors_occurred and not self.is_usable():
+            pool.discard(self.connection)
+            return
+        if self.in_atomic_block or not self.get_autocommit():
+            try:
+                self.connection.rollback()
+            except Exception:
+                pool.discard(self.connection)
+                return
+        pool.release(self.connection)
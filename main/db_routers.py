@@ -0,0 +1,61 @@
+"""
+Read-replica routing.
+
+ReplicaRoutingMiddleware decides per request whether reads may go to the
+READ_REPLICA alias: only GET/HEAD requests outside REPLICA_PRIMARY_PATHS from
+clients that have not written recently. ReplicaRouter then sends reads there
+until the first write of the request, after which reads and writes both use
+the primary. Outside a request (shell, management commands) everything uses
+the primary.
+"""
+import contextvars
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+
+class RoutingState:
+    """Whether the current request may read from the replica, and whether it has written"""
+    __slots__ = ('replica', 'wrote')
+
+    def __init__(self, replica):
+        self.replica = replica
+        self.wrote = False
+
+
+_current_state = contextvars.ContextVar('replica_routing', default=None)
+
+
+def activate(state):
+    return _current_state.set(state)
+
+
+def deactivate(token):
+    _current_state.reset(token)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = _current_state.get()
+        if state is None:
+            return None
+        if state.replica and not state.wrote:
+            return getattr(settings, 'READ_REPLICA', None)
+        # Explicit, so instances loaded from the replica don't pull reads back to it
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        state = _current_state.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica holds the same rows as the primary
+        aliases = {DEFAULT_DB_ALIAS, getattr(settings, 'READ_REPLICA', None)}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return None
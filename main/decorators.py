@@ -0,0 +1,37 @@
+"""
+View decorators for coroutine views.
+
+Django 4.2's csrf_exempt and require_http_methods wrap views in a plain
+function, which makes Django treat an ``async def`` view as sync and run it
+in a thread. These keep the view a coroutine function.
+"""
+from functools import wraps
+
+from django.http import HttpResponseNotAllowed
+from django.utils.log import log_response
+
+
+def async_csrf_exempt(view_func):
+    view_func.csrf_exempt = True
+    return view_func
+
+
+def async_require_http_methods(request_method_list):
+    def decorator(func):
+        @wraps(func)
+        async def inner(request, *args, **kwargs):
+            if request.method not in request_method_list:
+                response = HttpResponseNotAllowed(request_method_list)
+                log_response(
+                    'Method Not Allowed (%s): %s',
+                    request.method,
+                    request.path,
+                    response=response,
+                    request=request,
+                )
+                return response
+            return await func(request, *args, **kwargs)
+
+        return inner
+
+    return decorator
@@ -0,0 +1,34 @@
+from django.conf import settings
+from django.core.mail import get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+
+from . import metrics
+
+
+class MetricsEmailBackend(BaseEmailBackend):
+    """Delivers through EMAIL_DELIVERY_BACKEND and counts sent and failed emails"""
+
+    def __init__(self, fail_silently=False, **kwargs):
+        super().__init__(fail_silently=fail_silently)
+        self.backend = get_connection(
+            getattr(settings, 'EMAIL_DELIVERY_BACKEND', 'django.core.mail.backends.smtp.EmailBackend'),
+            fail_silently=fail_silently,
+            **kwargs,
+        )
+
+    def open(self):
+        return self.backend.open()
+
+    def close(self):
+        return self.backend.close()
+
+    def send_messages(self, email_messages):
+        email_messages = list(email_messages)
+        try:
+            sent = self.backend.send_messages(email_messages) or 0
+        except Exception:
+            metrics.record_emails('failed', len(email_messages))
+            raise
+        metrics.record_emails('sent', sent)
+        metrics.record_emails('failed', len(email_messages) - sent)
+        return sent
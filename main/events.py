@@ -0,0 +1,283 @@
+"""
+Live events for the staff dashboard, delivered over server-sent events.
+
+New contact messages, appointment requests, bookings and comments awaiting
+moderation are published once their transaction commits. Each open dashboard
+holds one subscription. The broker is selected by DASHBOARD_EVENTS_BACKEND:
+
+    memory     in this process only (development and tests)
+    redis      Redis pub/sub on DASHBOARD_EVENTS_CHANNEL, shared by all workers
+
+Subscriptions come in a sync flavour for WSGI workers, where the stream
+holds a thread, and an async flavour for ASGI workers, where it does not.
+Publishing never raises; a broken broker only costs the lost events.
+"""
+import asyncio
+import json
+import logging
+import queue
+import threading
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.urls import reverse
+
+
+logger = logging.getLogger(__name__)
+
+# Cache key of the dashboard counters; every committed event invalidates it
+DASHBOARD_COUNTERS_KEY = 'admin_dashboard:counters'
+
+
+class MemoryBroker:
+    """Fan-out to the subscriptions of this process"""
+
+    def __init__(self):
+        self.subscriptions = set()
+        self.lock = threading.Lock()
+
+    def publish(self, event):
+        with self.lock:
+            subscriptions = list(self.subscriptions)
+        for subscription in subscriptions:
+            subscription.put(event)
+
+    def subscribe(self):
+        return _MemorySubscription(self, queue.Queue())
+
+    async def asubscribe(self):
+        return _AsyncMemorySubscription(self, asyncio.Queue(), asyncio.get_running_loop())
+
+    def add(self, subscription):
+        with self.lock:
+            self.subscriptions.add(subscription)
+
+    def remove(self, subscription):
+        with self.lock:
+            self.subscriptions.discard(subscription)
+
+
+class _MemorySubscription:
+    def __init__(self, broker, events):
+        self.broker = broker
+        self.events = events
+        broker.add(self)
+
+    def put(self, event):
+        self.events.put(event)
+
+    def get(self, timeout):
+        """The next event, or None when nothing arrived within ``timeout`` seconds"""
+        try:
+            return self.events.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self.broker.remove(self)
+
+
+class _AsyncMemorySubscription(_MemorySubscription):
+    def __init__(self, broker, events, loop):
+        self.loop = loop
+        super().__init__(broker, events)
+
+    def put(self, event):
+        # Publishers run on request threads, not on the subscriber's loop
+        try:
+            self.loop.call_soon_threadsafe(self.events.put_nowait, event)
+        except RuntimeError:
+            # The subscriber's loop has closed
+            self.broker.remove(self)
+
+    async def get(self, timeout):
+        try:
+            return await asyncio.wait_for(self.events.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    async def close(self):
+        super().close()
+
+
+class RedisBroker:
+    """Redis pub/sub, so an event published by one worker reaches them all"""
+
+    def __init__(self, url, channel):
+        import redis
+        self.url = url
+        self.channel = channel
+        self.client = redis.Redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+
+    def publish(self, event):
+        self.client.publish(self.channel, json.dumps(event, cls=DjangoJSONEncoder))
+
+    def subscribe(self):
+        pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(self.channel)
+        return _RedisSubscription(pubsub)
+
+    async def asubscribe(self):
+        import redis.asyncio
+        client = redis.asyncio.Redis.from_url(self.url)
+        pubsub = client.pubsub(ignore_subscribe_messages=True)
+        await pubsub.subscribe(self.channel)
+        return _AsyncRedisSubscription(client, pubsub)
+
+
+class _RedisSubscription:
+    def __init__(self, pubsub):
+        self.pubsub = pubsub
+
+    def get(self, timeout):
+        message = self.pubsub.get_message(timeout=timeout)
+        return json.loads(message['data']) if message else None
+
+    def close(self):
+        self.pubsub.close()
+
+
+class _AsyncRedisSubscription:
+    def __init__(self, client, pubsub):
+        self.client = client
+        self.pubsub = pubsub
+
+    async def get(self, timeout):
+        message = await self.pubsub.get_message(timeout=timeout)
+        return json.loads(message['data']) if message else None
+
+    async def close(self):
+        await self.pubsub.aclose()
+        await self.client.aclose()
+
+
+_broker = None
+_broker_config = None
+
+
+def get_broker():
+    """The configured broker, created once per process and settings combination"""
+    global _broker, _broker_config
+    config = (
+        getattr(settings, 'DASHBOARD_EVENTS_BACKEND', 'memory'),
+        getattr(settings, 'DASHBOARD_EVENTS_REDIS_URL', None),
+        getattr(settings, 'DASHBOARD_EVENTS_CHANNEL', 'shahin:dashboard'),
+    )
+    if _broker is None or config != _broker_config:
+        backend, redis_url, channel = config
+        if backend == 'redis':
+            _broker = RedisBroker(redis_url, channel)
+        else:
+            _broker = MemoryBroker()
+        _broker_config = config
+    return _broker
+
+
+def publish(event):
+    try:
+        get_broker().publish(event)
+    except Exception:
+        logger.warning('Failed to publish dashboard event %s', event.get('type'), exc_info=True)
+
+
+def sse_message(event):
+    """One server-sent event frame"""
+    data = json.dumps(event, cls=DjangoJSONEncoder, ensure_ascii=False)
+    return f"id: {event['type']}-{event['id']}\nevent: {event['type']}\ndata: {data}\n\n"
+
+
+def _truncate(text, length=120):
+    text = text or ''
+    return text if len(text) <= length else text[:length - 1] + '…'
+
+
+def _admin_url(instance):
+    opts = instance._meta
+    return reverse(f'admin:{opts.app_label}_{opts.model_name}_change', args=[instance.pk])
+
+
+def contact_message_event(instance):
+    return {
+        'name': instance.name,
+        'email': instance.email,
+        'message': _truncate(instance.message),
+    }
+
+
+def appointment_request_event(instance):
+    return {
+        'name': instance.name,
+        'phone': instance.phone,
+        'service': instance.service,
+        'car_model': instance.car_model,
+        'preferred_date': instance.preferred_date,
+    }
+
+
+def appointment_event(instance):
+    # Bookings are created with the Service in hand; don't query for its name
+    service_field = instance._meta.get_field('service')
+    return {
+        'name': instance.name,
+        'phone': instance.phone,
+        'service': instance.service.name if service_field.is_cached(instance) else None,
+        'car_model': instance.car_model,
+        'appointment_date': instance.appointment_date,
+        'appointment_time': instance.appointment_time,
+    }
+
+
+def comment_event(instance):
+    if instance.is_approved:
+        return None
+    return {
+        'name': instance.name,
+        'rating': instance.rating,
+        'comment': _truncate(instance.comment),
+    }
+
+
+# Model label -> (event type, payload builder returning None to skip)
+EVENTS = {
+    'main.ContactMessage': ('contact_message', contact_message_event),
+    'main.AppointmentRequest': ('appointment_request', appointment_request_event),
+    'main.Appointment': ('appointment', appointment_event),
+    'main.Comment': ('comment', comment_event),
+}
+
+
+def announce(event):
+    """Drop the cached dashboard counters the new row changes, then publish ``event``"""
+    try:
+        cache.delete(DASHBOARD_COUNTERS_KEY)
+    except Exception:
+        logger.warning('Failed to invalidate the dashboard counters', exc_info=True)
+    publish(event)
+
+
+def publish_created(sender, instance, created, raw=False, **kwargs):
+    if not created or raw:
+        return
+    event_type, build = EVENTS[sender._meta.label]
+    payload = build(instance)
+    if payload is None:
+        return
+    event = {
+        'type': event_type,
+        'id': instance.pk,
+        'created_at': instance.created_at,
+        'admin_url': _admin_url(instance),
+        **payload,
+    }
+    # Only announce rows that other connections can actually read
+    transaction.on_commit(partial(announce, event), using=instance._state.db)
+
+
+def connect():
+    from django.apps import apps
+    for label in EVENTS:
+        post_save.connect(publish_created, sender=apps.get_model(label), dispatch_uid=f'events.{label}')
@@ -0,0 +1,217 @@
+"""
+Faceted filtering for the services page.
+
+Published services are counted once per content version with a single
+GROUP BY over (category, featured, price band, duration band). Every facet
+count for any combination of selected filters is then summed from those few
+rows in Python, and the total of the current selection doubles as the
+paginator's count. Filtering itself goes through the composite
+``(is_published, ...)`` indexes on Service.
+
+A search term (``q``) or explicit ``min_price``/``max_price`` bounds narrow
+the set being counted, so they cannot come from the cached rows; with any of
+them the GROUP BY runs over the narrowed services instead, uncached.
+"""
+from collections import Counter
+
+from django.core.paginator import Paginator
+from django.db.models import Case, CharField, Count, Q, Value, When
+
+from . import content_cache
+from .models import PERSIAN_DIGITS, Service
+
+
+# (key, label, lower bound inclusive, upper bound exclusive) on Service.min_price, in toman
+PRICE_BANDS = [
+    ('under-500k', 'کمتر از ۵۰۰ هزار تومان', None, 500000),
+    ('500k-1m', '۵۰۰ هزار تا ۱ میلیون تومان', 500000, 1000000),
+    ('1m-2m', '۱ تا ۲ میلیون تومان', 1000000, 2000000),
+    ('over-2m', '۲ میلیون تومان و بیشتر', 2000000, None),
+]
+# The same on Service.duration_minutes
+DURATION_BANDS = [
+    ('under-1h', 'کمتر از یک ساعت', None, 60),
+    ('1h-3h', 'یک تا سه ساعت', 60, 180),
+    ('over-3h', 'سه ساعت و بیشتر', 180, None),
+]
+BANDS = {'price': ('min_price', PRICE_BANDS), 'duration': ('duration_minutes', DURATION_BANDS)}
+FACETS = ['category', 'featured', 'price', 'duration']
+# Filters applied before counting rather than summed from the counted rows
+NARROWING = ['q', 'min_price', 'max_price']
+# ?sort= value -> ordering; 'new' is the default
+SORTS = {
+    'new': ['-created_at'],
+    'az': ['name'],
+    'featured': ['-is_featured', '-created_at'],
+}
+
+
+def _band_filter(field, low, high):
+    lookups = {}
+    if low is not None:
+        lookups[f'{field}__gte'] = low
+    if high is not None:
+        lookups[f'{field}__lt'] = high
+    return Q(**lookups)
+
+
+def _band_case(field, bands):
+    return Case(
+        *[When(_band_filter(field, low, high), then=Value(key)) for key, _label, low, high in bands],
+        default=Value(''),
+        output_field=CharField(),
+    )
+
+
+def _build_counts(queryset=None):
+    if queryset is None:
+        queryset = Service.objects.filter(is_published=True)
+    rows = (
+        queryset
+        .order_by()
+        .values(
+            'category_id', 'category__slug', 'category__name', 'category__is_active', 'is_featured',
+            price_band=_band_case('min_price', PRICE_BANDS),
+            duration_band=_band_case('duration_minutes', DURATION_BANDS),
+        )
+        .annotate(count=Count('pk'))
+    )
+    # A service without a price or parsed duration matches no band: ''
+    return [
+        {
+            'category_id': row['category_id'],
+            'category': row['category__slug'],
+            'category_name': row['category__name'],
+            'category_active': row['category__is_active'],
+            'featured': row['is_featured'],
+            'price': row['price_band'],
+            'duration': row['duration_band'],
+            'count': row['count'],
+        }
+        for row in rows
+    ]
+
+
+def counts(selected=None):
+    """
+    The grouped counts of published services, cached per content version; or
+    of those matching the narrowing filters in ``selected``, uncached
+    """
+    if selected and any(name in selected for name in NARROWING):
+        return _build_counts(narrow(Service.objects.filter(is_published=True), selected))
+    return content_cache.get_or_build('service_facets', ['main.Service', 'main.ServiceCategory'], _build_counts)
+
+
+def _price(value):
+    value = (value or '').strip().translate(PERSIAN_DIGITS).replace(',', '')
+    return int(value) if value.isdigit() else None
+
+
+def selected_filters(params):
+    """The recognised filter values in ``params`` (request.GET); anything else is ignored"""
+    selected = {}
+    q = (params.get('q') or '').strip()[:100]
+    if q:
+        selected['q'] = q
+    for name in ('min_price', 'max_price'):
+        value = _price(params.get(name))
+        if value is not None:
+            selected[name] = value
+    if params.get('category'):
+        selected['category'] = params['category']
+    if params.get('featured') == 'true':
+        selected['featured'] = True
+    for name, (_field, bands) in BANDS.items():
+        if params.get(name) in {band[0] for band in bands}:
+            selected[name] = params[name]
+    return selected
+
+
+def sort_order(params):
+    """The ordering for ``params['sort']``, newest first when it is missing or unknown"""
+    return SORTS.get(params.get('sort'), SORTS['new'])
+
+
+def _matches(row, selected, skip=None):
+    return all(row[name] == value for name, value in selected.items() if name in FACETS and name != skip)
+
+
+def narrow(queryset, selected):
+    """``queryset`` limited by the search term and price bounds in ``selected``"""
+    if 'q' in selected:
+        queryset = queryset.filter(Q(name__icontains=selected['q']) | Q(description__icontains=selected['q']))
+    # Bounds on the starting price, like the price bands
+    if 'min_price' in selected:
+        queryset = queryset.filter(min_price__gte=selected['min_price'])
+    if 'max_price' in selected:
+        queryset = queryset.filter(min_price__lte=selected['max_price'])
+    return queryset
+
+
+def filter_services(queryset, selected, rows):
+    """``queryset`` narrowed to ``selected``, matching the category by id rather than joining it"""
+    queryset = narrow(queryset, selected)
+    if 'category' in selected:
+        category_id = next((row['category_id'] for row in rows if row['category'] == selected['category']), None)
+        if category_id is None:
+            return queryset.none()
+        queryset = queryset.filter(category_id=category_id)
+    if selected.get('featured'):
+        queryset = queryset.filter(is_featured=True)
+    for name, (field, bands) in BANDS.items():
+        if name in selected:
+            _key, _label, low, high = next(band for band in bands if band[0] == selected[name])
+            queryset = queryset.filter(_band_filter(field, low, high))
+    return queryset
+
+
+def facet_counts(rows, selected):
+    """
+    For every facet, the number of services each of its values would show
+    with the other selected filters applied; and the total for the whole
+    selection
+    """
+    result = {name: Counter() for name in FACETS}
+    total = 0
+    for row in rows:
+        for name in FACETS:
+            if _matches(row, selected, skip=name):
+                result[name][row[name]] += row['count']
+        if _matches(row, selected):
+            total += row['count']
+    return result, total
+
+
+def facet_options(rows, selected):
+    """Template-ready facets: a list of ``{value, label, count, selected}`` per facet"""
+    by_facet, total = facet_counts(rows, selected)
+    categories = sorted(
+        {(row['category'], row['category_name']) for row in rows if row['category'] and row['category_active']},
+        key=lambda category: category[1],
+    )
+
+    def options(name, values):
+        return [
+            {'value': value, 'label': label, 'count': by_facet[name][value], 'selected': selected.get(name) == value}
+            for value, label in values
+        ]
+
+    return {
+        'category': options('category', categories),
+        'price': options('price', [(key, label) for key, label, *_ in PRICE_BANDS]),
+        'duration': options('duration', [(key, label) for key, label, *_ in DURATION_BANDS]),
+        'featured': by_facet['featured'][True],
+        'total': total,
+    }
+
+
+class CountedPaginator(Paginator):
+    """Paginator for a total that is already known, so it runs no COUNT query"""
+
+    def __init__(self, object_list, per_page, count, **kwargs):
+        self._count = count
+        super().__init__(object_list, per_page, **kwargs)
+
+    @property
+    def count(self):
+        return self._count
@@ -0,0 +1,61 @@
+"""
+JSON encoding and decoding with orjson when it is installed, and the stdlib
+json module otherwise.
+
+ORJSONRenderer produces byte-for-byte the output of DRF's JSONRenderer with
+the default COMPACT_JSON and UNICODE_JSON settings; types orjson does not
+know (Decimal, lazy strings, querysets) and datetimes, whose format DRF
+fixes, go through DRF's JSONEncoder.
+"""
+import json
+
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.settings import api_settings
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional
+    orjson = None
+
+
+def loads(data):
+    """Parse a request body; raises ValueError on invalid JSON"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class ORJSONRenderer(JSONRenderer):
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            orjson is None
+            or not self.compact
+            or self.ensure_ascii
+            or self.get_indent(accepted_media_type, renderer_context or {})
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        if data is None:
+            return b''
+        ret = orjson.dumps(
+            data,
+            default=self.encoder_class().default,
+            option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS,
+        )
+        # As in JSONRenderer: U+2028 and U+2029 are valid JSON but not valid JavaScript
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+
+
+class ORJSONParser(JSONParser):
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get('encoding', settings.DEFAULT_CHARSET)
+        if orjson is None or encoding.lower().replace('-', '') != 'utf8' or not api_settings.STRICT_JSON:
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
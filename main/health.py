@@ -0,0 +1,89 @@
+"""
+Dependency checks behind the readiness and detailed health endpoints.
+
+Liveness (/health/) never calls into this module. Readiness results are kept
+in process memory for HEALTH_CACHE_SECONDS, and only one thread per worker
+runs the checks at a time, so a burst of probes costs at most one database
+query, one cache round trip and one storage lookup per worker.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.files.storage import default_storage
+from django.db import connections
+
+
+def check_database():
+    with connections['default'].cursor() as cursor:
+        cursor.execute('SELECT 1')
+
+
+def check_cache():
+    cache = caches['default']
+    cache.set('health:probe', 1, 30)
+    if cache.get('health:probe') != 1:
+        raise RuntimeError('cache did not return the probe value')
+
+
+def check_storage():
+    # A metadata lookup only; S3 answers it with a single HEAD request
+    default_storage.exists('health-check')
+
+
+CHECKS = {
+    'database': check_database,
+    'cache': check_cache,
+    'storage': check_storage,
+}
+
+
+def run_checks(names=None):
+    """Run the named checks (default: HEALTH_CHECKS) and time each one"""
+    if names is None:
+        names = getattr(settings, 'HEALTH_CHECKS', list(CHECKS))
+    results = {}
+    for name in names:
+        start = time.perf_counter()
+        try:
+            CHECKS[name]()
+        except Exception as e:
+            results[name] = {'ok': False, 'error': f'{type(e).__name__}: {e}'}
+        else:
+            results[name] = {'ok': True}
+        results[name]['latency_ms'] = round((time.perf_counter() - start) * 1000, 2)
+    return results
+
+
+_lock = threading.Lock()
+_results = None
+_checked_at = 0.0
+
+
+def readiness():
+    """
+    Cached check results and their age in seconds.
+
+    Waiting threads reuse the result of the thread that held the lock instead
+    of running the checks again.
+    """
+    global _results, _checked_at
+    max_age = getattr(settings, 'HEALTH_CACHE_SECONDS', 5)
+    if _results is None or time.monotonic() - _checked_at >= max_age:
+        with _lock:
+            if _results is None or time.monotonic() - _checked_at >= max_age:
+                _results = run_checks()
+                _checked_at = time.monotonic()
+    return _results, time.monotonic() - _checked_at
+
+
+def is_ready(results):
+    return all(result['ok'] for result in results.values())
+
+
+def reset():
+    """Forget cached results so the next readiness() runs the checks"""
+    global _results
+    with _lock:
+        _results = None
@@ -0,0 +1,152 @@
+"""
+Per-request performance counters.
+
+PerformanceMiddleware activates a RequestMetrics object for the duration of a
+request. The database execute wrapper, the cache backends and the template
+backend below add to it while it is active and do nothing otherwise, so they
+are safe to leave configured when instrumentation is switched off.
+
+The execute wrapper is installed on every connection as it is opened rather
+than per request: under ASGI the async ORM runs queries on a worker thread
+whose connection the middleware never sees, while the active RequestMetrics
+follows the request there through its context.
+"""
+import contextvars
+import time
+
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.cache.backends.redis import RedisCache
+from django.template import TemplateDoesNotExist
+from django.template.backends.django import DjangoTemplates, Template, reraise
+
+
+_current_metrics = contextvars.ContextVar('request_metrics', default=None)
+_MISSING = object()
+
+
+class RequestMetrics:
+    """Counters collected while a single request is being handled"""
+    __slots__ = ('db_time', 'db_queries', 'cache_hits', 'cache_misses', 'template_time', 'inspector')
+
+    def __init__(self):
+        self.db_time = 0.0
+        self.db_queries = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.template_time = 0.0
+        # QueryInspector for sampled requests, see main.query_inspection
+        self.inspector = None
+
+    def activate(self):
+        return _current_metrics.set(self)
+
+    @staticmethod
+    def deactivate(token):
+        _current_metrics.reset(token)
+
+    def server_timing(self, view_time, total_time):
+        """Render the counters as a Server-Timing header value"""
+        return ', '.join([
+            f'db;dur={self.db_time * 1000:.1f};desc="{self.db_queries} queries"',
+            f'cache;desc="{self.cache_hits} hits, {self.cache_misses} misses"',
+            f'tpl;dur={self.template_time * 1000:.1f}',
+            f'view;dur={view_time * 1000:.1f}',
+            f'total;dur={total_time * 1000:.1f}',
+        ])
+
+    def log_fields(self, view_time, total_time):
+        return {
+            'db_ms': round(self.db_time * 1000, 1),
+            'db_queries': self.db_queries,
+            'cache_hits': self.cache_hits,
+            'cache_misses': self.cache_misses,
+            'template_ms': round(self.template_time * 1000, 1),
+            'view_ms': round(view_time * 1000, 1),
+            'total_ms': round(total_time * 1000, 1),
+        }
+
+
+def current_metrics():
+    """The metrics of the request being handled, or None outside a request"""
+    return _current_metrics.get()
+
+
+def record_query(execute, sql, params, many, context):
+    """connection.execute_wrapper hook that times every query"""
+    metrics = _current_metrics.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duration = time.perf_counter() - start
+        metrics.db_time += duration
+        metrics.db_queries += 1
+        if metrics.inspector is not None:
+            metrics.inspector.add(sql, duration)
+
+
+def install_query_hook(sender, connection, **kwargs):
+    """connection_created receiver that adds record_query to the new connection"""
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+class InstrumentedCacheMixin:
+    """Counts hits and misses of get()/get_many() against the active request"""
+
+    def get(self, key, default=None, version=None):
+        metrics = _current_metrics.get()
+        if metrics is None:
+            return super().get(key, default, version)
+        value = super().get(key, _MISSING, version)
+        if value is _MISSING:
+            metrics.cache_misses += 1
+            return default
+        metrics.cache_hits += 1
+        return value
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        found = super().get_many(keys, version)
+        metrics = _current_metrics.get()
+        if metrics is not None:
+            metrics.cache_hits += len(found)
+            metrics.cache_misses += len(keys) - len(found)
+        return found
+
+
+class InstrumentedLocMemCache(InstrumentedCacheMixin, LocMemCache):
+    pass
+
+
+class InstrumentedRedisCache(InstrumentedCacheMixin, RedisCache):
+    pass
+
+
+class InstrumentedTemplate(Template):
+    """Backend template wrapper that adds render time to the active request"""
+
+    def render(self, context=None, request=None):
+        metrics = _current_metrics.get()
+        if metrics is None:
+            return super().render(context, request)
+        start = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            metrics.template_time += time.perf_counter() - start
+
+
+class InstrumentedDjangoTemplates(DjangoTemplates):
+    """DjangoTemplates backend whose templates report their render time"""
+
+    def from_string(self, template_code):
+        return InstrumentedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return InstrumentedTemplate(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            reraise(exc, self)
@@ -0,0 +1,36 @@
+"""
+Admin notification emails, handed off so a slow SMTP server never holds up
+the request that triggered them.
+"""
+import logging
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.mail import send_mail
+
+
+logger = logging.getLogger(__name__)
+
+# Threads start on first use, so forking workers after import is safe
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='mail')
+
+
+def _send(subject, message, from_email, recipient_list):
+    try:
+        send_mail(subject, message, from_email, recipient_list, fail_silently=False)
+    except Exception:
+        logger.warning('Email sending failed: %s', subject, exc_info=True)
+
+
+async def notify_admin(subject, message, from_email, recipient_list):
+    """
+    Queue the email on a background thread, or send it inline when
+    EMAIL_IN_BACKGROUND is off. Either way a Future of the send is returned;
+    the inline one is already done.
+    """
+    if getattr(settings, 'EMAIL_IN_BACKGROUND', True):
+        return _executor.submit(_send, subject, message, from_email, recipient_list)
+    future = Future()
+    future.set_result(await sync_to_async(_send)(subject, message, from_email, recipient_list))
+    return future
@@ -0,0 +1,400 @@
+import json
+import math
+import platform
+import random
+import re
+import subprocess
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from io import StringIO
+
+import django
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, RequestFactory
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from main.models import Lecture, Service, ServiceCategory, SiteSettings
+from main.serializers import ServiceSerializer, ValuesRenderer
+
+
+# Words from the seed_scale_data vocabulary, so searches always have hits
+SEARCH_TERMS = ['روغن', 'موتور', 'گیربکس', 'فیلتر', 'رادیاتور']
+# Services rendered per serialize_* step, as in one /api/services/ response
+SERIALIZATION_ITEMS = 100
+
+SERVER_TIMING_QUERIES = re.compile(r'db;[^,]*desc="(\d+) queries"')
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(pct / 100.0 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def summarize(latencies, query_counts, errors, wall_time):
+    """Reduce raw per-request samples to the reported statistics"""
+    ordered = sorted(latencies)
+    total = len(ordered)
+    return {
+        'requests': total,
+        'errors': errors,
+        'p50_ms': round(percentile(ordered, 50) * 1000, 3) if total else None,
+        'p95_ms': round(percentile(ordered, 95) * 1000, 3) if total else None,
+        'p99_ms': round(percentile(ordered, 99) * 1000, 3) if total else None,
+        'mean_ms': round(sum(ordered) / total * 1000, 3) if total else None,
+        'requests_per_second': round(total / wall_time, 2) if wall_time else None,
+        'queries_per_request': round(sum(query_counts) / len(query_counts), 2) if query_counts else None,
+    }
+
+
+def parse_query_count(server_timing):
+    """Query count from a PerformanceMiddleware Server-Timing header, if present"""
+    match = SERVER_TIMING_QUERIES.search(server_timing or '')
+    return int(match.group(1)) if match else None
+
+
+class QueryCounter:
+    """Cheap execute_wrapper that only counts queries, unlike CaptureQueriesContext"""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class Command(BaseCommand):
+    help = 'Run scripted load scenarios against the site and report latency statistics as JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--iterations',
+            type=int,
+            default=50,
+            help='Number of times each scenario is replayed (default: 50)',
+        )
+        parser.add_argument(
+            '--warmup',
+            type=int,
+            default=5,
+            help='Untimed iterations run before measuring each scenario (default: 5)',
+        )
+        parser.add_argument(
+            '--scenario',
+            action='append',
+            dest='scenarios',
+            help='Only run the named scenario; may be given more than once',
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=1234,
+            help='Random seed for the synthetic dataset and request mix (default: 1234)',
+        )
+        parser.add_argument(
+            '--services',
+            type=int,
+            default=200,
+            help='Number of synthetic services to create (default: 200)',
+        )
+        parser.add_argument(
+            '--lectures',
+            type=int,
+            default=500,
+            help='Number of synthetic lectures to create (default: 500)',
+        )
+        parser.add_argument(
+            '--base-url',
+            help='Drive a running server over HTTP instead of the in-process client. '
+                 'The server database must already contain content; query counts are read '
+                 'from Server-Timing when PERFORMANCE_INSTRUMENTATION is on.',
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=1,
+            help='Parallel HTTP clients when --base-url is used (default: 1)',
+        )
+        parser.add_argument(
+            '--output',
+            help='Write the JSON report to this file instead of stdout',
+        )
+        parser.add_argument(
+            '--compare',
+            help='Previous JSON report to print per-scenario deltas against',
+        )
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        base_url = options['base_url']
+
+        if base_url:
+            dataset = self.describe_dataset()
+            report = self.run(options, dataset, self.http_request_factory(base_url.rstrip('/')))
+        else:
+            setup_test_environment()
+            old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+            try:
+                self.seed_dataset(options)
+                dataset = self.describe_dataset()
+                report = self.run(options, dataset, self.client_request_factory(), in_process=True)
+            finally:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+                teardown_test_environment()
+
+        output = json.dumps(report, indent=2, ensure_ascii=False)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                f.write(output + '\n')
+            self.stdout.write(self.style.SUCCESS(f'Benchmark report written to {options["output"]}'))
+        else:
+            self.stdout.write(output)
+
+        if options['compare']:
+            self.print_comparison(options['compare'], report)
+
+    def seed_dataset(self, options):
+        """Create a deterministic synthetic dataset in the throwaway test database"""
+        SiteSettings.objects.create()
+        call_command(
+            'seed_scale_data',
+            seed=options['seed'],
+            categories=12,
+            services=options['services'],
+            lectures=options['lectures'],
+            comments=options['services'] + options['lectures'],
+            appointments=options['services'] * 5,
+            appointment_requests=options['services'],
+            contact_messages=options['services'],
+            stdout=StringIO(),
+        )
+
+    def describe_dataset(self):
+        """Snapshot the slugs and sizes the scenarios need"""
+        return {
+            'lectures': Lecture.objects.filter(is_published=True).count(),
+            'services': Service.objects.filter(is_published=True).count(),
+            'lecture_slugs': list(Lecture.objects.filter(is_published=True).values_list('slug', flat=True)[:100]),
+            'service_slugs': list(Service.objects.filter(is_published=True).values_list('slug', flat=True)[:100]),
+            'service_ids': list(Service.objects.filter(is_published=True).values_list('id', flat=True)[:100]),
+            'category_slugs': list(ServiceCategory.objects.filter(is_active=True).values_list('slug', flat=True)),
+        }
+
+    def build_scenarios(self, dataset, in_process=False):
+        """
+        Each scenario yields the (method, path, json_body) steps of one simulated
+        visit. In-process runs add serialize_drf and serialize_values, which time
+        only the serialization of one service listing (RENDER steps).
+        """
+        rng = self.rng
+        lecture_pages = max(1, min(5, (dataset['lectures'] + 8) // 9))
+
+        def home():
+            return [('GET', '/', None)]
+
+        def lecture_paging():
+            return [('GET', f'/lectures/?page={page}', None) for page in range(1, lecture_pages + 1)]
+
+        def service_listing():
+            steps = [('GET', '/services/', None)]
+            if dataset['category_slugs']:
+                steps.append(('GET', f'/services/?category={rng.choice(dataset["category_slugs"])}', None))
+            steps.append(('GET', '/services/?featured=true', None))
+            return steps
+
+        def lecture_detail():
+            return [('GET', f'/lecture/{rng.choice(dataset["lecture_slugs"])}/', None)]
+
+        def service_detail():
+            return [('GET', f'/service/{rng.choice(dataset["service_slugs"])}/', None)]
+
+        def search():
+            term = urllib.request.quote(rng.choice(SEARCH_TERMS))
+            return [
+                ('GET', f'/api/lectures/?search={term}', None),
+                ('GET', f'/api/services/?search={term}', None),
+            ]
+
+        def api_listing():
+            return [
+                ('GET', '/api/services/', None),
+                ('GET', '/api/lectures/?fields=id,title,slug,image,teaser', None),
+            ]
+
+        def booking():
+            body = {
+                'name': 'مشتری تست',
+                'phone': '09120000000',
+                'service_id': rng.choice(dataset['service_ids']),
+                'appointment_date': '2030-01-01',
+                'appointment_time': '10:00',
+                'car_model': 'پژو ۲۰۶',
+            }
+            return [('GET', '/appointment/', None), ('POST', '/api/appointments/', body)]
+
+        scenarios = {
+            'home': home,
+            'lecture_paging': lecture_paging,
+            'service_listing': service_listing,
+            'search': search,
+            'api_listing': api_listing,
+        }
+        if dataset['lecture_slugs']:
+            scenarios['lecture_detail'] = lecture_detail
+        if dataset['service_slugs']:
+            scenarios['service_detail'] = service_detail
+            scenarios['booking'] = booking
+        if in_process:
+            scenarios['serialize_drf'] = lambda: [('RENDER', 'drf', None)]
+            scenarios['serialize_values'] = lambda: [('RENDER', 'values', None)]
+        return scenarios
+
+    def serialization_renderers(self):
+        """
+        The same in-memory services rendered by ServiceSerializer and by
+        ValuesRenderer, with no database access inside the timed call
+        """
+        request = RequestFactory().get('/api/services/')
+        queryset = Service.objects.filter(is_published=True).order_by('-created_at')[:SERIALIZATION_ITEMS]
+        instances = list(queryset)
+        rows = list(ValuesRenderer(ServiceSerializer, request=request).values(queryset))
+        return {
+            'drf': lambda: ServiceSerializer(instances, many=True, context={'request': request}).data,
+            'values': lambda: ValuesRenderer(ServiceSerializer, request=request).render(rows),
+        }
+
+    def client_request_factory(self):
+        """In-process requests through the full WSGI handler and middleware stack"""
+        client = Client()
+        counter = QueryCounter()
+        renderers = self.serialization_renderers()
+
+        def send(method, path, body):
+            counter.count = 0
+            with connection.execute_wrapper(counter):
+                start = time.perf_counter()
+                if method == 'RENDER':
+                    renderers[path]()
+                    elapsed = time.perf_counter() - start
+                    return elapsed, 200, counter.count
+                if method == 'POST':
+                    response = client.post(path, json.dumps(body), content_type='application/json')
+                else:
+                    response = client.get(path)
+                elapsed = time.perf_counter() - start
+            return elapsed, response.status_code, counter.count
+
+        return send
+
+    def http_request_factory(self, base_url):
+        """Real HTTP requests against a running server"""
+
+        def send(method, path, body):
+            data = json.dumps(body).encode('utf-8') if body is not None else None
+            request = urllib.request.Request(base_url + path, data=data, method=method)
+            if data is not None:
+                request.add_header('Content-Type', 'application/json')
+            start = time.perf_counter()
+            timing = None
+            try:
+                with urllib.request.urlopen(request, timeout=30) as response:
+                    response.read()
+                    status = response.status
+                    timing = response.headers.get('Server-Timing')
+            except urllib.error.HTTPError as e:
+                status = e.code
+            except (urllib.error.URLError, OSError):
+                status = 0
+            elapsed = time.perf_counter() - start
+            return elapsed, status, parse_query_count(timing)
+
+        return send
+
+    def run(self, options, dataset, send, in_process=False):
+        scenarios = self.build_scenarios(dataset, in_process)
+        selected = options['scenarios'] or list(scenarios)
+        unknown = set(selected) - set(scenarios)
+        if unknown:
+            raise CommandError(f'Unknown scenario(s): {", ".join(sorted(unknown))}. '
+                               f'Available: {", ".join(scenarios)}')
+
+        concurrency = max(1, options['concurrency']) if options['base_url'] else 1
+        results = {}
+        for name in selected:
+            self.stderr.write(f'Running scenario {name}...')
+            for _ in range(options['warmup']):
+                for step in scenarios[name]():
+                    send(*step)
+
+            # Build the step list up front so the request mix is identical across runs
+            steps = [step for _ in range(options['iterations']) for step in scenarios[name]()]
+            started = time.perf_counter()
+            if concurrency > 1:
+                with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                    samples = list(pool.map(lambda step: send(*step), steps))
+            else:
+                samples = [send(*step) for step in steps]
+            wall_time = time.perf_counter() - started
+
+            latencies = [elapsed for elapsed, _, _ in samples]
+            errors = sum(1 for _, status, _ in samples if not 200 <= status < 400)
+            query_counts = [queries for _, _, queries in samples if queries is not None]
+            results[name] = summarize(latencies, query_counts, errors, wall_time)
+
+        return {
+            'meta': {
+                'timestamp': datetime.now(timezone.utc).isoformat(),
+                'git_revision': self.git_revision(),
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'database': connection.vendor,
+                'database_engine': connection.settings_dict['ENGINE'],
+                'conn_max_age': connection.settings_dict['CONN_MAX_AGE'],
+                'settings': settings.SETTINGS_MODULE,
+                'mode': 'http' if options['base_url'] else 'in-process',
+                'base_url': options['base_url'],
+                'concurrency': concurrency,
+                'iterations': options['iterations'],
+                'warmup': options['warmup'],
+                'seed': options['seed'],
+                'dataset': {'lectures': dataset['lectures'], 'services': dataset['services']},
+            },
+            'scenarios': results,
+        }
+
+    def git_revision(self):
+        try:
+            return subprocess.check_output(
+                ['git', 'rev-parse', '--short', 'HEAD'],
+                cwd=settings.BASE_DIR, stderr=subprocess.DEVNULL,
+            ).decode().strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    def print_comparison(self, path, report):
+        """Print p50/p95/query deltas against an earlier report"""
+        with open(path, encoding='utf-8') as f:
+            baseline = json.load(f)
+
+        self.stdout.write(f'\nCompared with {path} ({baseline["meta"].get("git_revision") or "unknown revision"}):')
+        for name, current in report['scenarios'].items():
+            previous = baseline.get('scenarios', {}).get(name)
+            if not previous:
+                self.stdout.write(f'  {name}: no baseline')
+                continue
+            parts = []
+            for key in ('p50_ms', 'p95_ms', 'queries_per_request'):
+                if current.get(key) is None or previous.get(key) is None:
+                    continue
+                delta = current[key] - previous[key]
+                parts.append(f'{key} {previous[key]} -> {current[key]} ({delta:+.2f})')
+            self.stdout.write(f'  {name}: ' + ', '.join(parts))
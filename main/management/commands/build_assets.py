@@ -0,0 +1,279 @@
+import os
+import re
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+try:
+    from fontTools import subset as font_subset
+except ImportError:  # pragma: no cover - fonttools is optional
+    font_subset = None
+
+
+COMMENT = re.compile(r'/\*.*?\*/', re.S)
+TOKEN = re.compile(r'[A-Za-z0-9_-]+')
+CLASS_OR_ID = re.compile(r'[.#]((?:\\.|[\w-])+)')
+NEGATION = re.compile(r':not\([^)]*\)')
+ATTRIBUTE = re.compile(r'\[[^\]]*\]')
+GLYPH = re.compile(r'content:\s*"\\([0-9a-fA-F]+)"')
+KEYFRAMES = re.compile(r'@(?:-webkit-)?keyframes\s+([\w-]+)')
+# @-rules whose bodies are lists of rules rather than declarations
+NESTED_AT_RULES = ('@media', '@supports', '@layer', '@container', '@document')
+
+FONTAWESOME_LICENSE = (
+    '/*!\n'
+    ' * Font Awesome Free by @fontawesome - https://fontawesome.com\n'
+    ' * License - https://fontawesome.com/license/free (Icons: CC BY 4.0, Fonts: SIL OFL 1.1, Code: MIT License)\n'
+    ' * Subset of static/fontawesome/css/all.min.css written by build_assets\n'
+    ' */\n'
+)
+# (source font under static/fontawesome/webfonts, font-family, font-weight)
+FONTAWESOME_FONTS = [
+    ('fa-solid-900.ttf', 'Font Awesome 6 Free', 900),
+    ('fa-regular-400.ttf', 'Font Awesome 6 Free', 400),
+    ('fa-brands-400.ttf', 'Font Awesome 6 Brands', 400),
+]
+
+
+def _scan(text, start, stops):
+    """Index of the first character in ``stops`` at or after ``start``, skipping strings"""
+    quote = None
+    i = start
+    while i < len(text):
+        ch = text[i]
+        if quote:
+            if ch == '\\':
+                i += 1
+            elif ch == quote:
+                quote = None
+        elif ch in '"\'':
+            quote = ch
+        elif ch in stops:
+            return i
+        i += 1
+    return len(text)
+
+
+def parse_css(text):
+    """
+    Split a stylesheet into ``(prelude, body)`` blocks. ``body`` is None for
+    statements such as ``@import``, a list of blocks for ``@media`` and the
+    other grouping rules, and the raw declarations otherwise.
+    """
+    text = COMMENT.sub('', text)
+    blocks = []
+    i = 0
+    while i < len(text):
+        j = _scan(text, i, '{;}')
+        prelude = text[i:j].strip()
+        if j >= len(text) or text[j] != '{':
+            if prelude:
+                blocks.append((prelude, None))
+            i = j + 1
+            continue
+        depth, k = 1, j + 1
+        while depth and k < len(text):
+            k = _scan(text, k, '{}')
+            if k < len(text):
+                depth += 1 if text[k] == '{' else -1
+                k += 1
+        body = text[j + 1:k - 1]
+        if prelude.startswith(NESTED_AT_RULES):
+            blocks.append((prelude, parse_css(body)))
+        else:
+            blocks.append((prelude, body.strip()))
+        i = k
+    return blocks
+
+
+def serialize_css(blocks):
+    parts = []
+    for prelude, body in blocks:
+        if body is None:
+            parts.append(f'{prelude};')
+        elif isinstance(body, list):
+            parts.append(f'{prelude}{{{serialize_css(body)}}}')
+        else:
+            parts.append(f'{prelude}{{{body}}}')
+    return '\n'.join(parts)
+
+
+def split_selectors(prelude):
+    selectors, depth, start = [], 0, 0
+    for i, ch in enumerate(prelude):
+        if ch == '(':
+            depth += 1
+        elif ch == ')':
+            depth -= 1
+        elif ch == ',' and not depth:
+            selectors.append(prelude[start:i].strip())
+            start = i + 1
+    selectors.append(prelude[start:].strip())
+    return [s for s in selectors if s]
+
+
+def selector_used(selector, tokens):
+    """True when every class and id in ``selector`` appears in ``tokens``"""
+    selector = ATTRIBUTE.sub('', NEGATION.sub('', selector))
+    names = [name.replace('\\', '') for name in CLASS_OR_ID.findall(selector)]
+    return all(name in tokens for name in names)
+
+
+def purge(blocks, tokens):
+    """Drop the selectors, and then the rules, that no template can match"""
+    kept = []
+    for prelude, body in blocks:
+        if body is None:
+            kept.append((prelude, body))
+        elif isinstance(body, list):
+            inner = purge(body, tokens)
+            if inner:
+                kept.append((prelude, inner))
+        elif prelude.startswith('@'):
+            kept.append((prelude, body))
+        else:
+            selectors = [s for s in split_selectors(prelude) if selector_used(s, tokens)]
+            if selectors:
+                kept.append((','.join(selectors), body))
+    return drop_unused_keyframes(kept, tokens)
+
+
+def drop_unused_keyframes(blocks, tokens):
+    """Keep @keyframes only when a kept rule or a template refers to them"""
+    css = serialize_css([b for b in blocks if not KEYFRAMES.match(b[0])])
+    kept = []
+    for prelude, body in blocks:
+        match = KEYFRAMES.match(prelude)
+        if match and match.group(1) not in css and match.group(1) not in tokens:
+            continue
+        kept.append((prelude, body))
+    return kept
+
+
+def without(blocks, *prefixes):
+    return [b for b in blocks if not b[0].startswith(prefixes)]
+
+
+def subset_font(source, destination, codepoints):
+    """Write a woff2 holding only ``codepoints``; returns how many glyphs it kept"""
+    options = font_subset.Options()
+    options.flavor = 'woff2'
+    options.layout_features = ['*']
+    font = font_subset.load_font(str(source), options)
+    available = set(font.getBestCmap()) & codepoints
+    if not available:
+        return 0
+    subsetter = font_subset.Subsetter(options)
+    subsetter.populate(unicodes=available)
+    subsetter.subset(font)
+    font_subset.save_font(font, str(destination), options)
+    return len(available)
+
+
+class Command(BaseCommand):
+    help = (
+        'Build static/build/: a Font Awesome subset with only the icons the templates use, '
+        'custom.css without unused rules, and the critical CSS base.html inlines'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output',
+            default=str(Path(settings.BASE_DIR) / 'static' / 'build'),
+            help='Directory to write into (default: static/build)',
+        )
+        parser.add_argument(
+            '--icon',
+            action='append',
+            default=[],
+            help='Extra fa-* class to keep, e.g. for icons stored in the database (repeatable)',
+        )
+        parser.add_argument(
+            '--critical-template',
+            default='base.html',
+            help='Template whose markup before {% block content %} is above the fold (default: base.html)',
+        )
+
+    def handle(self, *args, **options):
+        static_dir = Path(settings.BASE_DIR) / 'static'
+        output = Path(options['output'])
+        (output / 'webfonts').mkdir(parents=True, exist_ok=True)
+
+        tokens = self.scan_tokens(static_dir) | set(options['icon'])
+        critical_tokens = self.scan_critical_tokens(options['critical_template'])
+
+        self.build_icons(static_dir, output, tokens)
+        self.build_site_css(static_dir, output, tokens, critical_tokens)
+
+    def template_dirs(self):
+        dirs = []
+        for engine in settings.TEMPLATES:
+            dirs.extend(Path(d) for d in engine.get('DIRS', []))
+        return dirs
+
+    def scan_tokens(self, static_dir):
+        """Every word in the templates and scripts that could be a class or id"""
+        tokens = set()
+        sources = [*self.template_dirs(), static_dir / 'js']
+        for directory in sources:
+            for root, _dirs, files in os.walk(directory):
+                for filename in files:
+                    if filename.endswith(('.html', '.js', '.txt', '.xml')):
+                        with open(os.path.join(root, filename), encoding='utf-8') as f:
+                            tokens.update(TOKEN.findall(f.read()))
+        return tokens
+
+    def scan_critical_tokens(self, template_name):
+        for directory in self.template_dirs():
+            path = directory / template_name
+            if path.exists():
+                markup = path.read_text(encoding='utf-8')
+                return set(TOKEN.findall(markup.split('{% block content %}')[0]))
+        raise CommandError(f'Template {template_name} not found in {self.template_dirs()}')
+
+    def build_icons(self, static_dir, output, tokens):
+        fontawesome = static_dir / 'fontawesome'
+        source = (fontawesome / 'css' / 'all.min.css').read_text(encoding='utf-8')
+        # The @font-face rules are rewritten below to point at the subsets
+        blocks = purge(without(parse_css(source), '@font-face'), tokens)
+        css = serialize_css(blocks)
+        codepoints = {int(value, 16) for value in GLYPH.findall(css)}
+
+        font_faces = []
+        for filename, family, weight in FONTAWESOME_FONTS:
+            woff2 = filename.replace('.ttf', '.woff2')
+            if font_subset is None:
+                url = f'../fontawesome/webfonts/{woff2}'
+            else:
+                if not subset_font(fontawesome / 'webfonts' / filename, output / 'webfonts' / woff2, codepoints):
+                    continue
+                url = f'webfonts/{woff2}'
+            font_faces.append(
+                f'@font-face{{font-family:"{family}";font-style:normal;font-weight:{weight};'
+                f'font-display:block;src:url({url}) format("woff2")}}'
+            )
+        if font_subset is None:
+            self.stderr.write(self.style.WARNING('fonttools is not installed, icons.css uses the full webfonts'))
+
+        (output / 'icons.css').write_text(FONTAWESOME_LICENSE + '\n'.join(font_faces) + '\n' + css + '\n', encoding='utf-8')
+        icon_count = len(set(re.findall(r'\.(fa-[\w-]+):+before', css)))
+        self.stdout.write(self.style.SUCCESS(
+            f'icons.css: {icon_count} icon classes, {len(codepoints)} glyphs, '
+            f'{len(source) // 1024} KB -> {(output / "icons.css").stat().st_size // 1024} KB'
+        ))
+
+    def build_site_css(self, static_dir, output, tokens, critical_tokens):
+        source = (static_dir / 'css' / 'custom.css').read_text(encoding='utf-8')
+        blocks = purge(parse_css(source), tokens)
+        (output / 'site.css').write_text(serialize_css(blocks) + '\n', encoding='utf-8')
+
+        # Critical CSS is inlined into <head>, so it must not block on @import
+        # and does not need print or font rules
+        critical = purge(without(blocks, '@import', '@media print', '@font-face'), critical_tokens)
+        (output / 'critical.css').write_text(serialize_css(critical) + '\n', encoding='utf-8')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'site.css: {len(source) // 1024} KB -> {(output / "site.css").stat().st_size // 1024} KB, '
+            f'critical.css: {(output / "critical.css").stat().st_size // 1024} KB'
+        ))
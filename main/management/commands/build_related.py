@@ -0,0 +1,43 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from main import recommendations
+
+
+class Command(BaseCommand):
+    help = 'Precompute related lectures and services from TF-IDF similarity of their text'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--kind',
+            choices=sorted(recommendations.KINDS),
+            help='Only build related items of this kind (default: all)',
+        )
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Recompute every item instead of only those changed since the last build',
+        )
+        parser.add_argument('--top-k', type=int, default=3, help='Related items stored per item (default: 3)')
+        parser.add_argument('--max-features', type=int, default=5000, help='Vocabulary size limit (default: 5000)')
+        parser.add_argument('--batch-size', type=int, default=512, help='Items per similarity batch (default: 512)')
+
+    def handle(self, *args, **options):
+        if recommendations.np is None:
+            raise CommandError('NumPy is not installed; pip install numpy')
+        if options['top_k'] < 1:
+            raise CommandError('--top-k must be at least 1')
+
+        for kind in [options['kind']] if options['kind'] else sorted(recommendations.KINDS):
+            started = time.perf_counter()
+            items, recomputed = recommendations.build(
+                kind,
+                k=options['top_k'],
+                full=options['full'],
+                max_features=options['max_features'],
+                batch_size=options['batch_size'],
+            )
+            self.stdout.write(self.style.SUCCESS(
+                f'{kind}: recomputed {recomputed} of {items} items in {time.perf_counter() - started:.2f}s'
+            ))
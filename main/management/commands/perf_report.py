@@ -0,0 +1,112 @@
+import json
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from main.query_inspection import parse_log_line
+
+
+DEFAULT_LOG = '/app/logs/queries.log'
+
+
+def aggregate(records):
+    """Group inspection records by kind, view and fingerprint"""
+    offenders = {}
+    for record in records:
+        key = (record.get('kind'), record.get('view'), record.get('fingerprint'))
+        entry = offenders.get(key)
+        if entry is None:
+            entry = offenders[key] = {
+                'kind': key[0],
+                'view': key[1],
+                'fingerprint': key[2],
+                'occurrences': 0,
+                'total_ms': 0.0,
+                'max_ms': 0.0,
+                'max_repeats': 0,
+                'frames': {},
+            }
+        duration = record.get('duration_ms', 0.0)
+        entry['occurrences'] += 1
+        entry['total_ms'] += duration
+        entry['max_ms'] = max(entry['max_ms'], duration)
+        entry['max_repeats'] = max(entry['max_repeats'], record.get('count', 1))
+        frame = record.get('frame') or ''
+        entry['frames'][frame] = entry['frames'].get(frame, 0) + 1
+
+    results = []
+    for entry in offenders.values():
+        frames = entry.pop('frames')
+        entry['frame'] = max(frames, key=frames.get)
+        entry['total_ms'] = round(entry['total_ms'], 1)
+        results.append(entry)
+    return results
+
+
+class Command(BaseCommand):
+    help = 'Summarize slow-query and N+1 reports from the main.queries log into the top offenders'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'logs',
+            nargs='*',
+            help=f'Log files to read (default: {DEFAULT_LOG})',
+        )
+        parser.add_argument(
+            '--kind',
+            choices=['slow_query', 'n_plus_one'],
+            help='Only report this kind of finding',
+        )
+        parser.add_argument(
+            '--top',
+            type=int,
+            default=20,
+            help='Number of offenders to show (default: 20)',
+        )
+        parser.add_argument(
+            '--sort',
+            choices=['total', 'occurrences', 'max'],
+            default='total',
+            help='Rank by total time, number of occurrences or slowest single report (default: total)',
+        )
+        parser.add_argument(
+            '--json',
+            action='store_true',
+            help='Print the report as JSON',
+        )
+
+    def handle(self, *args, **options):
+        paths = options['logs'] or [DEFAULT_LOG]
+        records = []
+        for path in paths:
+            if not os.path.exists(path):
+                raise CommandError(f'Log file not found: {path}')
+            with open(path, encoding='utf-8', errors='replace') as f:
+                for line in f:
+                    record = parse_log_line(line)
+                    if record is not None and (not options['kind'] or record.get('kind') == options['kind']):
+                        records.append(record)
+
+        sort_field = {'total': 'total_ms', 'occurrences': 'occurrences', 'max': 'max_ms'}[options['sort']]
+        offenders = sorted(aggregate(records), key=lambda entry: entry[sort_field], reverse=True)
+        offenders = offenders[:options['top']]
+
+        if options['json']:
+            self.stdout.write(json.dumps(offenders, ensure_ascii=False, indent=2))
+            return
+
+        if not offenders:
+            self.stdout.write(self.style.SUCCESS('No slow queries or N+1 patterns reported'))
+            return
+
+        self.stdout.write(f'{len(records)} reports, top {len(offenders)} offenders:')
+        for rank, entry in enumerate(offenders, start=1):
+            label = 'N+1' if entry['kind'] == 'n_plus_one' else 'SLOW'
+            self.stdout.write(self.style.WARNING(
+                f"\n{rank}. [{label}] {entry['view']}  "
+                f"{entry['occurrences']}x, total {entry['total_ms']}ms, max {entry['max_ms']}ms"
+                + (f", up to {entry['max_repeats']} repeats" if entry['kind'] == 'n_plus_one' else '')
+            ))
+            if entry['frame']:
+                self.stdout.write(f"   at {entry['frame']}")
+            self.stdout.write(f"   {entry['fingerprint']}")
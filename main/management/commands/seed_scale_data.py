@@ -0,0 +1,284 @@
+import random
+import time
+from datetime import date, time as dtime, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from main import content_cache
+from main.models import (
+    Lecture, Service, ServiceCategory, Comment, Appointment, AppointmentRequest, ContactMessage,
+    parse_duration_minutes,
+)
+
+
+# Vocabulary used to build Persian titles, descriptions and messages
+WORDS = [
+    'خودرو', 'موتور', 'روغن', 'گیربکس', 'فیلتر', 'رادیاتور', 'انژکتور', 'دریچه', 'گاز',
+    'ترمز', 'لنت', 'دیسک', 'صفحه', 'کلاچ', 'باتری', 'تسمه', 'تایم', 'سرویس', 'تعمیر',
+    'تعویض', 'شستشو', 'بررسی', 'کامل', 'حرفه‌ای', 'سریع', 'اتوماتیک', 'دستگاه', 'هیوندا',
+    'کیا', 'پژو', 'سمند', 'پراید', 'تویوتا', 'رنو', 'مصرف', 'سوخت', 'کاهش', 'افزایش',
+    'عمر', 'قطعات', 'اصلی', 'کیفیت', 'بالا', 'قیمت', 'مناسب', 'ضمانت', 'مشتری', 'رضایت',
+    'نگهداری', 'زمستان', 'تابستان', 'سفر', 'جاده', 'شهر', 'صدا', 'لرزش', 'دما', 'آب',
+]
+FIRST_NAMES = ['علی', 'محمد', 'رضا', 'حسین', 'مهدی', 'سارا', 'مریم', 'زهرا', 'فاطمه', 'نرگس', 'امیر', 'نیما']
+LAST_NAMES = ['محمدی', 'احمدی', 'رضایی', 'حسینی', 'کریمی', 'موسوی', 'جعفری', 'رحیمی', 'کاظمی', 'شاهین']
+CAR_MODELS = ['پژو ۲۰۶', 'پژو ۴۰۵', 'سمند', 'پراید', 'دنا', 'هیوندا النترا', 'کیا سراتو', 'تویوتا کرولا', 'رنو تندر ۹۰']
+COLORS = ['#3B82F6', '#F59E0B', '#10B981', '#EF4444', '#8B5CF6', '#EC4899']
+STATUSES = [choice for choice, _ in Appointment.STATUS_CHOICES]
+
+SLUG_PREFIX = 'scale'
+# Fixed, so the same --seed yields the same rows whenever it runs
+DEFAULT_START_DATE = date(2025, 1, 1)
+DEFAULT_END_DATE = date(2026, 3, 1)
+
+
+class Command(BaseCommand):
+    help = 'Generate large volumes of deterministic synthetic data for scale and performance testing'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--categories', type=int, default=10, help='Service categories to create (default: 10)')
+        parser.add_argument('--services', type=int, default=500, help='Services to create (default: 500)')
+        parser.add_argument('--lectures', type=int, default=1000, help='Lectures to create (default: 1000)')
+        parser.add_argument('--comments', type=int, default=10000, help='Comments to create, including replies (default: 10000)')
+        parser.add_argument('--reply-depth', type=int, default=2, help='Maximum reply nesting depth for comments (default: 2)')
+        parser.add_argument('--appointments', type=int, default=20000, help='Appointments to create (default: 20000)')
+        parser.add_argument('--appointment-requests', type=int, default=5000, help='Appointment requests to create (default: 5000)')
+        parser.add_argument('--contact-messages', type=int, default=5000, help='Contact messages to create (default: 5000)')
+        parser.add_argument(
+            '--start-date',
+            type=date.fromisoformat,
+            default=DEFAULT_START_DATE,
+            help=f'First appointment date, YYYY-MM-DD (default: {DEFAULT_START_DATE})',
+        )
+        parser.add_argument(
+            '--end-date',
+            type=date.fromisoformat,
+            default=DEFAULT_END_DATE,
+            help=f'Last appointment date, YYYY-MM-DD (default: {DEFAULT_END_DATE})',
+        )
+        parser.add_argument('--batch-size', type=int, default=2000, help='Rows per bulk_create batch (default: 2000)')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed; the same seed yields the same data (default: 42)')
+        parser.add_argument(
+            '--flush',
+            action='store_true',
+            help='Delete previously generated rows before seeding',
+        )
+
+    def handle(self, *args, **options):
+        if options['end_date'] < options['start_date']:
+            raise CommandError('--end-date must not be before --start-date')
+        if options['categories'] < 1 and options['services']:
+            raise CommandError('At least one category is needed to create services')
+
+        self.rng = random.Random(options['seed'])
+        self.batch_size = max(1, options['batch_size'])
+        self.total_rows = 0
+        started = time.perf_counter()
+
+        if options['flush']:
+            self.flush()
+        elif Lecture.objects.filter(slug__startswith=f'{SLUG_PREFIX}-').exists() or \
+                Service.objects.filter(slug__startswith=f'{SLUG_PREFIX}-').exists():
+            raise CommandError('Generated data already exists. Re-run with --flush to replace it.')
+
+        category_ids = self.create_categories(options['categories'])
+        service_ids = self.create_services(options['services'], category_ids)
+        lecture_ids = self.create_lectures(options['lectures'])
+        self.create_comments(options['comments'], options['reply_depth'], service_ids, lecture_ids)
+        self.create_appointments(options['appointments'], service_ids, options['start_date'], options['end_date'])
+        self.create_appointment_requests(options['appointment_requests'], options['start_date'], options['end_date'])
+        self.create_contact_messages(options['contact_messages'])
+
+        # bulk_create and queryset deletes send no signals; make cached pages
+        # and API responses pick up the new content now
+        for label in content_cache.MODELS:
+            content_cache.bump(label)
+
+        elapsed = time.perf_counter() - started
+        rate = self.total_rows / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {self.total_rows:,} rows in {elapsed:.1f}s ({rate:,.0f} rows/s)'
+        ))
+
+    def flush(self):
+        """Remove rows created by earlier runs"""
+        services = Service.objects.filter(slug__startswith=f'{SLUG_PREFIX}-')
+        lectures = Lecture.objects.filter(slug__startswith=f'{SLUG_PREFIX}-')
+        # Delete the leaf tables directly so the cascade collector has little left to walk
+        Appointment.objects.filter(service__in=services).delete()
+        Comment.objects.filter(service__in=services).delete()
+        Comment.objects.filter(lecture__in=lectures).delete()
+        services.delete()
+        lectures.delete()
+        ServiceCategory.objects.filter(slug__startswith=f'{SLUG_PREFIX}-').delete()
+        AppointmentRequest.objects.filter(email__endswith=f'@{SLUG_PREFIX}.example.com').delete()
+        ContactMessage.objects.filter(email__endswith=f'@{SLUG_PREFIX}.example.com').delete()
+        self.stdout.write('Removed previously generated data')
+
+    def text(self, words):
+        return ' '.join(self.rng.choices(WORDS, k=words))
+
+    def person(self):
+        return f'{self.rng.choice(FIRST_NAMES)} {self.rng.choice(LAST_NAMES)}'
+
+    def phone(self):
+        return f'0912{self.rng.randrange(10 ** 7):07d}'
+
+    def email(self, index):
+        return f'user{index}@{SLUG_PREFIX}.example.com'
+
+    def random_date(self, start, end):
+        return start + timedelta(days=self.rng.randrange((end - start).days + 1))
+
+    def bulk_insert(self, model, count, build):
+        """Insert ``count`` rows built by ``build(i)`` in batches and return their ids in order"""
+        if count <= 0:
+            return []
+        last_id = model.objects.order_by('-id').values_list('id', flat=True).first() or 0
+        for start in range(0, count, self.batch_size):
+            objs = [build(i) for i in range(start, min(start + self.batch_size, count))]
+            with transaction.atomic():
+                model.objects.bulk_create(objs, batch_size=self.batch_size)
+        self.total_rows += count
+        self.stdout.write(f'  {model._meta.verbose_name_plural}: {count:,}')
+        # MySQL does not return primary keys from bulk_create, so read them back
+        return list(model.objects.filter(id__gt=last_id).order_by('id').values_list('id', flat=True))
+
+    def create_categories(self, count):
+        return self.bulk_insert(ServiceCategory, count, lambda i: ServiceCategory(
+            name=f'{self.text(2)} {i}',
+            slug=f'{SLUG_PREFIX}-category-{i}',
+            description=self.text(20),
+            icon='fas fa-wrench',
+            color=self.rng.choice(COLORS),
+        ))
+
+    def create_services(self, count, category_ids):
+        def build(i):
+            min_price = self.rng.randrange(200, 2000) * 1000
+            service = Service(
+                name=f'{self.text(4)} {i}',
+                slug=f'{SLUG_PREFIX}-service-{i}',
+                image=f'services/{SLUG_PREFIX}-{i % 50}.jpg',
+                description=self.text(self.rng.randint(60, 200)),
+                category_id=self.rng.choice(category_ids),
+                min_price=min_price,
+                max_price=min_price + self.rng.randrange(0, 3000) * 1000,
+                duration=f'{self.rng.randint(1, 6)} ساعت',
+                is_featured=self.rng.random() < 0.15,
+                is_published=self.rng.random() < 0.95,
+            )
+            # bulk_create skips Service.save, which fills this in
+            service.duration_minutes = parse_duration_minutes(service.duration)
+            return service
+
+        return self.bulk_insert(Service, count, build)
+
+    def create_lectures(self, count):
+        return self.bulk_insert(Lecture, count, lambda i: Lecture(
+            title=f'{self.text(6)} {i}',
+            slug=f'{SLUG_PREFIX}-lecture-{i}',
+            image=f'lectures/{SLUG_PREFIX}-{i % 50}.jpg',
+            content=self.text(self.rng.randint(300, 1200)),
+            teaser=self.text(25)[:300],
+            is_published=self.rng.random() < 0.95,
+        ))
+
+    def create_comments(self, count, reply_depth, service_ids, lecture_ids):
+        """Top-level comments first, then each reply level points at the level above"""
+        if count <= 0 or not (service_ids or lecture_ids):
+            return
+
+        levels = max(0, reply_depth) + 1
+        # Roughly halve the number of comments at each deeper level
+        weights = [2 ** (levels - level) for level in range(levels)]
+        sizes = [count * w // sum(weights) for w in weights]
+        sizes[0] += count - sum(sizes)
+
+        def build_root(i):
+            on_service = service_ids and (not lecture_ids or self.rng.random() < 0.5)
+            return Comment(
+                name=self.person(),
+                email=self.email(i),
+                phone=self.phone(),
+                rating=self.rng.choices([1, 2, 3, 4, 5], weights=[1, 1, 3, 6, 9])[0],
+                comment=self.text(self.rng.randint(8, 60)),
+                is_approved=self.rng.random() < 0.8,
+                is_featured=self.rng.random() < 0.05,
+                service_id=self.rng.choice(service_ids) if on_service else None,
+                lecture_id=None if on_service else self.rng.choice(lecture_ids),
+            )
+
+        parent_ids = self.bulk_insert(Comment, sizes[0], build_root)
+        for size in sizes[1:]:
+            if not parent_ids or not size:
+                break
+            # Replies inherit the target of the comment they answer
+            # The previous level occupies one contiguous id range
+            parents = {
+                pk: (service_id, lecture_id)
+                for pk, service_id, lecture_id in Comment.objects.filter(
+                    id__gte=parent_ids[0], id__lte=parent_ids[-1],
+                ).values_list('id', 'service_id', 'lecture_id')
+            }
+            parent_list = sorted(parents)
+
+            def build_reply(i):
+                parent_id = self.rng.choice(parent_list)
+                service_id, lecture_id = parents[parent_id]
+                return Comment(
+                    name=self.person(),
+                    email=self.email(i),
+                    rating=5,
+                    comment=self.text(self.rng.randint(5, 30)),
+                    is_approved=self.rng.random() < 0.9,
+                    service_id=service_id,
+                    lecture_id=lecture_id,
+                    parent_id=parent_id,
+                )
+
+            parent_ids = self.bulk_insert(Comment, size, build_reply)
+
+    def create_appointments(self, count, service_ids, start_date, end_date):
+        if not service_ids:
+            return
+
+        def build(i):
+            status = self.rng.choice(STATUSES)
+            return Appointment(
+                name=self.person(),
+                phone=self.phone(),
+                email=self.email(i) if self.rng.random() < 0.4 else None,
+                service_id=self.rng.choice(service_ids),
+                car_model=self.rng.choice(CAR_MODELS),
+                car_year=str(self.rng.randint(1385, 1403)),
+                appointment_date=self.random_date(start_date, end_date),
+                appointment_time=dtime(self.rng.randint(8, 18), self.rng.choice([0, 30])),
+                message=self.text(self.rng.randint(0, 30)),
+                estimated_duration=f'{self.rng.randint(1, 6)} ساعت',
+                status=status,
+                is_processed=status != 'pending',
+            )
+
+        self.bulk_insert(Appointment, count, build)
+
+    def create_appointment_requests(self, count, start_date, end_date):
+        self.bulk_insert(AppointmentRequest, count, lambda i: AppointmentRequest(
+            name=self.person(),
+            phone=self.phone(),
+            email=self.email(i),
+            preferred_date=self.random_date(start_date, end_date),
+            car_model=self.rng.choice(CAR_MODELS),
+            service=self.text(3),
+            message=self.text(self.rng.randint(0, 40)),
+            is_processed=self.rng.random() < 0.7,
+        ))
+
+    def create_contact_messages(self, count):
+        self.bulk_insert(ContactMessage, count, lambda i: ContactMessage(
+            name=self.person(),
+            email=self.email(i),
+            message=self.text(self.rng.randint(10, 80)),
+            is_read=self.rng.random() < 0.6,
+        ))
@@ -0,0 +1,128 @@
+import hashlib
+import json
+
+from django.apps import apps
+from django.conf import STATICFILES_STORAGE_ALIAS, settings
+from django.contrib.staticfiles.finders import get_finders
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.files.base import ContentFile
+from django.core.files.storage import storages
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.migrations.executor import MigrationExecutor
+
+
+STAMP_NAME = '.collectstatic-stamp'
+
+
+def static_settings():
+    """
+    The settings that decide where and how collectstatic writes: a change of
+    storage backend, say to the manifest storage or S3, needs a new collect
+    even when no source file changed
+    """
+    storage = storages[STATICFILES_STORAGE_ALIAS]
+    return json.dumps({
+        'storage': f'{type(storage).__module__}.{type(storage).__qualname__}',
+        'storages': settings.STORAGES.get('staticfiles'),
+        'static_url': settings.STATIC_URL,
+        'static_root': str(settings.STATIC_ROOT),
+        'use_s3': getattr(settings, 'USE_S3', False),
+        'bucket': getattr(settings, 'AWS_STORAGE_BUCKET_NAME', None),
+    }, sort_keys=True, default=str)
+
+
+def static_tree_hash():
+    """
+    SHA-256 over the static settings and the path and content of every file
+    collectstatic would copy
+    """
+    ignore_patterns = apps.get_app_config('staticfiles').ignore_patterns
+    files = {}
+    for finder in get_finders():
+        for path, storage in finder.list(ignore_patterns):
+            prefixed = path
+            if getattr(storage, 'prefix', None):
+                prefixed = f'{storage.prefix}/{path}'
+            # First finder wins, as in collectstatic
+            files.setdefault(prefixed, (storage, path))
+
+    digest = hashlib.sha256(static_settings().encode('utf-8') + b'\0')
+    for prefixed in sorted(files):
+        storage, path = files[prefixed]
+        digest.update(prefixed.encode('utf-8') + b'\0')
+        with storage.open(path) as f:
+            for chunk in iter(lambda: f.read(65536), b''):
+                digest.update(chunk)
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def read_stamp():
+    try:
+        if not staticfiles_storage.exists(STAMP_NAME):
+            return None
+        with staticfiles_storage.open(STAMP_NAME) as f:
+            return f.read().decode('utf-8').strip()
+    except Exception:
+        return None
+
+
+def write_stamp(value):
+    if staticfiles_storage.exists(STAMP_NAME):
+        staticfiles_storage.delete(STAMP_NAME)
+    staticfiles_storage.save(STAMP_NAME, ContentFile(value.encode('utf-8')))
+
+
+class Command(BaseCommand):
+    help = 'Prepare the container for serving: migrate and collectstatic only when something changed'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Run migrate and collectstatic unconditionally',
+        )
+        parser.add_argument(
+            '--skip-migrate',
+            action='store_true',
+            help='Do not check or apply migrations',
+        )
+        parser.add_argument(
+            '--skip-collectstatic',
+            action='store_true',
+            help='Do not check or collect static files',
+        )
+        parser.add_argument(
+            '--database',
+            default=DEFAULT_DB_ALIAS,
+            help='Database to migrate (default: "default")',
+        )
+
+    def handle(self, *args, **options):
+        self.verbosity = options['verbosity']
+        if not options['skip_migrate']:
+            self.migrate(options['database'], options['force'])
+        if not options['skip_collectstatic']:
+            self.collectstatic(options['force'])
+
+    def migrate(self, database, force):
+        connection = connections[database]
+        executor = MigrationExecutor(connection)
+        plan = executor.migration_plan(executor.loader.graph.leaf_nodes())
+        if not plan and not force:
+            self.stdout.write(self.style.SUCCESS('No unapplied migrations, skipping migrate'))
+            return
+        self.stdout.write(f'Applying {len(plan)} migration(s)...')
+        call_command('migrate', database=database, interactive=False, verbosity=self.verbosity)
+
+    def collectstatic(self, force):
+        current = static_tree_hash()
+        if not force and read_stamp() == current:
+            self.stdout.write(self.style.SUCCESS(f'Static files unchanged ({current[:12]}), skipping collectstatic'))
+            return
+        self.stdout.write('Collecting static files...')
+        call_command('collectstatic', interactive=False, verbosity=self.verbosity)
+        write_stamp(current)
+        self.stdout.write(self.style.SUCCESS(f'Static files collected, stamp {current[:12]} written'))
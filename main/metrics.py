@@ -0,0 +1,351 @@
+"""
+Prometheus-format metrics shared by all gunicorn workers.
+
+Every series is a monotonically increasing number stored under its exposition
+name, e.g. ``shahin_http_responses_total{status="200",view="home"}``.
+Histograms are kept as cumulative bucket counters. The store is selected by
+METRICS_BACKEND:
+
+    memory     single process only (development and tests)
+    redis      one Redis hash shared by all workers (production)
+    directory  one JSON file per live worker in METRICS_DIRECTORY, plus one for
+               exited workers, summed on scrape
+
+Recording never raises; a broken store only costs the lost samples. Async
+code records through the ``arecord_*`` functions, which keep the Redis round
+trip and file writes off the event loop.
+"""
+import fcntl
+import json
+import logging
+import os
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+FAMILIES = {
+    'shahin_http_request_duration_seconds': ('histogram', 'Request latency in seconds by URL name.'),
+    'shahin_http_responses_total': ('counter', 'Responses by URL name and status code.'),
+    'shahin_db_queries_total': ('counter', 'Database queries executed by URL name.'),
+    'shahin_cache_requests_total': ('counter', 'Cache lookups by result.'),
+    'shahin_emails_total': ('counter', 'Outgoing emails by delivery result.'),
+    'shahin_form_submissions_total': ('counter', 'Form submissions by form and outcome.'),
+}
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def series_key(name, labels):
+    """Exposition name of one series, used as the storage key"""
+    if not labels:
+        return name
+    inner = ','.join(f'{key}="{_escape(value)}"' for key, value in sorted(labels.items()))
+    return f'{name}{{{inner}}}'
+
+
+class MemoryStore:
+    """Counters held in this process only"""
+
+    # Whether inc_many waits on I/O and must not run on an event loop
+    blocking = False
+
+    def __init__(self):
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def inc_many(self, increments):
+        with self.lock:
+            for key, amount in increments:
+                self.values[key] = self.values.get(key, 0) + amount
+
+    def snapshot(self):
+        with self.lock:
+            return dict(self.values)
+
+    def clear(self):
+        with self.lock:
+            self.values.clear()
+
+
+class RedisStore:
+    """Counters in a single Redis hash, incremented atomically by every worker"""
+
+    blocking = True
+
+    def __init__(self, url, key):
+        import redis
+        self.client = redis.Redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+        self.key = key
+
+    def inc_many(self, increments):
+        pipe = self.client.pipeline(transaction=False)
+        for series, amount in increments:
+            pipe.hincrbyfloat(self.key, series, amount)
+        pipe.execute()
+
+    def snapshot(self):
+        return {
+            field.decode('utf-8'): float(value)
+            for field, value in self.client.hgetall(self.key).items()
+        }
+
+    def clear(self):
+        self.client.delete(self.key)
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class DirectoryStore(MemoryStore):
+    """
+    Per-process counters flushed to ``<directory>/<pid>.json``.
+
+    When a worker starts, the files of exited workers are folded into
+    ``aggregate.json``, so counters never go backwards and recycled workers
+    don't pile up files.
+    Writes are throttled to one per ``flush_interval`` seconds per worker.
+    """
+
+    blocking = True
+    AGGREGATE = 'aggregate.json'
+
+    def __init__(self, directory, flush_interval=1.0):
+        super().__init__()
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.pid = os.getpid()
+        self.last_flush = 0.0
+        os.makedirs(directory, exist_ok=True)
+        self.start()
+
+    def inc_many(self, increments):
+        if os.getpid() != self.pid:
+            # Forked worker: counts inherited from the parent belong to the parent's file
+            self.pid = os.getpid()
+            self.clear()
+            self.start()
+        super().inc_many(increments)
+        if time.monotonic() - self.last_flush >= self.flush_interval:
+            self.flush()
+
+    def _locked(self, operation):
+        """Serialize compaction against scrapes: ``operation`` is fcntl.LOCK_EX or LOCK_SH"""
+        lock = open(os.path.join(self.directory, '.lock'), 'a')
+        fcntl.flock(lock, operation)
+        return lock
+
+    def _read(self, filename):
+        try:
+            with open(os.path.join(self.directory, filename), encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write(self, filename, values):
+        path = os.path.join(self.directory, filename)
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(values, f)
+        os.replace(tmp_path, path)
+
+    def start(self):
+        self.compact()
+        # A file under this pid is from an exited process that had it, or from
+        # an earlier store in this one: carry on from its counts
+        with self.lock:
+            self.values.update(self._read(f'{self.pid}.json') or {})
+
+    def compact(self):
+        """Fold the files of exited workers into the aggregate file"""
+        with self._locked(fcntl.LOCK_EX):
+            totals = self._read(self.AGGREGATE) or {}
+            folded = []
+            for filename in os.listdir(self.directory):
+                name, extension = os.path.splitext(filename)
+                if extension != '.json' or not name.isdigit():
+                    continue
+                pid = int(name)
+                if pid == self.pid or _alive(pid):
+                    continue
+                for key, amount in (self._read(filename) or {}).items():
+                    totals[key] = totals.get(key, 0) + amount
+                folded.append(filename)
+            if folded:
+                self._write(self.AGGREGATE, totals)
+                for filename in folded:
+                    os.remove(os.path.join(self.directory, filename))
+
+    def flush(self):
+        self._write(f'{self.pid}.json', super().snapshot())
+        self.last_flush = time.monotonic()
+
+    def snapshot(self):
+        self.flush()
+        totals = {}
+        with self._locked(fcntl.LOCK_SH):
+            for filename in os.listdir(self.directory):
+                if not filename.endswith('.json'):
+                    continue
+                for key, amount in (self._read(filename) or {}).items():
+                    totals[key] = totals.get(key, 0) + amount
+        return totals
+
+
+_store = None
+_store_config = None
+
+
+def get_store():
+    """The configured store, created once per process and settings combination"""
+    global _store, _store_config
+    config = (
+        getattr(settings, 'METRICS_BACKEND', 'memory'),
+        getattr(settings, 'METRICS_REDIS_URL', None),
+        getattr(settings, 'METRICS_DIRECTORY', None),
+    )
+    if _store is None or config != _store_config:
+        backend, redis_url, directory = config
+        if backend == 'redis':
+            _store = RedisStore(redis_url, getattr(settings, 'METRICS_REDIS_KEY', 'shahin:metrics'))
+        elif backend == 'directory':
+            _store = DirectoryStore(directory, getattr(settings, 'METRICS_FLUSH_INTERVAL', 1.0))
+        else:
+            _store = MemoryStore()
+        _store_config = config
+    return _store
+
+
+def enabled():
+    return getattr(settings, 'METRICS_ENABLED', False)
+
+
+def _record(increments):
+    if not enabled():
+        return
+    try:
+        get_store().inc_many(increments)
+    except Exception:
+        logger.warning('Failed to record metrics', exc_info=True)
+
+
+async def _arecord(increments):
+    if not enabled():
+        return
+    if get_store().blocking:
+        # Off the event loop, and not on the thread that sync views share
+        await sync_to_async(_record, thread_sensitive=False)(increments)
+    else:
+        _record(increments)
+
+
+def histogram_increments(name, value, labels, buckets=LATENCY_BUCKETS):
+    increments = [
+        (series_key(f'{name}_bucket', {**labels, 'le': str(bound)}), 1)
+        for bound in buckets if value <= bound
+    ]
+    increments.append((series_key(f'{name}_bucket', {**labels, 'le': '+Inf'}), 1))
+    increments.append((series_key(f'{name}_sum', labels), value))
+    increments.append((series_key(f'{name}_count', labels), 1))
+    return increments
+
+
+def request_increments(view_name, status, duration, request_metrics=None):
+    """Series for one handled request; ``request_metrics`` is a RequestMetrics or None"""
+    labels = {'view': view_name}
+    increments = histogram_increments('shahin_http_request_duration_seconds', duration, labels)
+    increments.append((series_key('shahin_http_responses_total', {**labels, 'status': str(status)}), 1))
+    if request_metrics is not None:
+        if request_metrics.db_queries:
+            increments.append((series_key('shahin_db_queries_total', labels), request_metrics.db_queries))
+        if request_metrics.cache_hits:
+            increments.append((series_key('shahin_cache_requests_total', {'result': 'hit'}), request_metrics.cache_hits))
+        if request_metrics.cache_misses:
+            increments.append((series_key('shahin_cache_requests_total', {'result': 'miss'}), request_metrics.cache_misses))
+    return increments
+
+
+def record_request(view_name, status, duration, request_metrics=None):
+    _record(request_increments(view_name, status, duration, request_metrics))
+
+
+async def arecord_request(view_name, status, duration, request_metrics=None):
+    await _arecord(request_increments(view_name, status, duration, request_metrics))
+
+
+def _form_increments(form, outcome):
+    return [(series_key('shahin_form_submissions_total', {'form': form, 'outcome': outcome}), 1)]
+
+
+def record_form_submission(form, outcome):
+    _record(_form_increments(form, outcome))
+
+
+async def arecord_form_submission(form, outcome):
+    await _arecord(_form_increments(form, outcome))
+
+
+def record_emails(result, count):
+    if count:
+        _record([(series_key('shahin_emails_total', {'result': result}), count)])
+
+
+def _family(series):
+    name = series.split('{', 1)[0]
+    for suffix in ('_bucket', '_sum', '_count'):
+        if name.endswith(suffix) and name[:-len(suffix)] in FAMILIES:
+            return name[:-len(suffix)]
+    return name
+
+
+def _sort_key(series):
+    # Keep histogram buckets in ascending "le" order within a label set
+    name, _, labels = series.partition('{')
+    bound = float('inf')
+    if 'le="' in labels:
+        le = labels.split('le="', 1)[1].split('"', 1)[0]
+        bound = float('inf') if le == '+Inf' else float(le)
+        labels = labels.replace(f'le="{le}"', '')
+    return labels, name, bound
+
+
+def _format_value(value):
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def render():
+    """Text exposition (format 0.0.4) of every stored series"""
+    values = get_store().snapshot()
+    by_family = {}
+    for series, value in values.items():
+        by_family.setdefault(_family(series), []).append((series, value))
+
+    lines = []
+    for family in sorted(set(by_family) | set(FAMILIES)):
+        kind, help_text = FAMILIES.get(family, ('untyped', ''))
+        lines.append(f'# HELP {family} {help_text}')
+        lines.append(f'# TYPE {family} {kind}')
+        for series, value in sorted(by_family.get(family, []), key=lambda item: _sort_key(item[0])):
+            lines.append(f'{series} {_format_value(value)}')
+
+    hits = values.get(series_key('shahin_cache_requests_total', {'result': 'hit'}), 0)
+    misses = values.get(series_key('shahin_cache_requests_total', {'result': 'miss'}), 0)
+    lines.append('# HELP shahin_cache_hit_ratio Share of cache lookups that were hits.')
+    lines.append('# TYPE shahin_cache_hit_ratio gauge')
+    lines.append(f'shahin_cache_hit_ratio {_format_value(hits / (hits + misses)) if hits + misses else 0}')
+    return '\n'.join(lines) + '\n'
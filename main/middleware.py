@@ -0,0 +1,167 @@
+import logging
+import random
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from . import db_routers, metrics
+from .instrumentation import RequestMetrics
+from .query_inspection import QueryInspector
+
+
+logger = logging.getLogger('main.performance')
+
+
+class PerformanceMiddleware:
+    """
+    Measure database, cache, template and view time for every request.
+
+    With PERFORMANCE_INSTRUMENTATION on, routed requests get a Server-Timing
+    header and a key=value log line on the ``main.performance`` logger. With
+    METRICS_ENABLED on, every request is added to the Prometheus metrics
+    served at /metrics. QUERY_INSPECTION_SAMPLE_RATE of requests additionally
+    have their queries checked for slow statements and N+1 patterns. When all
+    three are off the middleware removes itself from the stack at startup.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.timing = getattr(settings, 'PERFORMANCE_INSTRUMENTATION', False)
+        self.metrics = getattr(settings, 'METRICS_ENABLED', False)
+        self.sample_rate = getattr(settings, 'QUERY_INSPECTION_SAMPLE_RATE', 0.0)
+        if not (self.timing or self.metrics or self.sample_rate > 0):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+            # A sync hook would cost a thread switch per request under ASGI
+            self.process_view = self.aprocess_view
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        request_metrics, token, started = self.start(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            request_metrics.deactivate(token)
+        finished = time.perf_counter()
+        if self.metrics:
+            metrics.record_request(self.view_name(request), response.status_code, finished - started, request_metrics)
+        return self.finish(request, response, request_metrics, started, finished)
+
+    async def __acall__(self, request):
+        request_metrics, token, started = self.start(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            request_metrics.deactivate(token)
+        finished = time.perf_counter()
+        if self.metrics:
+            await metrics.arecord_request(self.view_name(request), response.status_code, finished - started, request_metrics)
+        return self.finish(request, response, request_metrics, started, finished)
+
+    def start(self, request):
+        request_metrics = RequestMetrics()
+        if self.sample_rate > 0 and random.random() < self.sample_rate:
+            request_metrics.inspector = QueryInspector()
+        request._view_started = None
+        token = request_metrics.activate()
+        return request_metrics, token, time.perf_counter()
+
+    @staticmethod
+    def view_name(request):
+        match = getattr(request, 'resolver_match', None)
+        return match.view_name if match is not None else 'unmatched'
+
+    def finish(self, request, response, request_metrics, started, finished):
+        total_time = finished - started
+
+        match = getattr(request, 'resolver_match', None)
+        if request_metrics.inspector is not None:
+            request_metrics.inspector.report(self.view_name(request), request.path)
+
+        # Only time requests that reached a view; skips static files and 404s
+        if not self.timing or match is None or request._view_started is None:
+            return response
+
+        view_time = finished - request._view_started
+        response['Server-Timing'] = request_metrics.server_timing(view_time, total_time)
+
+        fields = {
+            'method': request.method,
+            'path': request.path,
+            'view': match.view_name,
+            'status': response.status_code,
+            **request_metrics.log_fields(view_time, total_time),
+        }
+        logger.info(' '.join(f'{key}={value}' for key, value in fields.items()), extra=fields)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._view_started = time.perf_counter()
+        return None
+
+    async def aprocess_view(self, request, view_func, view_args, view_kwargs):
+        request._view_started = time.perf_counter()
+        return None
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Let safe requests read from READ_REPLICA, see main.db_routers.
+
+    A response to a request that wrote to the primary sets a short-lived
+    cookie; while it is present the client's reads stay on the primary, so
+    replication lag never hides its own writes. Removed at startup when no
+    replica is configured.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'READ_REPLICA', None):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.cookie_name = getattr(settings, 'REPLICA_STICKY_COOKIE', 'db_primary')
+        self.sticky_seconds = getattr(settings, 'REPLICA_STICKY_SECONDS', 5)
+        self.primary_paths = tuple(getattr(settings, 'REPLICA_PRIMARY_PATHS', ['/admin/']))
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        state = db_routers.RoutingState(replica=self.replica_allowed(request))
+        token = db_routers.activate(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            db_routers.deactivate(token)
+        return self.finish(request, response, state)
+
+    async def __acall__(self, request):
+        state = db_routers.RoutingState(replica=self.replica_allowed(request))
+        token = db_routers.activate(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            db_routers.deactivate(token)
+        return self.finish(request, response, state)
+
+    def finish(self, request, response, state):
+        if state.wrote or request.method not in ('GET', 'HEAD', 'OPTIONS'):
+            response.set_cookie(self.cookie_name, '1', max_age=self.sticky_seconds, httponly=True, samesite='Lax')
+        return response
+
+    def replica_allowed(self, request):
+        return (
+            request.method in ('GET', 'HEAD')
+            and not request.path.startswith(self.primary_paths)
+            and self.cookie_name not in request.COOKIES
+        )
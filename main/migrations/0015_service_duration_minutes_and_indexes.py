@@ -0,0 +1,76 @@
+# Generated by Django 4.2.7 on 2026-10-19 14:57
+
+import re
+
+from django.db import migrations, models
+
+
+# A copy of main.models.parse_duration_minutes as of this migration, so later
+# changes to the model's parser leave the backfill as it was
+PERSIAN_DIGITS = str.maketrans('۰۱۲۳۴۵۶۷۸۹٠١٢٣٤٥٦٧٨٩٫/', '01234567890123456789..')
+DURATION_UNITS = [
+    ('دقیقه', 1), ('ساعت', 60), ('روز', 1440),
+    ('min', 1), ('hour', 60), ('hr', 60), ('day', 1440),
+]
+DURATION_PART = re.compile(r'(\d+(?:\.\d+)?)(?:\s*(?:-|–|تا|الی)\s*(\d+(?:\.\d+)?))?\s*([^\d\s\-–]*)')
+DURATION_RANGE = re.compile(r'\s*(?:-|–|تا|الی)\s*')
+
+
+def parse_duration_minutes(text):
+    if not text:
+        return None
+    text = text.translate(PERSIAN_DIGITS).lower()
+    if 'نیم ساعت' in text and not re.search(r'\d', text):
+        return 30
+    total = None
+    previous_end = None
+    for match in DURATION_PART.finditer(text):
+        unit = match.group(3)
+        factor = next((minutes for word, minutes in DURATION_UNITS if unit.startswith(word)), None)
+        if factor is None:
+            continue
+        if total is None or DURATION_RANGE.fullmatch(text, previous_end, match.start()):
+            total = 0
+        total += float(match.group(2) or match.group(1)) * factor
+        previous_end = match.end()
+    return round(total) if total is not None else None
+
+
+def parse_durations(apps, schema_editor):
+    Service = apps.get_model('main', 'Service')
+    services = list(Service.objects.exclude(duration=None).exclude(duration='').only('pk', 'duration'))
+    for service in services:
+        service.duration_minutes = parse_duration_minutes(service.duration)
+    Service.objects.bulk_update(services, ['duration_minutes'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0014_alter_sitesettings_hero_video_url'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='service',
+            name='duration_minutes',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, verbose_name='مدت زمان (دقیقه)'),
+        ),
+        migrations.AddIndex(
+            model_name='service',
+            index=models.Index(fields=['is_published', 'category', '-created_at'], name='service_pub_category_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='service',
+            index=models.Index(fields=['is_published', 'is_featured', '-created_at'], name='service_pub_featured_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='service',
+            index=models.Index(fields=['is_published', 'min_price'], name='service_pub_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='service',
+            index=models.Index(fields=['is_published', 'duration_minutes'], name='service_pub_duration_idx'),
+        ),
+        migrations.RunPython(parse_durations, migrations.RunPython.noop),
+    ]
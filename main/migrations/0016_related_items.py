@@ -0,0 +1,56 @@
+# Generated by Django 4.2.7 on 2026-10-19 15:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0015_service_duration_minutes_and_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RelatedService',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveSmallIntegerField(verbose_name='رتبه')),
+                ('score', models.FloatField(verbose_name='شباهت')),
+                ('computed_at', models.DateTimeField(verbose_name='زمان محاسبه')),
+                ('source', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='related_items', to='main.service', verbose_name='سرویس')),
+                ('target', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='related_from', to='main.service', verbose_name='سرویس مرتبط')),
+            ],
+            options={
+                'verbose_name': 'سرویس مرتبط',
+                'verbose_name_plural': 'سرویس\u200cهای مرتبط',
+                'ordering': ['source', 'rank'],
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='RelatedLecture',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveSmallIntegerField(verbose_name='رتبه')),
+                ('score', models.FloatField(verbose_name='شباهت')),
+                ('computed_at', models.DateTimeField(verbose_name='زمان محاسبه')),
+                ('source', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='related_items', to='main.lecture', verbose_name='مقاله')),
+                ('target', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='related_from', to='main.lecture', verbose_name='مقاله مرتبط')),
+            ],
+            options={
+                'verbose_name': 'مقاله مرتبط',
+                'verbose_name_plural': 'مقالات مرتبط',
+                'ordering': ['source', 'rank'],
+                'abstract': False,
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='relatedservice',
+            constraint=models.UniqueConstraint(fields=('source', 'rank'), name='related_service_source_rank'),
+        ),
+        migrations.AddConstraint(
+            model_name='relatedlecture',
+            constraint=models.UniqueConstraint(fields=('source', 'rank'), name='related_lecture_source_rank'),
+        ),
+    ]
@@ -1,9 +1,18 @@
+import re
+
 from django.db import models
 from django.contrib.auth.models import User
 from django.utils.text import slugify
 from django.urls import reverse
 from django.utils import timezone
 from django.conf import settings
+from django.db.models.functions import Substr
+
+
+class LectureQuerySet(models.QuerySet):
+    def listing(self):
+        """Lecture cards: everything except the full article body"""
+        return self.defer('content')
 
 
 class Lecture(models.Model):
@@ -17,6 +26,8 @@ class Lecture(models.Model):
     updated_at = models.DateTimeField(auto_now=True, verbose_name="تاریخ بروزرسانی")
     is_published = models.BooleanField(default=True, verbose_name="منتشر شده")
 
+    objects = LectureQuerySet.as_manager()
+
     class Meta:
         verbose_name = "مقاله"
         verbose_name_plural = "مقالات"
@@ -39,8 +50,57 @@ class Lecture(models.Model):
         return reverse('lecture_detail', kwargs={'slug': self.slug})
 
 
+PERSIAN_DIGITS = str.maketrans('۰۱۲۳۴۵۶۷۸۹٠١٢٣٤٥٦٧٨٩٫/', '01234567890123456789..')
+# Unit words, in the order they are tried, and their length in minutes
+DURATION_UNITS = [
+    ('دقیقه', 1), ('ساعت', 60), ('روز', 1440),
+    ('min', 1), ('hour', 60), ('hr', 60), ('day', 1440),
+]
+DURATION_PART = re.compile(r'(\d+(?:\.\d+)?)(?:\s*(?:-|–|تا|الی)\s*(\d+(?:\.\d+)?))?\s*([^\d\s\-–]*)')
+# Between two parts with units: what comes before was only the lower bound
+DURATION_RANGE = re.compile(r'\s*(?:-|–|تا|الی)\s*')
+
+
+def parse_duration_minutes(text):
+    """
+    Minutes in a free-text duration such as "۲ ساعت", "۱ تا ۲ ساعت" or
+    "۳۰ دقیقه تا ۱ ساعت" (the upper bound) or "۱ ساعت و ۳۰ دقیقه"; None when
+    no number has a known unit.
+    """
+    if not text:
+        return None
+    text = text.translate(PERSIAN_DIGITS).lower()
+    if 'نیم ساعت' in text and not re.search(r'\d', text):
+        return 30
+    total = None
+    previous_end = None
+    for match in DURATION_PART.finditer(text):
+        unit = match.group(3)
+        factor = next((minutes for word, minutes in DURATION_UNITS if unit.startswith(word)), None)
+        if factor is None:
+            continue
+        if total is None or DURATION_RANGE.fullmatch(text, previous_end, match.start()):
+            total = 0
+        total += float(match.group(2) or match.group(1)) * factor
+        previous_end = match.end()
+    return round(total) if total is not None else None
+
+
+class ServiceQuerySet(models.QuerySet):
+    def listing(self):
+        """
+        Service cards: the start of the description as ``excerpt`` instead of
+        the whole text. Templates truncate it to at most 30 words.
+        """
+        return self.defer('description').annotate(
+            excerpt=Substr('description', 1, Service.EXCERPT_LENGTH),
+        )
+
+
 class Service(models.Model):
     """Model for storing service information"""
+    EXCERPT_LENGTH = 400
+
     name = models.CharField(max_length=200, verbose_name="نام سرویس")
     slug = models.SlugField(max_length=200, unique=True, blank=True, verbose_name="اسلاگ")
     image = models.ImageField(upload_to='services/', verbose_name="تصویر", blank=True, null=True)
@@ -52,15 +112,27 @@ class Service(models.Model):
     min_price = models.DecimalField(max_digits=10, decimal_places=0, blank=True, null=True, verbose_name="حداقل قیمت (تومان)")
     max_price = models.DecimalField(max_digits=10, decimal_places=0, blank=True, null=True, verbose_name="حداکثر قیمت (تومان)")
     duration = models.CharField(max_length=50, blank=True, null=True, verbose_name="مدت زمان")
+    # Parsed from duration on save, for filtering
+    duration_minutes = models.PositiveIntegerField(blank=True, null=True, editable=False, verbose_name="مدت زمان (دقیقه)")
     is_featured = models.BooleanField(default=False, verbose_name="ویژه")
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="تاریخ ایجاد")
     updated_at = models.DateTimeField(auto_now=True, verbose_name="تاریخ بروزرسانی")
     is_published = models.BooleanField(default=True, verbose_name="منتشر شده")
 
+    objects = ServiceQuerySet.as_manager()
+
     class Meta:
         verbose_name = "سرویس"
         verbose_name_plural = "سرویس‌ها"
         ordering = ['-created_at']
+        # The services page filters published services by one facet and
+        # orders by -created_at (see main.facets)
+        indexes = [
+            models.Index(fields=['is_published', 'category', '-created_at'], name='service_pub_category_idx'),
+            models.Index(fields=['is_published', 'is_featured', '-created_at'], name='service_pub_featured_idx'),
+            models.Index(fields=['is_published', 'min_price'], name='service_pub_price_idx'),
+            models.Index(fields=['is_published', 'duration_minutes'], name='service_pub_duration_idx'),
+        ]
 
     def __str__(self):
         return self.name
@@ -73,6 +145,10 @@ class Service(models.Model):
             if not base_slug:  # If slugify returns empty (all Persian), use uuid
                 base_slug = f'service-{uuid.uuid4().hex[:8]}'
             self.slug = base_slug
+        self.duration_minutes = parse_duration_minutes(self.duration)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'duration' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'duration_minutes'}
         super().save(*args, **kwargs)
 
     def get_absolute_url(self):
@@ -283,4 +359,49 @@ class Appointment(models.Model):
             return f"از {self.service.min_price:,} تومان"
         elif self.service.max_price:
             return f"تا {self.service.max_price:,} تومان"
-        return "قیمت نامشخص"
\ No newline at end of file
+        return "قیمت نامشخص"
+
+
+class RelatedItem(models.Model):
+    """
+    A precomputed "related" pick: ``target`` is one of the ``source``'s
+    nearest neighbours by TF-IDF cosine similarity. Written by the
+    build_related command (main.recommendations), read by the detail pages.
+    """
+    rank = models.PositiveSmallIntegerField(verbose_name="رتبه")
+    score = models.FloatField(verbose_name="شباهت")
+    computed_at = models.DateTimeField(verbose_name="زمان محاسبه")
+
+    class Meta:
+        abstract = True
+        ordering = ['source', 'rank']
+
+
+class RelatedLecture(RelatedItem):
+    source = models.ForeignKey(Lecture, on_delete=models.CASCADE, related_name='related_items', verbose_name="مقاله")
+    # Kept as NULL when the target is deleted, so the next build sees the gap
+    target = models.ForeignKey(
+        Lecture, on_delete=models.SET_NULL, null=True, related_name='related_from', verbose_name="مقاله مرتبط",
+    )
+
+    class Meta(RelatedItem.Meta):
+        verbose_name = "مقاله مرتبط"
+        verbose_name_plural = "مقالات مرتبط"
+        constraints = [
+            models.UniqueConstraint(fields=['source', 'rank'], name='related_lecture_source_rank'),
+        ]
+
+
+class RelatedService(RelatedItem):
+    source = models.ForeignKey(Service, on_delete=models.CASCADE, related_name='related_items', verbose_name="سرویس")
+    # Kept as NULL when the target is deleted, so the next build sees the gap
+    target = models.ForeignKey(
+        Service, on_delete=models.SET_NULL, null=True, related_name='related_from', verbose_name="سرویس مرتبط",
+    )
+
+    class Meta(RelatedItem.Meta):
+        verbose_name = "سرویس مرتبط"
+        verbose_name_plural = "سرویس‌های مرتبط"
+        constraints = [
+            models.UniqueConstraint(fields=['source', 'rank'], name='related_service_source_rank'),
+        ]
@@ -0,0 +1,120 @@
+"""
+Sampled slow-query and N+1 detection.
+
+PerformanceMiddleware attaches a QueryInspector to QUERY_INSPECTION_SAMPLE_RATE
+of requests. Every query of a sampled request is fingerprinted (literals and
+parameters replaced by ``?``) and timed. When the request finishes, queries
+slower than SLOW_QUERY_THRESHOLD_MS and fingerprints repeated at least
+N_PLUS_ONE_THRESHOLD times are written to the ``main.queries`` logger as
+
+    query_inspection {"kind": "slow_query", "view": ..., "fingerprint": ..., ...}
+
+which ``manage.py perf_report`` aggregates into the top offenders.
+"""
+import json
+import logging
+import os
+import re
+import traceback
+
+from django.conf import settings
+
+
+logger = logging.getLogger('main.queries')
+
+LOG_MARKER = 'query_inspection '
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Our own instrumentation shows up in every stack; the interesting frame is
+# the view, serializer or template tag that issued the query.
+_SKIPPED_FILES = {
+    os.path.join(APP_DIR, name)
+    for name in ('instrumentation.py', 'middleware.py', 'query_inspection.py')
+}
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r'(?<![\w."`])-?\d+(?:\.\d+)?\b')
+_PLACEHOLDER = re.compile(r'%s|%\(\w+\)s|\?')
+_IN_LIST = re.compile(r'\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)', re.IGNORECASE)
+_WHITESPACE = re.compile(r'\s+')
+# The verbose log format also prints the module name, so anchor on the JSON
+_LOG_RECORD = re.compile(re.escape(LOG_MARKER) + r'(\{.*\})\s*$')
+
+
+def fingerprint(sql):
+    """SQL with literals and parameters normalized, so repeated shapes compare equal"""
+    sql = _STRING_LITERAL.sub('?', sql)
+    sql = _NUMBER_LITERAL.sub('?', sql)
+    sql = _PLACEHOLDER.sub('?', sql)
+    sql = _IN_LIST.sub('IN (...)', sql)
+    return _WHITESPACE.sub(' ', sql).strip()
+
+
+def app_frame():
+    """'main/views.py:123 in home' for the innermost frame inside this app, or ''"""
+    for frame in reversed(traceback.extract_stack()):
+        if frame.filename.startswith(APP_DIR) and frame.filename not in _SKIPPED_FILES:
+            path = os.path.relpath(frame.filename, os.path.dirname(APP_DIR))
+            return f'{path}:{frame.lineno} in {frame.name}'
+    return ''
+
+
+class QueryInspector:
+    """Fingerprints and timings of the queries of one sampled request"""
+
+    def __init__(self, slow_threshold_ms=None, repeat_threshold=None):
+        if slow_threshold_ms is None:
+            slow_threshold_ms = getattr(settings, 'SLOW_QUERY_THRESHOLD_MS', 100)
+        if repeat_threshold is None:
+            repeat_threshold = getattr(settings, 'N_PLUS_ONE_THRESHOLD', 5)
+        self.slow_threshold = slow_threshold_ms / 1000
+        self.repeat_threshold = repeat_threshold
+        # fingerprint -> [count, total seconds, first frame]
+        self.fingerprints = {}
+        self.slow_queries = []
+
+    def add(self, sql, duration):
+        key = fingerprint(sql)
+        entry = self.fingerprints.get(key)
+        if entry is None:
+            self.fingerprints[key] = [1, duration, app_frame()]
+        else:
+            entry[0] += 1
+            entry[1] += duration
+        if duration >= self.slow_threshold:
+            self.slow_queries.append({
+                'fingerprint': key,
+                'duration_ms': round(duration * 1000, 1),
+                'frame': app_frame(),
+            })
+
+    def findings(self):
+        """Slow queries and suspected N+1 fingerprints, as log records"""
+        records = [{'kind': 'slow_query', **query} for query in self.slow_queries]
+        for key, (count, total, frame) in self.fingerprints.items():
+            if count >= self.repeat_threshold:
+                records.append({
+                    'kind': 'n_plus_one',
+                    'fingerprint': key,
+                    'count': count,
+                    'duration_ms': round(total * 1000, 1),
+                    'frame': frame,
+                })
+        return records
+
+    def report(self, view_name, path):
+        for record in self.findings():
+            record = {'view': view_name, 'path': path, **record}
+            logger.warning(LOG_MARKER + json.dumps(record, ensure_ascii=False))
+
+
+def parse_log_line(line):
+    """The record logged by QueryInspector.report on this line, or None"""
+    match = _LOG_RECORD.search(line)
+    if match is None:
+        return None
+    try:
+        return json.loads(match.group(1))
+    except ValueError:
+        return None
@@ -0,0 +1,241 @@
+"""
+Related lectures and services by TF-IDF cosine similarity.
+
+The build_related command vectorizes every published item's normalized
+Persian text and stores each item's top-k neighbours in RelatedLecture and
+RelatedService. Detail pages then read their picks with one indexed join
+(``related``).
+
+A full build compares all pairs in batched matrix products over sparse
+TF-IDF rows. An incremental build only recomputes the items saved since the
+previous build, plus the items whose stored neighbours they displace or were
+among. The vocabulary
+and IDF weights are rebuilt from the current corpus every run; a periodic
+full build keeps scores from drifting apart as the corpus changes.
+"""
+import re
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.html import strip_tags
+
+from .models import Lecture, RelatedLecture, RelatedService, Service
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - numpy is only needed by build_related
+    np = None
+
+
+# kind -> (model, related model, (field, weight) pairs whose text is vectorized)
+KINDS = {
+    'lecture': (Lecture, RelatedLecture, [('title', 3), ('teaser', 2), ('content', 1)]),
+    'service': (Service, RelatedService, [('name', 3), ('description', 1)]),
+}
+
+CHARACTER_MAP = str.maketrans({
+    'ي': 'ی', 'ى': 'ی', 'ك': 'ک', 'ة': 'ه', 'ۀ': 'ه', 'أ': 'ا', 'إ': 'ا', 'آ': 'ا',
+    '‌': ' ', 'ـ': None,
+    **{chr(0x06F0 + i): str(i) for i in range(10)},
+    **{chr(0x0660 + i): str(i) for i in range(10)},
+})
+DIACRITICS = re.compile('[ً-ٰٟ]')
+TOKEN = re.compile(r'\w{2,}')
+STOPWORDS = frozenset('''
+    و در به از که این آن با برای را تا یا هم نیز اما اگر چه می ها های هر بر است بود شود شده
+    کرد کند کنید کنیم داشت دارد دارند باشد باید یک دو همه خود ما شما او آنها ایشان نه بی پس
+    چون روی زیر بین بعد قبل مانند حتی همین همان دیگر کار خیلی بسیار ای تر ترین the and for with of to in
+'''.split())
+
+
+def normalize(text):
+    """Lowercased Persian text with unified letters and digits, and no markup or diacritics"""
+    text = strip_tags(text or '').translate(CHARACTER_MAP).lower()
+    return DIACRITICS.sub('', text)
+
+
+def tokens(text):
+    return [token for token in TOKEN.findall(normalize(text)) if token not in STOPWORDS]
+
+
+def document(item, fields):
+    counts = Counter()
+    for field, weight in fields:
+        for token in tokens(getattr(item, field)):
+            counts[token] += weight
+    return counts
+
+
+class SparseRows:
+    """
+    Row-compressed float32 matrix (the CSR layout: ``data`` and column
+    ``indices`` of row i at ``indptr[i]:indptr[i + 1]``). Memory grows with
+    the number of terms the documents use, not with n x vocabulary.
+    """
+
+    def __init__(self, data, indices, indptr, columns):
+        self.data = data
+        self.indices = indices
+        self.indptr = indptr
+        self.shape = (len(indptr) - 1, columns)
+
+    def dense(self, rows):
+        block = np.zeros((len(rows), self.shape[1]), dtype=np.float32)
+        for i, row in enumerate(rows):
+            start, end = self.indptr[row], self.indptr[row + 1]
+            block[i, self.indices[start:end]] = self.data[start:end]
+        return block
+
+    def similarity(self, rows, batch_size=512):
+        """``len(rows) x n`` dot products, densifying ``batch_size`` rows of the other side at a time"""
+        left = self.dense(rows)
+        n = self.shape[0]
+        out = np.empty((len(rows), n), dtype=np.float32)
+        for start in range(0, n, batch_size):
+            end = min(start + batch_size, n)
+            out[:, start:end] = left @ self.dense(range(start, end)).T
+        return out
+
+
+def tfidf_matrix(documents, max_features=5000, min_df=1, max_df=0.5):
+    """
+    L2-normalized TF-IDF rows (sublinear tf, smoothed idf) as SparseRows.
+    Terms in more than ``max_df`` of the documents say nothing about
+    similarity and are dropped, except in a corpus too small to tell.
+    """
+    n = len(documents)
+    df = Counter()
+    for counts in documents:
+        df.update(counts.keys())
+    limit = max_df * n if n > 10 else n
+    vocabulary = [term for term, count in df.most_common() if min_df <= count <= limit][:max_features]
+    index = {term: i for i, term in enumerate(vocabulary)}
+
+    indices, data, indptr = [], [], [0]
+    for counts in documents:
+        for term, count in counts.items():
+            if term in index:
+                indices.append(index[term])
+                data.append(count)
+        indptr.append(len(indices))
+    indices = np.array(indices, dtype=np.intp)
+    indptr = np.array(indptr, dtype=np.intp)
+    data = np.log1p(np.array(data, dtype=np.float32))
+    document_frequency = np.array([df[term] for term in vocabulary], dtype=np.float32)
+    data *= (np.log((1 + n) / (1 + document_frequency)) + 1)[indices]
+    row_of = np.repeat(np.arange(n), np.diff(indptr))
+    norms = np.sqrt(np.bincount(row_of, weights=data * data, minlength=n)).astype(np.float32)
+    norms[norms == 0] = 1
+    data /= norms[row_of]
+    return SparseRows(data, indices, indptr, len(vocabulary))
+
+
+def top_k(matrix, rows, k, batch_size=512):
+    """
+    ``(row, neighbour indices, scores)`` for each of ``rows``, best first,
+    from one ``batch x n`` similarity product per batch. Neighbours with no
+    term in common (score 0) are left out.
+    """
+    n = matrix.shape[0]
+    k = min(k, n - 1)
+    if k <= 0:
+        return
+    rows = np.asarray(rows)
+    for start in range(0, len(rows), batch_size):
+        batch = rows[start:start + batch_size]
+        similarity = matrix.similarity(batch, batch_size)
+        similarity[np.arange(len(batch)), batch] = -1
+        candidates = np.argpartition(-similarity, k - 1, axis=1)[:, :k]
+        scores = np.take_along_axis(similarity, candidates, axis=1)
+        order = np.argsort(-scores, axis=1, kind='stable')
+        candidates = np.take_along_axis(candidates, order, axis=1)
+        scores = np.take_along_axis(scores, order, axis=1)
+        for row, neighbours, row_scores in zip(batch, candidates, scores):
+            keep = row_scores > 0
+            yield int(row), neighbours[keep], row_scores[keep]
+
+
+def affected_rows(matrix, ids, stored, changed, k, batch_size=512):
+    """
+    Indices whose neighbours must be recomputed after ``changed`` (indices)
+    were edited: the changed rows themselves, rows that listed one of them
+    or lost a neighbour (unpublished, or deleted and stored as None), and
+    rows that a changed row now beats their k-th neighbour for.
+    """
+    position = {pk: i for i, pk in enumerate(ids)}
+    changed_ids = {ids[i] for i in changed}
+    thresholds = np.zeros(len(ids), dtype=np.float32)
+    affected = set(changed)
+    for source, picks in stored.items():
+        if source not in position:
+            continue
+        targets = [target for target, _score in picks]
+        if changed_ids.intersection(targets) or any(target not in position for target in targets):
+            affected.add(position[source])
+        elif len(picks) >= k:
+            thresholds[position[source]] = picks[-1][1]
+    changed = np.asarray(sorted(changed), dtype=np.intp)
+    beaten = np.zeros(len(ids), dtype=bool)
+    for start in range(0, len(changed), batch_size):
+        similarity = matrix.similarity(changed[start:start + batch_size], batch_size)
+        beaten |= (similarity > thresholds[None, :]).any(axis=0)
+    affected.update(int(i) for i in np.flatnonzero(beaten))
+    return sorted(affected)
+
+
+def build(kind, k=3, full=False, max_features=5000, batch_size=512):
+    """
+    Recompute related items for ``kind``; returns ``(items, recomputed)``.
+    Without ``full``, only items saved since the last build and those their
+    changes affect are recomputed; a first build is always full.
+    """
+    if np is None:
+        raise RuntimeError('NumPy is required to build related items')
+    model, related_model, fields = KINDS[kind]
+    started = timezone.now()
+    last_build = related_model.objects.aggregate(last=Max('computed_at'))['last']
+    full = full or last_build is None
+
+    items = list(model.objects.filter(is_published=True).only('pk', 'updated_at', *[f for f, _w in fields]).order_by('pk'))
+    ids = [item.pk for item in items]
+    matrix = tfidf_matrix([document(item, fields) for item in items], max_features=max_features)
+
+    if full:
+        rows = range(len(items))
+    else:
+        changed = [i for i, item in enumerate(items) if item.updated_at >= last_build]
+        stored = {}
+        for source, target, score in related_model.objects.order_by('source', 'rank').values_list('source', 'target', 'score'):
+            stored.setdefault(source, []).append((target, score))
+        # Sources that were unpublished since keep no picks
+        stale = set(stored) - set(ids)
+        rows = affected_rows(matrix, ids, stored, changed, k, batch_size)
+        related_model.objects.filter(source__in=stale).delete()
+
+    picks = [
+        related_model(source_id=ids[row], target_id=ids[neighbour], rank=rank, score=float(score), computed_at=started)
+        for row, neighbours, scores in top_k(matrix, list(rows), k, batch_size)
+        for rank, (neighbour, score) in enumerate(zip(neighbours, scores), start=1)
+    ]
+    with transaction.atomic():
+        if full:
+            related_model.objects.all().delete()
+        else:
+            related_model.objects.filter(source__in=[ids[row] for row in rows]).delete()
+        related_model.objects.bulk_create(picks, batch_size=1000)
+    return len(items), len(rows)
+
+
+def related(item, limit=3):
+    """
+    The published items related to ``item``, best first: its precomputed
+    picks when there are any, else the most recent others
+    """
+    model = type(item)
+    queryset = model.objects.listing().filter(is_published=True)
+    picks = list(queryset.filter(related_from__source=item).order_by('related_from__rank')[:limit])
+    if picks:
+        return picks
+    return list(queryset.exclude(pk=item.pk)[:limit])
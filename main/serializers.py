@@ -1,8 +1,125 @@
-from rest_framework import serializers
+from django.conf import settings
+from django.utils import timezone
+from django.utils.encoding import filepath_to_uri
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings
 from .models import Lecture, Service, ContactMessage, SiteSettings, Appointment
 
 
-class LectureSerializer(serializers.ModelSerializer):
+def format_price_range(min_price, max_price):
+    if min_price and max_price:
+        return f"{min_price:,} - {max_price:,} تومان"
+    elif min_price:
+        return f"از {min_price:,} تومان"
+    elif max_price:
+        return f"تا {max_price:,} تومان"
+    return "قیمت نامشخص"
+
+
+class SparseFieldsMixin:
+    """
+    ModelSerializer that can be narrowed to a subset of its fields, e.g.
+    ``LectureSerializer(lectures, many=True, fields=['id', 'title'])``.
+    """
+    # Fields computed from model columns rather than read from one:
+    # name -> (columns, function of those column values)
+    computed_fields = {}
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+    def columns(self):
+        """Model columns, and queryset annotations, that the remaining fields read"""
+        columns = []
+        for name, field in self.fields.items():
+            if name in self.computed_fields:
+                needed = self.computed_fields[name][0]
+            else:
+                needed = [field.source.split('.')[0]]
+            columns.extend(c for c in needed if c not in columns)
+        return columns
+
+
+class ValuesRenderer:
+    """
+    Builds the same dicts as ``serializer_class`` straight from ``.values()``
+    rows, for read endpoints where per-field DRF overhead dominates. Storage
+    URLs are resolved to a prefix once, not per row.
+    """
+
+    def __init__(self, serializer_class, fields=None, request=None):
+        serializer = serializer_class(fields=fields, context={'request': request})
+        self.columns = serializer.columns()
+        model = serializer.Meta.model
+        # (name, column, convert); a None column passes the whole row to convert
+        self.plan = []
+        for name, field in serializer.fields.items():
+            if name in serializer.computed_fields:
+                columns, function = serializer.computed_fields[name]
+                self.plan.append((name, None, lambda row, c=columns, f=function: f(*(row[x] for x in c))))
+            elif isinstance(field, serializers.FileField):
+                storage = model._meta.get_field(field.source).storage
+                self.plan.append((name, field.source, self.file_url(storage, request)))
+            elif isinstance(field, serializers.DateTimeField):
+                self.plan.append((name, field.source, self.datetime_iso(field)))
+            elif isinstance(field, (serializers.DateField, serializers.TimeField, serializers.DecimalField)):
+                self.plan.append((name, field.source, field.to_representation))
+            else:
+                self.plan.append((name, field.source, None))
+
+    @staticmethod
+    def file_url(storage, request):
+        probe = '__probe__'
+        url = storage.url(probe)
+        if request is not None:
+            url = request.build_absolute_uri(url)
+        if url.endswith(probe):
+            prefix = url[:-len(probe)]
+            return lambda name: prefix + filepath_to_uri(name) if name else None
+        # Signed or otherwise per-file URLs
+        if request is not None:
+            return lambda name: request.build_absolute_uri(storage.url(name)) if name else None
+        return lambda name: storage.url(name) if name else None
+
+    @staticmethod
+    def datetime_iso(field):
+        """DateTimeField.to_representation with the timezone looked up once"""
+        output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+        if output_format is None or output_format.lower() != ISO_8601 or not settings.USE_TZ:
+            return field.to_representation
+        tz = field.timezone if hasattr(field, 'timezone') else field.default_timezone()
+
+        def convert(value):
+            if timezone.is_aware(value):
+                value = value.astimezone(tz)
+            value = value.isoformat()
+            return value[:-6] + 'Z' if value.endswith('+00:00') else value
+        return convert
+
+    def values(self, queryset):
+        return queryset.values(*self.columns)
+
+    def render(self, rows):
+        data = []
+        for row in rows:
+            item = {}
+            for name, column, convert in self.plan:
+                if column is None:
+                    item[name] = convert(row)
+                    continue
+                value = row[column]
+                if value is None or convert is None:
+                    item[name] = value
+                else:
+                    item[name] = convert(value)
+            data.append(item)
+        return data
+
+
+class LectureSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Serializer for Lecture model"""
     class Meta:
         model = Lecture
@@ -10,24 +127,35 @@ class LectureSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'slug', 'created_at', 'updated_at']
 
 
-class ServiceSerializer(serializers.ModelSerializer):
+class LectureListSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    """Lecture cards: LectureSerializer without the full content"""
+    class Meta:
+        model = Lecture
+        fields = ['id', 'title', 'slug', 'image', 'teaser', 'created_at', 'updated_at', 'is_published']
+
+
+class ServiceSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Serializer for Service model"""
     video = serializers.FileField(required=False, allow_null=True)
     price_range = serializers.SerializerMethodField()
 
+    computed_fields = {'price_range': (['min_price', 'max_price'], format_price_range)}
+
     class Meta:
         model = Service
         fields = ['id', 'name', 'slug', 'image', 'description', 'video', 'instagram_link', 'min_price', 'max_price', 'duration', 'price_range', 'created_at', 'updated_at', 'is_published']
         read_only_fields = ['id', 'slug', 'created_at', 'updated_at']
     
     def get_price_range(self, obj):
-        if obj.min_price and obj.max_price:
-            return f"{obj.min_price:,} - {obj.max_price:,} تومان"
-        elif obj.min_price:
-            return f"از {obj.min_price:,} تومان"
-        elif obj.max_price:
-            return f"تا {obj.max_price:,} تومان"
-        return "قیمت نامشخص"
+        return format_price_range(obj.min_price, obj.max_price)
+
+
+class ServiceListSerializer(ServiceSerializer):
+    """Service cards: ``excerpt`` from ``Service.objects.listing()`` instead of the full description"""
+    excerpt = serializers.CharField(read_only=True)
+
+    class Meta(ServiceSerializer.Meta):
+        fields = ['id', 'name', 'slug', 'image', 'excerpt', 'video', 'instagram_link', 'min_price', 'max_price', 'duration', 'price_range', 'created_at', 'updated_at', 'is_published']
 
 
 class ContactMessageSerializer(serializers.ModelSerializer):
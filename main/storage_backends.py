@@ -1,5 +1,21 @@
+import gzip
+import re
+
 from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestFilesMixin
+from django.core.files.base import ContentFile
 from storages.backends.s3boto3 import S3Boto3Storage
+from whitenoise.storage import CompressedManifestStaticFilesStorage
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli is optional
+    brotli = None
+
+
+# ManifestFilesMixin inserts a 12 character md5 prefix before the extension
+HASHED_NAME = re.compile(r'\.[0-9a-f]{12}\.[^/]+$')
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
 
 
 class StaticStorage(S3Boto3Storage):
@@ -58,3 +74,74 @@ class StaticMediaStorage(S3Boto3Storage):
             'signature_version': getattr(settings, 'AWS_S3_SIGNATURE_VERSION', 's3v4'),
         })
         super().__init__(*args, **kwargs)
+
+
+class VendoredReferencesMixin(ManifestFilesMixin):
+    """
+    Leaves url() references to files a vendored package was shipped without
+    as written, instead of failing post-processing, so vendored CSS stays
+    byte-for-byte as released.
+    """
+    # Font Awesome's all.min.css declares a v4-compatibility font that is not vendored
+    missing_references = ('fontawesome/webfonts/fa-v4compatibility.',)
+
+    def hashed_name(self, name, content=None, filename=None):
+        if content is None and name.startswith(self.missing_references) and not self.exists(filename or name):
+            return name
+        return super().hashed_name(name, content, filename)
+
+
+class PrecompressedManifestMixin(VendoredReferencesMixin):
+    """
+    Content-hashed file names plus ``.br`` and ``.gz`` siblings for every
+    hashed text asset, written during collectstatic's post-processing.
+    """
+    compress_extensions = ('.css', '.js', '.svg', '.ttf', '.json', '.txt', '.xml', '.ico')
+    # Skip variants that save less than this fraction of the original size
+    min_saving = 0.05
+
+    def post_process(self, paths, dry_run=False, **options):
+        hashed_names = set()
+        for name, hashed_name, processed in super().post_process(paths, dry_run, **options):
+            if hashed_name and not isinstance(processed, Exception):
+                hashed_names.add(hashed_name)
+            yield name, hashed_name, processed
+        if dry_run:
+            return
+        for hashed_name in sorted(hashed_names):
+            for compressed_name in self.compress(hashed_name):
+                yield hashed_name, compressed_name, True
+
+    def compress(self, name):
+        if not name.lower().endswith(self.compress_extensions):
+            return
+        with self.open(name) as f:
+            content = f.read()
+        variants = [('.gz', gzip.compress(content, compresslevel=9, mtime=0))]
+        if brotli is not None:
+            variants.insert(0, ('.br', brotli.compress(content)))
+        for suffix, data in variants:
+            if len(data) > len(content) * (1 - self.min_saving):
+                continue
+            compressed_name = name + suffix
+            if self.exists(compressed_name):
+                self.delete(compressed_name)
+            yield self._save(compressed_name, ContentFile(data))
+
+
+class ManifestStaticStorage(PrecompressedManifestMixin, StaticStorage):
+    """
+    S3 static storage with hashed names. Hashed objects never change, so they
+    are uploaded as immutable for a year; the manifest and the original names
+    keep the bucket's default Cache-Control.
+    """
+
+    def get_object_parameters(self, name):
+        params = super().get_object_parameters(name)
+        if HASHED_NAME.search(name):
+            params['CacheControl'] = IMMUTABLE_CACHE_CONTROL
+        return params
+
+
+class CompressedManifestStaticStorage(VendoredReferencesMixin, CompressedManifestStaticFilesStorage):
+    """WhiteNoise's hashed and compressed local storage, tolerating missing vendored files"""
@@ -0,0 +1,59 @@
+"""
+Template tags for the files ``manage.py build_assets`` writes to static/build/.
+
+    {% load assets %}
+    {% assets_built as built %}
+    {% if built %}<style>{% inline_static 'build/critical.css' %}</style>{% endif %}
+"""
+import functools
+import posixpath
+import re
+
+from django import template
+from django.contrib.staticfiles import finders
+from django.templatetags.static import static
+from django.utils.safestring import mark_safe
+
+
+register = template.Library()
+
+CRITICAL_CSS = 'build/critical.css'
+RELATIVE_URL = re.compile(r'''url\(\s*(['"]?)(?!data:|https?:|//|/|#)([^'")]+)\1\s*\)''')
+
+
+@functools.lru_cache(maxsize=None)
+def _read_static(path):
+    found = finders.find(path)
+    if not found:
+        return None
+    with open(found, encoding='utf-8') as f:
+        return f.read()
+
+
+def _absolute_url(path, match):
+    """Resolve a url() relative to the stylesheet, so it survives inlining"""
+    name = posixpath.normpath(posixpath.join(posixpath.dirname(path), match.group(2)))
+    try:
+        return f'url("{static(name)}")'
+    except ValueError:
+        # Not in the manifest; leave the reference as it was
+        return match.group(0)
+
+
+def reset():
+    _read_static.cache_clear()
+
+
+@register.simple_tag
+def assets_built():
+    """True once build_assets has written static/build/"""
+    return _read_static(CRITICAL_CSS) is not None
+
+
+@register.simple_tag
+def inline_static(path):
+    """Contents of a static stylesheet, for a <style> block"""
+    css = _read_static(path)
+    if css is None:
+        return ''
+    return mark_safe(RELATIVE_URL.sub(functools.partial(_absolute_url, path), css))
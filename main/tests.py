@@ -0,0 +1,1268 @@
+"""
+Query-count regression tests for the public views and API endpoints.
+
+Every view in ``main/views.py`` and every endpoint in ``main/api_urls.py`` is
+exercised against a realistic fixture volume and pinned to an exact query
+budget. A budget that starts to grow with the number of rows is an N+1.
+
+Run on SQLite with:
+    python manage.py test --settings=shahin_auto.settings_test
+"""
+import asyncio
+import datetime
+import decimal
+import gzip
+import importlib
+import json
+import os
+import re
+import tempfile
+import threading
+import zoneinfo
+from io import BytesIO, StringIO
+from unittest import mock
+
+import numpy as np
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.contrib.sessions.models import Session
+from django.contrib.staticfiles.storage import StaticFilesStorage
+from asgiref.sync import async_to_sync, sync_to_async
+from django.core import mail
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import AsyncClient, TestCase, RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+
+from . import content_cache, db_routers, events, facets, fast_json, health, metrics, recommendations, views
+from .db_backends.mysql_pool.base import ConnectionPool, PoolTimeout
+from .instrumentation import RequestMetrics
+from .mail import notify_admin
+from .query_inspection import LOG_MARKER, QueryInspector, fingerprint
+from .serializers import LectureSerializer, ServiceListSerializer, ServiceSerializer, ValuesRenderer
+from .storage_backends import HASHED_NAME, PrecompressedManifestMixin
+from .templatetags import assets
+from .models import (
+    Lecture, Service, ContactMessage, SiteSettings, Bonus, AppointmentRequest,
+    Appointment, ServiceCategory, Comment, RelatedLecture, RelatedService, parse_duration_minutes,
+)
+
+
+# Fixture volumes: large enough that any per-row query shows up as a budget
+# failure, small enough to keep the suite fast.
+CATEGORY_COUNT = 6
+SERVICE_COUNT = 40
+LECTURE_COUNT = 40
+COMMENT_COUNT = 30
+APPOINTMENT_COUNT = 60
+APPOINTMENT_REQUEST_COUNT = 25
+CONTACT_MESSAGE_COUNT = 25
+
+
+class QueryBudgetTestCase(TestCase):
+    """Seeds the database once per class with realistic content volumes"""
+
+    @classmethod
+    def setUpTestData(cls):
+        SiteSettings.objects.create()
+        Bonus.objects.create(name='پکیج ویژه', description='تخفیف تعویض روغن', image='bonus/bonus.jpg')
+
+        categories = ServiceCategory.objects.bulk_create([
+            ServiceCategory(name=f'دسته {i}', slug=f'category-{i}')
+            for i in range(CATEGORY_COUNT)
+        ])
+        services = Service.objects.bulk_create([
+            Service(
+                name=f'سرویس {i}',
+                slug=f'service-{i}',
+                image=f'services/service-{i}.jpg',
+                description='شستشو و بررسی کامل موتور ' * 20,
+                category=categories[i % CATEGORY_COUNT],
+                min_price=500000 + i * 1000,
+                max_price=900000 + i * 1000,
+                duration='۲ ساعت',
+                is_featured=i % 5 == 0,
+            )
+            for i in range(SERVICE_COUNT)
+        ])
+        lectures = Lecture.objects.bulk_create([
+            Lecture(
+                title=f'مقاله {i}',
+                slug=f'lecture-{i}',
+                image=f'lectures/lecture-{i}.jpg',
+                content='نگهداری صحیح خودرو ' * 200,
+                teaser='راهنمای کوتاه نگهداری خودرو',
+            )
+            for i in range(LECTURE_COUNT)
+        ])
+
+        cls.service = services[0]
+        cls.lecture = lectures[0]
+
+        parents = Comment.objects.bulk_create([
+            Comment(
+                name=f'کاربر {i}', email=f'user{i}@example.com', rating=i % 5 + 1,
+                comment='سرویس عالی بود', is_approved=True,
+                service=cls.service, lecture=cls.lecture,
+            )
+            for i in range(COMMENT_COUNT)
+        ])
+        Comment.objects.bulk_create([
+            Comment(
+                name='پشتیبانی', email='support@example.com', rating=5,
+                comment='ممنون از نظر شما', is_approved=True,
+                service=cls.service, lecture=cls.lecture, parent=parent,
+            )
+            for parent in parents
+        ])
+
+        today = datetime.date.today()
+        Appointment.objects.bulk_create([
+            Appointment(
+                name=f'مشتری {i}', phone='09120000000', service=services[i % SERVICE_COUNT],
+                car_model='پژو ۲۰۶', appointment_date=today + datetime.timedelta(days=i % 30),
+                appointment_time=datetime.time(9 + i % 8),
+            )
+            for i in range(APPOINTMENT_COUNT)
+        ])
+        AppointmentRequest.objects.bulk_create([
+            AppointmentRequest(name=f'مشتری {i}', phone='09120000000', service='تعویض روغن')
+            for i in range(APPOINTMENT_REQUEST_COUNT)
+        ])
+        ContactMessage.objects.bulk_create([
+            ContactMessage(name=f'مشتری {i}', email=f'c{i}@example.com', message='سوال درباره سرویس')
+            for i in range(CONTACT_MESSAGE_COUNT)
+        ])
+
+        cls.staff = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+
+    def setUp(self):
+        # Rate limit counters and dashboard totals live in the cache
+        cache.clear()
+
+
+class PublicViewQueryTests(QueryBudgetTestCase):
+    """Query budgets for the server-rendered pages in main.views"""
+
+    def test_home(self):
+        # site settings, bonus, services, recent lectures
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse('home'))
+        self.assertEqual(response.status_code, 200)
+        # Services and their quick-view data come from the content cache afterwards
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('home'))
+        quickview = json.loads(re.search(
+            r'<script id="service-quickview" type="application/json">(.*?)</script>', response.content.decode(), re.S,
+        ).group(1))
+        self.assertEqual(list(quickview), [service['slug'] for service in response.context['services']])
+        first = quickview[response.context['services'][0]['slug']]
+        self.assertEqual(set(first), {'name', 'slug', 'image', 'excerpt', 'truncated', 'instagram_link'})
+        self.assertTrue(first['image'].startswith(settings.MEDIA_URL))
+
+    def test_home_quickview_cuts_at_a_word(self):
+        self.assertEqual(views._summary('روغن موتور'), ('روغن موتور', False))
+        text, truncated = views._summary(('تعویض روغن، ' * 50)[:Service.EXCERPT_LENGTH])
+        self.assertTrue(truncated)
+        self.assertTrue(text.endswith('روغن…') or text.endswith('تعویض…'))
+        self.assertTrue(('تعویض روغن، ' * 50).startswith(text[:-1]))
+
+    def test_lectures_list(self):
+        # site settings, page count, page rows
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('lectures_list'))
+        self.assertEqual(response.status_code, 200)
+
+    def test_lectures_list_last_page(self):
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('lectures_list'), {'page': 5})
+        self.assertEqual(response.status_code, 200)
+
+    def test_lecture_detail(self):
+        # site settings, lecture, precomputed related lectures (none built
+        # here), recent lectures instead, comments
+        with self.assertNumQueries(5):
+            response = self.client.get(reverse('lecture_detail', args=[self.lecture.slug]))
+        self.assertEqual(response.status_code, 200)
+
+    def test_lecture_detail_missing(self):
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('lecture_detail', args=['missing']))
+        self.assertEqual(response.status_code, 404)
+
+    def test_service_detail(self):
+        # site settings, service, category, precomputed related services
+        # (none built here), recent services instead, comments
+        with self.assertNumQueries(6):
+            response = self.client.get(reverse('service_detail', args=[self.service.slug]))
+        self.assertEqual(response.status_code, 200)
+
+    def test_services_list(self):
+        # site settings, facet counts, page of services with categories
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('services'))
+        self.assertEqual(response.status_code, 200)
+        # Facet counts are cached afterwards
+        with self.assertNumQueries(2):
+            self.client.get(reverse('services'), {'page': 2})
+
+    def test_services_list_filtered(self):
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('services'), {'category': 'category-1', 'featured': 'true'})
+        self.assertEqual(response.status_code, 200)
+
+    def test_appointment(self):
+        # site settings, service catalog
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('appointment'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['services']), SERVICE_COUNT)
+        # The catalog is cached afterwards
+        with self.assertNumQueries(1):
+            self.client.get(reverse('appointment'))
+
+    def test_health_check(self):
+        # Liveness never touches the database
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('health_check'))
+        self.assertEqual(response.status_code, 200)
+
+    def test_admin_dashboard_anonymous_redirects(self):
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('admin_dashboard'))
+        self.assertEqual(response.status_code, 302)
+
+    def test_admin_dashboard(self):
+        self.client.force_login(self.staff)
+        # session, user, site settings, the counters UNION, then the bounded
+        # lecture/service/message/request slices rendered by the template
+        with self.assertNumQueries(8):
+            response = self.client.get(reverse('admin_dashboard'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['counters']['lectures'], Lecture.objects.count())
+        self.assertEqual(
+            response.context['counters'].get('pending_comments', 0), Comment.objects.filter(is_approved=False).count(),
+        )
+        self.assertEqual(len(response.context['recent_lectures']), 5)
+
+        # Counters come from the cache until DASHBOARD_COUNTERS_SECONDS passes
+        with self.assertNumQueries(7):
+            self.client.get(reverse('admin_dashboard'))
+
+        # ...or until a new message is committed
+        with self.captureOnCommitCallbacks(execute=True):
+            ContactMessage.objects.create(name='تست', email='a@example.com', message='سلام')
+        with self.assertNumQueries(8):
+            response = self.client.get(reverse('admin_dashboard'))
+        self.assertEqual(response.context['counters']['contact_messages'], ContactMessage.objects.count())
+
+    def test_admin_dashboard_constant_cost(self):
+        self.client.force_login(self.staff)
+        Service.objects.bulk_create(
+            Service(name=f'سرویس {i}', slug=f'bulk-{i}', description='x' * 2000) for i in range(200)
+        )
+        with self.assertNumQueries(8):
+            response = self.client.get(reverse('admin_dashboard'))
+        self.assertEqual(len(response.context['recent_services']), 5)
+
+
+class ListingColumnTests(QueryBudgetTestCase):
+    """Listings never load Lecture.content or the full Service.description"""
+
+    def heavy_column_queries(self, url):
+        """Queries of a GET that select a full Lecture.content or Service.description"""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        heavy = re.compile(r'"main_lecture"\."content"|(?<!SUBSTR\()"main_service"\."description"')
+        return response, [q['sql'] for q in queries if heavy.search(q['sql'])]
+
+    def test_listing_pages(self):
+        for url in [reverse('home'), reverse('lectures_list'), reverse('services'), reverse('appointment')]:
+            with self.subTest(url=url):
+                self.assertEqual(self.heavy_column_queries(url)[1], [])
+
+    def test_related_items(self):
+        lecture = Lecture.objects.filter(is_published=True).first()
+        response, heavy = self.heavy_column_queries(reverse('lecture_detail', args=[lecture.slug]))
+        # Only the lecture itself is loaded in full, not the related cards
+        self.assertEqual(len(heavy), 1)
+        self.assertEqual(response.context['lecture'].content, lecture.content)
+
+
+class FormViewQueryTests(QueryBudgetTestCase):
+    """Query budgets for the JSON form endpoints in main.views"""
+
+    def test_contact_form(self):
+        payload = {'name': 'علی', 'email': 'ali@example.com', 'message': 'سلام'}
+        with self.assertNumQueries(1):
+            response = self.client.post(reverse('contact_form'), json.dumps(payload), content_type='application/json')
+        self.assertTrue(response.json()['success'])
+
+    def test_contact_form_honeypot(self):
+        payload = {'name': 'bot', 'email': 'bot@example.com', 'message': 'spam', 'company': 'x'}
+        with self.assertNumQueries(0):
+            self.client.post(reverse('contact_form'), json.dumps(payload), content_type='application/json')
+
+    def test_appointment_form(self):
+        payload = {'name': 'علی', 'phone': '09120000000', 'preferred_date': '2025-10-01', 'service': 'تعویض روغن'}
+        with self.assertNumQueries(1):
+            response = self.client.post(reverse('appointment_form'), json.dumps(payload), content_type='application/json')
+        self.assertTrue(response.json()['success'])
+
+    def test_comment_form(self):
+        payload = {'name': 'علی', 'email': 'ali@example.com', 'rating': '5', 'comment': 'عالی', 'service_id': self.service.id}
+        with self.assertNumQueries(1):
+            response = self.client.post(reverse('comment_form'), payload)
+        self.assertTrue(response.json()['success'])
+
+
+class ApiQueryTests(QueryBudgetTestCase):
+    """Query budgets for every endpoint in main.api_urls"""
+
+    def test_lecture_list(self):
+        # page count, page rows
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('api_lecture_list'))
+        self.assertEqual(response.status_code, 200)
+
+    def test_lecture_list_search(self):
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('api_lecture_list'), {'search': 'مقاله'})
+        self.assertEqual(response.status_code, 200)
+
+    def test_lecture_detail(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('api_lecture_detail', args=[self.lecture.slug]))
+        self.assertEqual(response.status_code, 200)
+
+    def test_service_list(self):
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('api_service_list'))
+        self.assertEqual(response.status_code, 200)
+
+    def test_service_list_search(self):
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('api_service_list'), {'search': 'سرویس'})
+        self.assertEqual(response.status_code, 200)
+
+    def test_service_detail(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('api_service_detail', args=[self.service.slug]))
+        self.assertEqual(response.status_code, 200)
+
+    def test_recent_lectures(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('api_recent_lectures'))
+        self.assertEqual(len(response.json()), 3)
+        # Served from the content cache afterwards
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(reverse('api_recent_lectures')).content, response.content)
+
+    def test_all_services(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('api_all_services'))
+        data = response.json()
+        self.assertEqual(len(data), SERVICE_COUNT)
+        self.assertNotIn('description', data[0])
+        self.assertTrue(data[0]['excerpt'])
+        with self.assertNumQueries(0):
+            self.client.get(reverse('api_all_services'))
+
+    def test_field_permutations_share_a_cache_entry(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('api_all_services'), {'fields': 'name,id'})
+        with self.assertNumQueries(0):
+            repeated = self.client.get(reverse('api_all_services'), {'fields': 'id,name,id,id'})
+        self.assertEqual(repeated.content, response.content)
+        self.assertEqual(list(response.json()[0]), ['id', 'name'])
+
+    def test_all_services_invalidated_on_save(self):
+        self.client.get(reverse('api_all_services'), {'fields': 'id,name'})
+        service = Service.objects.get(pk=self.service.pk)
+        service.name = 'سرویس تازه'
+        with self.captureOnCommitCallbacks(execute=True):
+            service.save()
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('api_all_services'), {'fields': 'id,name'})
+        self.assertIn({'id': service.pk, 'name': 'سرویس تازه'}, response.json())
+
+    def test_site_settings(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('api_site_settings'))
+        self.assertEqual(response.status_code, 200)
+
+    def test_contact_form(self):
+        payload = {'name': 'علی', 'email': 'ali@example.com', 'message': 'سلام'}
+        with self.assertNumQueries(1):
+            response = self.client.post(reverse('api_contact_form'), payload, content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+
+    def test_appointment_form(self):
+        payload = {'name': 'علی', 'phone': '09120000000', 'preferred_date': '2025-10-01'}
+        with self.assertNumQueries(1):
+            response = self.client.post(reverse('api_appointment_form'), payload, content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+
+    def test_appointment_booking(self):
+        payload = {
+            'name': 'علی', 'phone': '09120000000', 'service_id': self.service.id,
+            'appointment_date': '2025-10-01', 'appointment_time': '10:00', 'car_model': 'پژو ۲۰۶',
+        }
+        # service catalog, insert
+        with self.assertNumQueries(2):
+            response = self.client.post(reverse('api_appointment_booking'), payload, content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        appointment = Appointment.objects.get(pk=response.json()['appointment_id'])
+        self.assertEqual((appointment.service_id, appointment.estimated_price), (self.service.id, self.service.min_price))
+        # Validated against the cached catalog: no service query
+        with self.assertNumQueries(1):
+            response = self.client.post(reverse('api_appointment_booking'), payload, content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+
+    def test_appointment_booking_unpublished_service(self):
+        Service.objects.filter(pk=self.service.pk).update(is_published=False)
+        payload = {
+            'name': 'علی', 'phone': '09120000000', 'service_id': self.service.id,
+            'appointment_date': '2025-10-01', 'appointment_time': '10:00', 'car_model': 'پژو ۲۰۶',
+        }
+        response = self.client.post(reverse('api_appointment_booking'), payload, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_appointments_list_forbidden(self):
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('api_appointments_list'))
+        self.assertEqual(response.status_code, 403)
+
+    def test_appointments_list(self):
+        self.client.force_login(self.staff)
+        # session, user, appointments joined with their services
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('api_appointments_list'))
+        self.assertEqual(len(response.json()), APPOINTMENT_COUNT)
+
+
+class ServiceFacetTests(QueryBudgetTestCase):
+    """Facet counts from the cached GROUP BY agree with filtering in the database"""
+
+    def test_parse_duration_minutes(self):
+        # The migration that backfilled duration_minutes keeps its own copy
+        backfill = importlib.import_module('main.migrations.0015_service_duration_minutes_and_indexes')
+        cases = {
+            '۲ ساعت': 120, '45 دقیقه': 45, '۱ تا ۲ ساعت': 120, '۱ ساعت و ۳۰ دقیقه': 90,
+            '۱/۵ ساعت': 90, 'نیم ساعت': 30, '2 hours': 120, 'یک روز کاری': None, '': None, None: None,
+            '30 دقیقه تا 1 ساعت': 60, '10 دقیقه الی ۲۰ دقیقه': 20, '۴۵ دقیقه - ۱ ساعت': 60, '۱ الی ۲ ساعت': 120,
+            '۱ ساعت و ۳۰ دقیقه تا ۲ ساعت و ۳۰ دقیقه': 150,
+        }
+        for text, minutes in cases.items():
+            with self.subTest(text=text):
+                self.assertEqual(parse_duration_minutes(text), minutes)
+                self.assertEqual(backfill.parse_duration_minutes(text), minutes)
+
+    def test_save_parses_duration(self):
+        self.service.duration = '۳۰ دقیقه'
+        self.service.save(update_fields=['duration'])
+        self.assertEqual(Service.objects.get(pk=self.service.pk).duration_minutes, 30)
+
+    def test_counts_match_filtering(self):
+        for i, service in enumerate(Service.objects.order_by('pk')):
+            Service.objects.filter(pk=service.pk).update(duration_minutes=[30, 90, 240, None][i % 4])
+        published = Service.objects.filter(is_published=True)
+        selections = [
+            {}, {'category': 'category-1'}, {'featured': 'true'}, {'price': '500k-1m', 'duration': '1h-3h'},
+            {'category': 'category-2', 'duration': 'under-1h', 'featured': 'true'}, {'category': 'missing'},
+        ]
+        for params in selections:
+            with self.subTest(params=params):
+                response = self.client.get(reverse('services'), params)
+                selected = facets.selected_filters(params)
+                self.assertEqual(response.context['facets']['total'],
+                                 facets.filter_services(published, selected, facets.counts()).count())
+                self.assertEqual(response.context['page_obj'].paginator.count, response.context['facets']['total'])
+                for option in response.context['facets']['duration']:
+                    narrowed = facets.filter_services(published, {**selected, 'duration': option['value']}, facets.counts())
+                    self.assertEqual(option['count'], narrowed.count())
+
+    def test_search_and_sort_span_every_page(self):
+        oldest = Service.objects.order_by('created_at', 'pk').first()
+        self.assertNotIn(oldest, self.client.get(reverse('services')).context['page_obj'])
+        # site settings, facet counts of the matching services, the page
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('services'), {'q': oldest.name, 'sort': 'az'})
+        self.assertEqual([service.pk for service in response.context['page_obj']], [oldest.pk])
+        self.assertEqual(response.context['facets']['total'], 1)
+
+        names = [service.name for service in self.client.get(reverse('services'), {'sort': 'az'}).context['page_obj']]
+        self.assertEqual(names, sorted(Service.objects.values_list('name', flat=True))[:24])
+
+    def test_min_and_max_price(self):
+        params = {'min_price': '۵۱۰۰۰۰', 'max_price': '520000', 'featured': 'true'}
+        response = self.client.get(reverse('services'), params)
+        expected = Service.objects.filter(min_price__gte=510000, min_price__lte=520000, is_featured=True)
+        self.assertEqual(sorted(s.pk for s in response.context['page_obj']), sorted(expected.values_list('pk', flat=True)))
+        self.assertEqual(response.context['facets']['total'], expected.count())
+        self.assertEqual(response.context['facets']['featured'], expected.count())
+        self.assertIn('min_price=', response.context['filter_query'])
+
+    def test_filters_use_no_join_and_pagination_keeps_them(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('services'), {'category': 'category-1', 'price': '500k-1m'})
+        self.assertIn('"main_service"."category_id" =', queries[-1]['sql'])
+        self.assertEqual(response.context['filter_query'], 'category=category-1&price=500k-1m')
+
+
+class RelatedItemsTests(QueryBudgetTestCase):
+    """TF-IDF related items and the detail pages that read them"""
+
+    TOPICS = [
+        'تعویض روغن موتور فیلتر روغن', 'لنت ترمز دیسک ترمز', 'باتری دینام استارت',
+        'کولر گاز کمپرسور کولر', 'گیربکس اتوماتیک روغن گیربکس',
+    ]
+
+    def setUp(self):
+        super().setUp()
+        for i, lecture in enumerate(Lecture.objects.order_by('pk')):
+            topic = self.TOPICS[i % len(self.TOPICS)]
+            Lecture.objects.filter(pk=lecture.pk).update(
+                title=f'راهنمای {topic}', teaser=topic, content=f'<p>{topic} سرویس دوره‌ای {i}</p>',
+            )
+        for i, service in enumerate(Service.objects.order_by('pk')):
+            topic = self.TOPICS[i % len(self.TOPICS)]
+            Service.objects.filter(pk=service.pk).update(name=f'سرویس {topic}', description=topic)
+
+    def test_normalize(self):
+        self.assertEqual(recommendations.normalize('<b>كيفيت</b> مي‌شود ۱۲ ٣٤ ـــبالاَ'), 'کیفیت می شود 12 34 بالا')
+        self.assertEqual(recommendations.tokens('روغن و فیلتر در موتور'), ['روغن', 'فیلتر', 'موتور'])
+
+    def test_top_k_matches_brute_force(self):
+        rng = np.random.default_rng(0)
+        matrix = rng.random((30, 8), dtype=np.float32)
+        matrix /= np.linalg.norm(matrix, axis=1, keepdims=True)
+        similarity = matrix @ matrix.T
+        sparse = recommendations.SparseRows(matrix.ravel(), np.tile(np.arange(8), 30), np.arange(0, 241, 8), 8)
+        for row, neighbours, scores in recommendations.top_k(sparse, range(30), 4, batch_size=7):
+            expected = [i for i in np.argsort(-similarity[row]) if i != row][:4]
+            self.assertEqual(list(neighbours), expected)
+            np.testing.assert_allclose(scores, similarity[row, expected], rtol=1e-5)
+
+    def test_build_picks_same_topic(self):
+        items, recomputed = recommendations.build('lecture')
+        self.assertEqual((items, recomputed), (LECTURE_COUNT, LECTURE_COUNT))
+        lectures = list(Lecture.objects.order_by('pk'))
+        topic = {lecture.pk: i % len(self.TOPICS) for i, lecture in enumerate(lectures)}
+        picks = RelatedLecture.objects.filter(source=self.lecture).order_by('rank')
+        self.assertEqual([pick.rank for pick in picks], [1, 2, 3])
+        self.assertTrue(all(topic[pick.target_id] == topic[self.lecture.pk] for pick in picks))
+        self.assertEqual(sorted(pick.score for pick in picks)[::-1], [pick.score for pick in picks])
+
+    def test_detail_reads_picks_with_one_query(self):
+        recommendations.build('lecture')
+        recommendations.build('service')
+        # site settings, lecture, related lectures, comments
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse('lecture_detail', args=[self.lecture.slug]))
+        expected = list(RelatedLecture.objects.filter(source=self.lecture).order_by('rank').values_list('target', flat=True))
+        self.assertEqual([lecture.pk for lecture in response.context['related_lectures']], expected)
+        self.assertIn(self.TOPICS[0], response.context['related_lectures'][0].title)
+        # site settings, service, category, related services, comments
+        with self.assertNumQueries(5):
+            self.client.get(reverse('service_detail', args=[self.service.slug]))
+
+    def test_incremental_build(self):
+        recommendations.build('lecture')
+        lectures = list(Lecture.objects.order_by('pk'))
+        moved = lectures[1]
+        moved.title = f'راهنمای {self.TOPICS[0]}'
+        moved.teaser = self.TOPICS[0]
+        moved.content = self.TOPICS[0]
+        moved.save()
+
+        items, recomputed = recommendations.build('lecture')
+        self.assertLess(recomputed, items)
+        self.assertIn(moved.pk, RelatedLecture.objects.filter(source=lectures[0]).values_list('target', flat=True))
+
+        # Same-topic lectures tie, so compare the topics picked rather than the lectures
+        topic = {lecture.pk: i % len(self.TOPICS) for i, lecture in enumerate(lectures)}
+        topic[moved.pk] = 0
+
+        def picked_topics():
+            return sorted((source, rank, topic[target]) for source, rank, target in
+                          RelatedLecture.objects.values_list('source', 'rank', 'target'))
+
+        incremental = picked_topics()
+        recommendations.build('lecture', full=True)
+        self.assertEqual(incremental, picked_topics())
+
+    def test_deleted_target_is_replaced(self):
+        recommendations.build('lecture')
+        RelatedLecture.objects.get(source=self.lecture, rank=1).target.delete()
+        self.assertEqual(RelatedLecture.objects.filter(source=self.lecture, target=None).count(), 1)
+        # Nothing was saved since, but the gap alone marks the lecture for recomputing
+        items, recomputed = recommendations.build('lecture')
+        self.assertLess(recomputed, items)
+        picks = RelatedLecture.objects.filter(source=self.lecture)
+        self.assertEqual(sorted(pick.rank for pick in picks), [1, 2, 3])
+        self.assertFalse(RelatedLecture.objects.filter(target=None).exists())
+
+    def test_unpublished_items_drop_out(self):
+        recommendations.build('service')
+        self.assertTrue(RelatedService.objects.filter(source=self.service).exists())
+        Service.objects.filter(pk=self.service.pk).update(is_published=False)
+        recommendations.build('service')
+        self.assertFalse(RelatedService.objects.filter(source=self.service).exists())
+        self.assertFalse(RelatedService.objects.filter(target=self.service).exists())
+
+
+class SparseFieldsTests(QueryBudgetTestCase):
+    """``?fields=`` and the ``.values()`` fast path of the read endpoints"""
+
+    def test_fast_path_matches_serializer(self):
+        request = RequestFactory().get('/api/services/')
+        Service.objects.filter(pk=self.service.pk).update(video='services/videos/intro film.mp4', min_price=None)
+        cases = [
+            (ServiceSerializer, Service.objects.all(), request),
+            (ServiceListSerializer, Service.objects.listing(), None),
+            (LectureSerializer, Lecture.objects.all(), request),
+        ]
+        for serializer_class, queryset, request in cases:
+            with self.subTest(serializer=serializer_class.__name__):
+                renderer = ValuesRenderer(serializer_class, request=request)
+                expected = serializer_class(queryset.order_by('pk'), many=True, context={'request': request}).data
+                self.assertEqual(renderer.render(renderer.values(queryset.order_by('pk'))), expected)
+
+    def test_fields_narrow_select_and_payload(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('api_service_list'), {'fields': 'name,slug,price_range'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.json()['results'][0]), ['name', 'slug', 'price_range'])
+        self.assertNotIn('"description"', queries[-1]['sql'])
+        self.assertIn('"min_price"', queries[-1]['sql'])
+
+    def test_fields_on_detail(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('api_lecture_detail', args=[self.lecture.slug]), {'fields': 'title'})
+        self.assertEqual(response.json(), {'title': self.lecture.title})
+        self.assertNotIn('"content"', queries[0]['sql'])
+
+    def test_unknown_field(self):
+        response = self.client.get(reverse('api_lecture_list'), {'fields': 'title,password'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('fields', response.json())
+
+
+class FastJSONTests(TestCase):
+    """ORJSONRenderer and ORJSONParser match DRF's stdlib pair"""
+
+    data = {
+        'name': 'تعویض روغن\u2028موتور',
+        'price': decimal.Decimal('1250000'),
+        'date': datetime.date(2025, 10, 1),
+        'time': datetime.time(10, 30),
+        'created_at': datetime.datetime(2025, 10, 1, 6, 30, 15, 123456, tzinfo=datetime.timezone.utc),
+        'tehran': datetime.datetime(2025, 10, 1, 10, 0, tzinfo=zoneinfo.ZoneInfo('Asia/Tehran')),
+        'items': [1, 2.5, None, True],
+    }
+
+    def test_renderer_matches_stdlib(self):
+        expected = JSONRenderer().render(self.data)
+        self.assertIsNotNone(fast_json.orjson)
+        self.assertEqual(fast_json.ORJSONRenderer().render(self.data), expected)
+        with mock.patch.object(fast_json, 'orjson', None):
+            self.assertEqual(fast_json.ORJSONRenderer().render(self.data), expected)
+
+    def test_parser(self):
+        body = '{"name": "علی", "price": 1250000.5}'.encode('utf-8')
+        for orjson in [fast_json.orjson, None]:
+            with self.subTest(orjson=orjson), mock.patch.object(fast_json, 'orjson', orjson):
+                parser = fast_json.ORJSONParser()
+                self.assertEqual(parser.parse(BytesIO(body)), {'name': 'علی', 'price': 1250000.5})
+                with self.assertRaises(ParseError):
+                    parser.parse(BytesIO(b'{"name": NaN}'))
+
+    def test_api_uses_fast_renderer(self):
+        response = self.client.post(
+            reverse('api_contact_form'),
+            {'name': 'علی', 'email': 'ali@example.com', 'message': 'سلام'},
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertIsInstance(response.accepted_renderer, fast_json.ORJSONRenderer)
+        self.assertEqual(response.json()['success'], True)
+
+
+@override_settings(PERFORMANCE_INSTRUMENTATION=True)
+class PerformanceMiddlewareTests(QueryBudgetTestCase):
+    """Server-Timing instrumentation must report accurately and add no queries"""
+
+    def test_server_timing_header(self):
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse('home'))
+        timing = response['Server-Timing']
+        self.assertIn('db;dur=', timing)
+        self.assertIn('desc="4 queries"', timing)
+        self.assertIn('tpl;dur=', timing)
+        self.assertIn('total;dur=', timing)
+
+    def test_cache_misses_counted(self):
+        payload = {'name': 'علی', 'email': 'ali@example.com', 'message': 'سلام'}
+        response = self.client.post(reverse('contact_form'), json.dumps(payload), content_type='application/json')
+        self.assertIn('cache;desc="0 hits, 1 misses"', response['Server-Timing'])
+
+    def test_api_views_covered(self):
+        response = self.client.get(reverse('api_service_list'))
+        self.assertIn('desc="2 queries"', response['Server-Timing'])
+
+    @override_settings(PERFORMANCE_INSTRUMENTATION=False)
+    def test_disabled(self):
+        response = self.client.get(reverse('home'))
+        self.assertFalse(response.has_header('Server-Timing'))
+
+
+@override_settings(METRICS_ENABLED=True, METRICS_BACKEND='memory', METRICS_TOKEN='')
+class MetricsEndpointTests(QueryBudgetTestCase):
+    """Prometheus exposition at /metrics"""
+
+    def setUp(self):
+        super().setUp()
+        metrics.get_store().clear()
+
+    def test_request_histogram_and_status_counts(self):
+        self.client.get(reverse('home'))
+        self.client.get(reverse('lecture_detail', args=['missing']))
+        body = self.client.get(reverse('metrics')).content.decode()
+        self.assertIn('# TYPE shahin_http_request_duration_seconds histogram', body)
+        self.assertIn('shahin_http_request_duration_seconds_bucket{le="+Inf",view="home"} 1', body)
+        self.assertIn('shahin_http_request_duration_seconds_count{view="home"} 1', body)
+        self.assertIn('shahin_http_responses_total{status="200",view="home"} 1', body)
+        self.assertIn('shahin_http_responses_total{status="404",view="lecture_detail"} 1', body)
+        self.assertIn('shahin_db_queries_total{view="home"} 4', body)
+
+    def test_form_submissions_and_cache_ratio(self):
+        payload = {'name': 'علی', 'email': 'ali@example.com', 'message': 'سلام'}
+        self.client.post(reverse('contact_form'), json.dumps(payload), content_type='application/json')
+        self.client.post(reverse('contact_form'), json.dumps({'company': 'x'}), content_type='application/json')
+        body = self.client.get(reverse('metrics')).content.decode()
+        self.assertIn('shahin_form_submissions_total{form="contact",outcome="accepted"} 1', body)
+        self.assertIn('shahin_form_submissions_total{form="contact",outcome="spam"} 1', body)
+        self.assertIn('shahin_cache_requests_total{result="miss"} 1', body)
+        self.assertIn('shahin_cache_hit_ratio 0', body)
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_token_required(self):
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+        response = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(METRICS_ENABLED=False)
+    def test_disabled(self):
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 404)
+
+    def test_directory_store_sums_workers(self):
+        with tempfile.TemporaryDirectory() as directory:
+            workers = [metrics.DirectoryStore(directory) for _ in range(3)]
+            for offset, worker in enumerate(workers):
+                # Each store stands in for a separate gunicorn worker process
+                worker.pid += offset
+                worker.values['shahin_emails_total{result="sent"}'] = 2
+                worker.flush()
+            self.assertEqual(workers[0].snapshot(), {'shahin_emails_total{result="sent"}': 6})
+
+    def test_directory_store_folds_exited_workers(self):
+        series = 'shahin_emails_total{result="sent"}'
+        with tempfile.TemporaryDirectory() as directory:
+            exited = metrics.DirectoryStore(directory)
+            # A pid no process has: the worker was recycled
+            exited.pid = 2 ** 22 + 1
+            exited.values[series] = 2
+            exited.flush()
+            live = metrics.DirectoryStore(directory)
+            live.values[series] = 3
+            self.assertNotIn(f'{exited.pid}.json', os.listdir(directory))
+            self.assertIn('aggregate.json', os.listdir(directory))
+            self.assertEqual(live.snapshot(), {series: 5})
+            metrics.DirectoryStore(directory)
+            self.assertEqual(live.snapshot(), {series: 5})
+
+    def test_async_recording_leaves_event_loop(self):
+        class BlockingStore(metrics.MemoryStore):
+            blocking = True
+
+            def inc_many(self, increments):
+                threads.append(threading.get_ident())
+                super().inc_many(increments)
+
+        threads = []
+        store = BlockingStore()
+
+        async def record():
+            await metrics.arecord_form_submission('contact', 'accepted')
+            return threading.get_ident()
+
+        with mock.patch.object(metrics, 'get_store', return_value=store):
+            loop_thread = async_to_sync(record)()
+        self.assertEqual(len(threads), 1)
+        self.assertNotEqual(threads[0], loop_thread)
+        self.assertEqual(store.snapshot(), {'shahin_form_submissions_total{form="contact",outcome="accepted"}': 1})
+
+
+class QueryInspectionTests(QueryBudgetTestCase):
+    """Sampled slow-query / N+1 detection and the perf_report command"""
+
+    def test_fingerprint_normalizes_literals(self):
+        self.assertEqual(
+            fingerprint("SELECT * FROM t WHERE id = 12 AND name = 'x''y' AND t2.a IN (%s, %s, %s)"),
+            'SELECT * FROM t WHERE id = ? AND name = ? AND t2.a IN (...)',
+        )
+        self.assertEqual(fingerprint('SELECT  "a"\n FROM t LIMIT 21'), fingerprint('SELECT "a" FROM t LIMIT 5'))
+
+    def test_repeated_queries_flagged(self):
+        request_metrics = RequestMetrics()
+        request_metrics.inspector = QueryInspector(slow_threshold_ms=10_000, repeat_threshold=5)
+        token = request_metrics.activate()
+        try:
+            names = [service.category.name for service in Service.objects.all()[:10]]
+        finally:
+            request_metrics.deactivate(token)
+        self.assertEqual(len(names), 10)
+        [finding] = request_metrics.inspector.findings()
+        self.assertEqual(finding['kind'], 'n_plus_one')
+        self.assertEqual(finding['count'], 10)
+        self.assertIn('main_servicecategory', finding['fingerprint'])
+        self.assertIn('main/tests.py', finding['frame'])
+
+    @override_settings(QUERY_INSPECTION_SAMPLE_RATE=1.0, SLOW_QUERY_THRESHOLD_MS=0)
+    def test_sampled_request_logs_slow_queries(self):
+        with self.assertLogs('main.queries', level='WARNING') as logs:
+            self.client.get(reverse('home'))
+        records = [json.loads(line.split(LOG_MARKER, 1)[1]) for line in logs.output]
+        self.assertEqual(len(records), 4)
+        self.assertTrue(all(record['view'] == 'home' and record['kind'] == 'slow_query' for record in records))
+
+    @override_settings(QUERY_INSPECTION_SAMPLE_RATE=0.0, PERFORMANCE_INSTRUMENTATION=True)
+    def test_unsampled_request_not_inspected(self):
+        with self.assertNoLogs('main.queries'):
+            self.client.get(reverse('home'))
+
+    def test_perf_report(self):
+        records = [
+            {'kind': 'n_plus_one', 'view': 'services', 'fingerprint': 'SELECT b', 'count': 40, 'duration_ms': 8.0, 'frame': 'main/views.py:10 in services'},
+            {'kind': 'n_plus_one', 'view': 'services', 'fingerprint': 'SELECT b', 'count': 20, 'duration_ms': 4.0, 'frame': 'main/views.py:10 in services'},
+            {'kind': 'slow_query', 'view': 'home', 'fingerprint': 'SELECT a', 'duration_ms': 250.0, 'frame': ''},
+        ]
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'queries.log')
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write('INFO unrelated line\n')
+                for record in records:
+                    f.write(f'WARNING 2024-01-01 query_inspection 1 2 {LOG_MARKER}{json.dumps(record)}\n')
+            out = StringIO()
+            call_command('perf_report', path, '--json', stdout=out)
+        slow, n_plus_one = json.loads(out.getvalue())
+        self.assertEqual((slow['view'], slow['total_ms']), ('home', 250.0))
+        self.assertEqual(n_plus_one['occurrences'], 2)
+        self.assertEqual(n_plus_one['max_repeats'], 40)
+        self.assertEqual(n_plus_one['total_ms'], 12.0)
+
+
+class HealthCheckTests(QueryBudgetTestCase):
+    """Readiness results are cached so probes do not hit MySQL every time"""
+
+    def setUp(self):
+        super().setUp()
+        health.reset()
+        self.addCleanup(health.reset)
+
+    def test_readiness_cached(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('health_ready'))
+        self.assertEqual(response.status_code, 200)
+        with self.assertNumQueries(0):
+            for _ in range(5):
+                self.client.get(reverse('health_ready'))
+
+    @override_settings(HEALTH_CACHE_SECONDS=0)
+    def test_readiness_expires(self):
+        with self.assertNumQueries(2):
+            self.client.get(reverse('health_ready'))
+            self.client.get(reverse('health_ready'))
+
+    def test_detail(self):
+        response = self.client.get(reverse('health_detail'))
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['status'], 'ok')
+        self.assertEqual(set(data['checks']), {'database', 'cache', 'storage'})
+        self.assertTrue(all('latency_ms' in check for check in data['checks'].values()))
+
+    def test_failing_dependency(self):
+        def broken():
+            raise ConnectionError('redis down')
+
+        with mock.patch.dict(health.CHECKS, {'cache': broken}):
+            response = self.client.get(reverse('health_ready'))
+            self.assertEqual(response.status_code, 503)
+            self.assertIn('cache', response.content.decode())
+            detail = self.client.get(reverse('health_detail')).json()
+        self.assertEqual(detail['status'], 'error')
+        self.assertEqual(detail['checks']['cache']['error'], 'ConnectionError: redis down')
+        self.assertTrue(detail['checks']['database']['ok'])
+        # Liveness is unaffected by dependencies
+        self.assertEqual(self.client.get(reverse('health_check')).status_code, 200)
+
+
+class PooledConnection:
+    """Stands in for a PyMySQL connection in the pool tests"""
+
+    def __init__(self):
+        self.closed = False
+        self.alive = True
+
+    def ping(self, reconnect=False):
+        if not self.alive:
+            raise ConnectionError('gone away')
+
+    def close(self):
+        self.closed = True
+
+
+class ConnectionPoolTests(TestCase):
+    """Connection reuse, recycling and limits of the mysql_pool backend"""
+
+    def test_released_connection_reused(self):
+        pool = ConnectionPool(PooledConnection, size=2)
+        conn, reused = pool.acquire()
+        self.assertFalse(reused)
+        pool.release(conn)
+        self.assertEqual(pool.acquire(), (conn, True))
+        self.assertEqual(pool.total, 1)
+
+    def test_dead_connection_replaced(self):
+        pool = ConnectionPool(PooledConnection, size=1)
+        conn, _ = pool.acquire()
+        pool.release(conn)
+        conn.alive = False
+        replacement, reused = pool.acquire()
+        self.assertIsNot(replacement, conn)
+        self.assertFalse(reused)
+        self.assertTrue(conn.closed)
+        self.assertEqual(pool.total, 1)
+
+    def test_old_connection_recycled(self):
+        pool = ConnectionPool(PooledConnection, size=1, recycle=0)
+        conn, _ = pool.acquire()
+        pool.release(conn)
+        self.assertTrue(conn.closed)
+        self.assertEqual(pool.total, 0)
+
+    def test_size_limit(self):
+        pool = ConnectionPool(PooledConnection, size=1, timeout=0.01)
+        pool.acquire()
+        with self.assertRaises(PoolTimeout):
+            pool.acquire()
+
+
+@override_settings(READ_REPLICA='replica')
+class ReplicaRoutingTests(TestCase):
+    """Reads go to the replica only for safe requests from clients that have not just written"""
+    databases = {'default', 'replica'}
+
+    @classmethod
+    def setUpTestData(cls):
+        # Only the primary has the lecture, so each response shows which database it read
+        Lecture.objects.create(title='مقاله', slug='primary-only', content='متن', teaser='خلاصه')
+
+    def lecture_count(self, client=None):
+        return (client or self.client).get(reverse('api_lecture_list')).json()['count']
+
+    def test_get_reads_replica(self):
+        # The empty replica answers the count; no rows means no page query
+        with self.assertNumQueries(1, using='replica'), self.assertNumQueries(0, using='default'):
+            self.assertEqual(self.lecture_count(), 0)
+
+    def test_reads_after_write_stick_to_primary(self):
+        payload = {'name': 'علی', 'email': 'ali@example.com', 'message': 'سلام'}
+        response = self.client.post(reverse('api_contact_form'), payload, content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        self.assertIn('db_primary', response.cookies)
+        self.assertEqual(self.lecture_count(), 1)
+        self.assertEqual(ContactMessage.objects.using('default').count(), 1)
+        self.assertEqual(ContactMessage.objects.using('replica').count(), 0)
+
+    def test_primary_paths(self):
+        with self.assertNumQueries(0, using='replica'):
+            self.client.get(reverse('health_ready'))
+
+    def test_write_inside_request_switches_reads(self):
+        token = db_routers.activate(db_routers.RoutingState(replica=True))
+        try:
+            self.assertEqual(Lecture.objects.count(), 0)
+            ContactMessage.objects.create(name='علی', email='ali@example.com', message='سلام')
+            self.assertEqual(Lecture.objects.count(), 1)
+        finally:
+            db_routers.deactivate(token)
+
+    @override_settings(READ_REPLICA=None)
+    def test_disabled_without_replica(self):
+        self.assertEqual(self.lecture_count(), 1)
+
+
+class SessionTests(QueryBudgetTestCase):
+    """Anonymous public traffic never loads a session; sessions can live in the cache only"""
+
+    def test_public_responses_do_not_vary_on_cookie(self):
+        urls = [
+            reverse('home'), reverse('services'), reverse('lectures_list'), reverse('appointment'),
+            reverse('lecture_detail', args=['lecture-0']), reverse('service_detail', args=['service-0']),
+            reverse('api_lecture_list'), reverse('api_service_list'), reverse('api_site_settings'),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertNotIn('Cookie', response.get('Vary', ''))
+                self.assertFalse(response.cookies)
+
+    @override_settings(SESSION_ENGINE='django.contrib.sessions.backends.cache')
+    def test_cache_session_engine(self):
+        self.client.force_login(self.staff)
+        # The dashboard budget without the session query
+        with self.assertNumQueries(7):
+            response = self.client.get(reverse('admin_dashboard'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Session.objects.count(), 0)
+        response = self.client.get(reverse('api_appointments_list'))
+        self.assertEqual(response.status_code, 200)
+
+
+@override_settings(PERFORMANCE_INSTRUMENTATION=True)
+class AsyncViewTests(QueryBudgetTestCase):
+    """Form and health endpoints served through the ASGI handler"""
+
+    async def test_contact_form(self):
+        payload = {'name': 'علی', 'email': 'ali@example.com', 'message': 'سلام'}
+        response = await AsyncClient().post(reverse('contact_form'), payload, content_type='application/json')
+        self.assertTrue(response.json()['success'])
+        # The async ORM insert is still seen by the instrumentation
+        self.assertIn('desc="1 queries"', response['Server-Timing'])
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(await ContactMessage.objects.acount(), CONTACT_MESSAGE_COUNT + 1)
+
+    async def test_appointment_form(self):
+        payload = {'name': 'علی', 'phone': '09120000000', 'preferred_date': '2025-10-01'}
+        response = await AsyncClient().post(reverse('appointment_form'), payload, content_type='application/json')
+        self.assertTrue(response.json()['success'])
+
+    async def test_comment_form(self):
+        response = await AsyncClient().post(reverse('comment_form'), {
+            'name': 'علی', 'email': 'ali@example.com', 'comment': 'عالی بود', 'rating': '5',
+        })
+        self.assertTrue(response.json()['success'])
+        self.assertEqual(len(mail.outbox), 1)
+
+    async def test_method_not_allowed(self):
+        response = await AsyncClient().get(reverse('contact_form'))
+        self.assertEqual(response.status_code, 405)
+
+    async def test_health(self):
+        # urls.py routes to these under SERVER_MODE=asgi
+        health.reset()
+        request = RequestFactory().get('/health/')
+        self.assertEqual((await views.ahealth_check(request)).status_code, 200)
+        self.assertEqual((await views.ahealth_ready(request)).status_code, 200)
+        self.assertEqual(json.loads((await views.ahealth_detail(request)).content)['status'], 'ok')
+
+    @override_settings(EMAIL_IN_BACKGROUND=True)
+    def test_email_handed_off(self):
+        future = async_to_sync(notify_admin)('موضوع', 'متن', 'from@example.com', ['to@example.com'])
+        future.result(timeout=5)
+        self.assertEqual(len(mail.outbox), 1)
+
+    @override_settings(EMAIL_IN_BACKGROUND=False)
+    def test_email_sent_inline(self):
+        future = async_to_sync(notify_admin)('موضوع', 'متن', 'from@example.com', ['to@example.com'])
+        self.assertTrue(future.done())
+        self.assertEqual(len(mail.outbox), 1)
+
+
+class StartupCommandTests(TestCase):
+    """startup only migrates and collects static files when something changed"""
+
+    def run_startup(self, *args):
+        out = StringIO()
+        call_command('startup', *args, stdout=out, verbosity=0)
+        return out.getvalue()
+
+    def test_skips_when_unchanged(self):
+        with tempfile.TemporaryDirectory() as static_root, override_settings(STATIC_ROOT=static_root):
+            first = self.run_startup()
+            self.assertIn('No unapplied migrations', first)
+            self.assertIn('Static files collected', first)
+            self.assertTrue(os.path.exists(os.path.join(static_root, 'admin', 'css', 'base.css')))
+
+            self.assertIn('Static files unchanged', self.run_startup())
+            self.assertIn('Static files collected', self.run_startup('--force'))
+
+    def test_static_change_detected(self):
+        with tempfile.TemporaryDirectory() as static_root, tempfile.TemporaryDirectory() as extra:
+            with open(os.path.join(extra, 'extra.css'), 'w') as f:
+                f.write('body {}')
+            dirs = [*settings.STATICFILES_DIRS, extra]
+            with override_settings(STATIC_ROOT=static_root, STATICFILES_DIRS=dirs):
+                self.run_startup('--skip-migrate')
+                with open(os.path.join(extra, 'extra.css'), 'w') as f:
+                    f.write('body { color: red }')
+                self.assertIn('Static files collected', self.run_startup('--skip-migrate'))
+
+    def test_storage_change_detected(self):
+        storages = {**settings.STORAGES, 'staticfiles': {'BACKEND': 'main.tests.LocalPrecompressedStorage'}}
+        with tempfile.TemporaryDirectory() as static_root, override_settings(STATIC_ROOT=static_root):
+            self.run_startup('--skip-migrate')
+            with override_settings(STORAGES=storages):
+                self.assertIn('Static files collected', self.run_startup('--skip-migrate'))
+                self.assertTrue(os.path.exists(os.path.join(static_root, 'staticfiles.json')))
+
+
+class SeedScaleDataTests(TestCase):
+    """seed_scale_data is reproducible and invalidates cached content"""
+
+    def seed(self, *args):
+        call_command(
+            'seed_scale_data', '--categories', '2', '--services', '5', '--lectures', '5', '--comments', '5',
+            '--appointments', '10', '--appointment-requests', '2', '--contact-messages', '2', *args,
+            stdout=StringIO(),
+        )
+        return list(Appointment.objects.order_by('pk').values_list('appointment_date', 'service__slug', 'name'))
+
+    def test_same_seed_same_rows_and_cache_bumped(self):
+        version = content_cache.versions(*content_cache.MODELS)
+        first = self.seed()
+        self.assertNotEqual(content_cache.versions(*content_cache.MODELS), version)
+        self.assertEqual(self.seed('--flush'), first)
+
+
+class LocalPrecompressedStorage(PrecompressedManifestMixin, StaticFilesStorage):
+    """The S3 manifest storage's post-processing, on the local filesystem"""
+
+
+class StaticManifestTests(TestCase):
+    """collectstatic writes hashed names with brotli and gzip siblings"""
+
+    def test_hashed_and_compressed(self):
+        storages = {
+            **settings.STORAGES,
+            'staticfiles': {'BACKEND': 'main.tests.LocalPrecompressedStorage'},
+        }
+        with tempfile.TemporaryDirectory() as static_root, \
+                override_settings(STATIC_ROOT=static_root, STORAGES=storages):
+            call_command('collectstatic', interactive=False, verbosity=0)
+            with open(os.path.join(static_root, 'staticfiles.json')) as f:
+                paths = json.load(f)['paths']
+
+            hashed = paths['css/custom.css']
+            self.assertRegex(hashed, HASHED_NAME)
+            path = os.path.join(static_root, hashed)
+            with open(path, 'rb') as f:
+                original = f.read()
+            with gzip.open(path + '.gz') as f:
+                self.assertEqual(f.read(), original)
+            self.assertTrue(os.path.exists(path + '.br'))
+
+            # Font URLs in stylesheets point at the hashed fonts
+            with open(os.path.join(static_root, paths['css/fontawesome-override.css'])) as f:
+                css = f.read()
+            self.assertIn(os.path.basename(paths['fontawesome/webfonts/fa-solid-900.woff2']), css)
+            # ...while the vendored file's reference to an unshipped font is kept as is
+            with open(os.path.join(static_root, paths['fontawesome/css/all.min.css'])) as f:
+                self.assertIn('url("../webfonts/fa-v4compatibility.woff2")', f.read())
+
+
+class BuildAssetsTests(TestCase):
+    """build_assets keeps only the icons and rules the templates use"""
+
+    def setUp(self):
+        assets.reset()
+        self.addCleanup(assets.reset)
+
+    def test_build_and_inline(self):
+        with tempfile.TemporaryDirectory() as root:
+            output = os.path.join(root, 'build')
+            call_command('build_assets', output=output, stdout=StringIO(), stderr=StringIO())
+
+            with open(os.path.join(output, 'icons.css')) as f:
+                icons = f.read()
+            self.assertIn('.fa-phone:before', icons)
+            self.assertNotIn('.fa-house-fire:before', icons)
+            with open(os.path.join(settings.BASE_DIR, 'static', 'css', 'custom.css')) as f:
+                custom = f.read()
+            with open(os.path.join(output, 'site.css')) as f:
+                self.assertLess(len(f.read()), len(custom))
+
+            # Without a build, base.html links the full stylesheets
+            response = self.client.get(reverse('home'))
+            self.assertContains(response, 'css/custom.css')
+
+            with override_settings(STATICFILES_DIRS=[*settings.STATICFILES_DIRS, root]):
+                assets.reset()
+                response = self.client.get(reverse('home'))
+            self.assertContains(response, 'build/site.css')
+            self.assertContains(response, 'build/icons.css')
+            self.assertNotContains(response, 'fontawesome/css/all.min.css')
+            # Relative url()s in the inlined CSS are resolved against STATIC_URL
+            self.assertContains(response, 'url("/static/images/hero.webp")')
+
+
+@override_settings(DASHBOARD_EVENTS_KEEPALIVE=1, DASHBOARD_EVENTS_MAX_AGE=5)
+class DashboardEventsTests(TestCase):
+    """New rows reach the staff dashboard over server-sent events"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user('staff', password='x', is_staff=True)
+        cls.user = User.objects.create_user('customer', password='x')
+
+    def test_published_on_commit(self):
+        subscription = events.get_broker().subscribe()
+        self.addCleanup(subscription.close)
+        payload = {'name': 'علی', 'email': 'ali@example.com', 'message': 'سلام'}
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('contact_form'), json.dumps(payload), content_type='application/json')
+        event = subscription.get(0)
+        self.assertEqual(event['type'], 'contact_message')
+        self.assertEqual(event['name'], 'علی')
+        self.assertIn('/admin/main/contactmessage/', event['admin_url'])
+
+        # Approved comments need no moderation
+        with self.captureOnCommitCallbacks(execute=True):
+            Comment.objects.create(name='x', email='x@example.com', rating=5, comment='x', is_approved=True)
+        self.assertIsNone(subscription.get(0))
+
+    def test_staff_only(self):
+        self.assertEqual(self.client.get(reverse('dashboard_events')).status_code, 403)
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(reverse('dashboard_events')).status_code, 403)
+
+    def create_appointment_request(self):
+        # On the sync thread, whose connection holds the test transaction
+        with self.captureOnCommitCallbacks(execute=True):
+            AppointmentRequest.objects.create(name='رضا', phone='09120000000', service='تعویض روغن')
+
+    async def test_stream(self):
+        client = AsyncClient()
+        await sync_to_async(client.force_login)(self.staff)
+        response = await client.get(reverse('dashboard_events'))
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        stream = aiter(response.streaming_content)
+        self.assertTrue((await anext(stream)).startswith(b'retry:'))
+
+        # Read the next frame before the event exists, so the subscription is waiting
+        frame = asyncio.ensure_future(anext(stream))
+        await asyncio.sleep(0)
+        await sync_to_async(self.create_appointment_request)()
+        frame = (await frame).decode('utf-8')
+        self.assertIn('event: appointment_request', frame)
+        self.assertIn('تعویض روغن', frame)
+        await stream.aclose()
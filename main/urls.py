@@ -1,6 +1,14 @@
+from django.conf import settings
 from django.urls import path
 from . import views
 
+# Health probes run on every worker many times a minute: serve them without
+# crossing between sync and async under either server
+if settings.SERVER_MODE == 'asgi':
+    health_views = [views.ahealth_check, views.ahealth_ready, views.ahealth_detail]
+else:
+    health_views = [views.health_check, views.health_ready, views.health_detail]
+
 urlpatterns = [
     # Main pages
     path('', views.home, name='home'),
@@ -12,9 +20,15 @@ urlpatterns = [
     
     # Admin pages
     path('admin-dashboard/', views.admin_dashboard, name='admin_dashboard'),
+    path('admin-dashboard/events/', views.dashboard_events, name='dashboard_events'),
+    
+    # Health checks: liveness, cached readiness and detailed JSON
+    path('health/', health_views[0], name='health_check'),
+    path('health/ready/', health_views[1], name='health_ready'),
+    path('health/detail/', health_views[2], name='health_detail'),
     
-    # Health check
-    path('health/', views.health_check, name='health_check'),
+    # Prometheus metrics
+    path('metrics', views.metrics_view, name='metrics'),
     
     
     # API endpoints
@@ -2,31 +2,123 @@ from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth import authenticate, login, logout
 from django.contrib import messages
-from django.http import JsonResponse, HttpResponse
-from django.core.mail import send_mail
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, HttpResponse, HttpResponseForbidden, Http404, StreamingHttpResponse
 from django.conf import settings
-from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from django.core.paginator import Paginator
-from django.db.models import Q
-from django.db import connection
-import json
+from django.db.models import Count, Q, Value
+import time
 
-from .models import Lecture, Service, ContactMessage, SiteSettings, Bonus, AppointmentRequest, Comment, ServiceCategory
+from asgiref.sync import sync_to_async
+
+from . import catalog, content_cache, events, facets, fast_json, health, metrics, recommendations
+from .decorators import async_csrf_exempt, async_require_http_methods
+from .mail import notify_admin
+from .models import Lecture, Service, ContactMessage, SiteSettings, Bonus, AppointmentRequest, Comment
 from datetime import datetime
 from django.core.cache import cache
 
 
 def health_check(request):
-    """Health check endpoint for Docker"""
-    try:
-        # Test database connection
-        with connection.cursor() as cursor:
-            cursor.execute("SELECT 1")
-        
+    """Liveness probe for Docker: answers from the process without touching any dependency"""
+    return HttpResponse("OK", status=200)
+
+
+def _ready_response(results):
+    if health.is_ready(results):
         return HttpResponse("OK", status=200)
-    except Exception as e:
-        return HttpResponse(f"Database error: {str(e)}", status=500)
+    failed = ', '.join(name for name, result in results.items() if not result['ok'])
+    return HttpResponse(f"Unavailable: {failed}", status=503)
+
+
+def _detail_response(results, age):
+    ready = health.is_ready(results)
+    return JsonResponse({
+        'status': 'ok' if ready else 'error',
+        'age_seconds': round(age, 2),
+        'checks': results,
+    }, status=200 if ready else 503)
+
+
+def health_ready(request):
+    """Readiness probe: database, cache and storage, cached for HEALTH_CACHE_SECONDS"""
+    return _ready_response(health.readiness()[0])
+
+
+def health_detail(request):
+    """Readiness results as JSON with per-dependency latency"""
+    return _detail_response(*health.readiness())
+
+
+# The same probes for SERVER_MODE=asgi, where a sync view would cost a thread hop
+async def ahealth_check(request):
+    return HttpResponse("OK", status=200)
+
+
+async def ahealth_ready(request):
+    results, _ = await sync_to_async(health.readiness)()
+    return _ready_response(results)
+
+
+async def ahealth_detail(request):
+    return _detail_response(*await sync_to_async(health.readiness)())
+
+
+@require_http_methods(["GET"])
+def metrics_view(request):
+    """Prometheus scrape endpoint"""
+    if not metrics.enabled():
+        raise Http404
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if token and request.headers.get('Authorization') != f'Bearer {token}':
+        return HttpResponse(status=403)
+    return HttpResponse(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+def _summary(excerpt):
+    """
+    ``(text, truncated)``: an excerpt that may have been cut at
+    Service.EXCERPT_LENGTH, shortened to its last whole word
+    """
+    excerpt = excerpt or ''
+    if len(excerpt) < Service.EXCERPT_LENGTH:
+        return excerpt, False
+    words = excerpt.rsplit(None, 1)
+    text = words[0] if len(words) > 1 else excerpt
+    return text.rstrip('،,.:; ') + '…', True
+
+
+def _home_service_cards():
+    rows = (
+        Service.objects.listing()
+        .filter(is_published=True)
+        .order_by('-created_at')
+        .values('name', 'slug', 'image', 'excerpt', 'instagram_link')[:3]
+    )
+    storage = Service._meta.get_field('image').storage
+    cards = []
+    for row in rows:
+        excerpt, truncated = _summary(row['excerpt'])
+        cards.append({
+            'name': row['name'],
+            'slug': row['slug'],
+            'image': storage.url(row['image']) if row['image'] else None,
+            'excerpt': excerpt,
+            'truncated': truncated,
+            'instagram_link': row['instagram_link'] or '',
+        })
+    return cards
+
+
+def home_services():
+    """
+    The newest services as plain dicts, cached per content version, and their
+    quick-view data by slug, embedded in the page so opening a modal needs no
+    request
+    """
+    cards = content_cache.get_or_build('home_services', ['main.Service'], _home_service_cards)
+    return cards, {card['slug']: card for card in cards}
 
 
 def home(request):
@@ -39,10 +131,10 @@ def home(request):
         site_settings = SiteSettings.objects.create()
     
     # Get recent lectures (last 3)
-    recent_lectures = Lecture.objects.filter(is_published=True).order_by('-created_at')[:3]
+    recent_lectures = Lecture.objects.listing().filter(is_published=True).order_by('-created_at')[:3]
     
-    # Get recent services (last 3)
-    services = Service.objects.filter(is_published=True).order_by('-created_at')[:3]
+    # Recent services (last 3) and the data their quick-view modals show
+    services, service_quickview = home_services()
     
     # Get singleton bonus if exists
     bonus = Bonus.objects.first()
@@ -63,6 +155,7 @@ def home(request):
         'site_settings': site_settings,
         'recent_lectures': recent_lectures,
         'services': services,
+        'service_quickview': service_quickview,
         'bonus': bonus,
         'iran_brands': iran_brands,
         'testimonials': testimonials,
@@ -80,7 +173,7 @@ def lectures_list(request):
         site_settings = SiteSettings.objects.create()
     
     # Get all published lectures with pagination
-    lectures = Lecture.objects.filter(is_published=True)
+    lectures = Lecture.objects.listing().filter(is_published=True)
     paginator = Paginator(lectures, 9)  # Show 9 lectures per page
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
@@ -104,8 +197,8 @@ def lecture_detail(request, slug):
     
     lecture = get_object_or_404(Lecture, slug=slug, is_published=True)
     
-    # Get related lectures (same category or recent)
-    related_lectures = Lecture.objects.filter(is_published=True).exclude(id=lecture.id)[:3]
+    # Precomputed by build_related; the most recent others until it has run
+    related_lectures = recommendations.related(lecture)
     
     # Get approved comments for this lecture
     comments = Comment.objects.filter(lecture=lecture, is_approved=True).order_by('-created_at')
@@ -130,8 +223,8 @@ def service_detail(request, slug):
     
     service = get_object_or_404(Service, slug=slug, is_published=True)
     
-    # Get related services
-    related_services = Service.objects.filter(is_published=True).exclude(id=service.id)[:3]
+    # Precomputed by build_related; the most recent others until it has run
+    related_services = recommendations.related(service)
     
     # Get approved comments for this service
     comments = Comment.objects.filter(service=service, is_approved=True).order_by('-created_at')
@@ -154,27 +247,34 @@ def services_list(request):
     except:
         site_settings = SiteSettings.objects.create()
 
-    services = Service.objects.filter(is_published=True).select_related('category')
-    categories = ServiceCategory.objects.filter(is_active=True)
-    
-    # Filter by category
-    category_slug = request.GET.get('category')
-    if category_slug:
-        services = services.filter(category__slug=category_slug)
-    
-    # Filter by featured
-    featured = request.GET.get('featured')
-    if featured == 'true':
-        services = services.filter(is_featured=True)
+    # Facet counts come from the content cache (or, with a search or price
+    # bounds, one uncached GROUP BY); their total for the current selection is
+    # the page count, so a page costs one query more
+    selected = facets.selected_filters(request.GET)
+    counts = facets.counts(selected)
+    options = facets.facet_options(counts, selected)
+    services = facets.filter_services(
+        Service.objects.listing().filter(is_published=True).select_related('category'), selected, counts,
+    ).order_by(*facets.sort_order(request.GET))
+    paginator = facets.CountedPaginator(services, 24, options['total'])
+    page_obj = paginator.get_page(request.GET.get('page'))
+
+    # Filters to carry over into the pagination links
+    filter_query = request.GET.copy()
+    filter_query.pop('page', None)
 
     context = {
         'site_settings': site_settings,
-        'services': services,
-        'categories': categories,
-        'current_category': category_slug,
-        'current_featured': featured,
+        'services': page_obj,
+        'page_obj': page_obj,
+        'facets': options,
+        'selected': selected,
+        'sort': request.GET.get('sort') if request.GET.get('sort') in facets.SORTS else 'new',
+        'filter_query': filter_query.urlencode(),
     }
     return render(request, 'pages/services.html', context)
+
+
 def appointment(request):
     """Appointment request page"""
     try:
@@ -184,8 +284,8 @@ def appointment(request):
     except:
         site_settings = SiteSettings.objects.create()
     
-    # Get all services for selection
-    services = Service.objects.filter(is_published=True)
+    # Services to choose from, from the cached catalog the booking API also validates against
+    services = list(catalog.bookable_services().values())
     
     # Get today's date for date input min value
     from django.utils import timezone
@@ -199,10 +299,30 @@ def appointment(request):
     return render(request, 'pages/appointment.html', context)
 
 
+def _counter(queryset, name):
+    """``SELECT '<name>', COUNT(*)`` over ``queryset``, for a UNION ALL of counters"""
+    return queryset.order_by().annotate(counter=Value(name)).values('counter').annotate(total=Count('pk'))
+
+
+def dashboard_counters():
+    """Dashboard totals from one UNION ALL query, cached for DASHBOARD_COUNTERS_SECONDS"""
+    counters = cache.get(events.DASHBOARD_COUNTERS_KEY)
+    if counters is None:
+        query = _counter(Lecture.objects.all(), 'lectures').union(
+            _counter(Service.objects.all(), 'services'),
+            _counter(ContactMessage.objects.all(), 'contact_messages'),
+            _counter(AppointmentRequest.objects.filter(is_processed=False), 'new_appointments'),
+            _counter(Comment.objects.filter(is_approved=False), 'pending_comments'),
+            all=True,
+        )
+        counters = {row['counter']: row['total'] for row in query}
+        cache.set(events.DASHBOARD_COUNTERS_KEY, counters, settings.DASHBOARD_COUNTERS_SECONDS)
+    return counters
+
 
 @login_required
 def admin_dashboard(request):
-    """Admin dashboard view"""
+    """Admin dashboard: cached counters and bounded recent-activity slices"""
     try:
         site_settings = SiteSettings.objects.first()
         if not site_settings:
@@ -210,91 +330,150 @@ def admin_dashboard(request):
     except:
         site_settings = SiteSettings.objects.create()
     
-    lectures = Lecture.objects.all()
-    services = Service.objects.all()
-    contact_messages = ContactMessage.objects.all()[:10]  # Last 10 messages
-    appointments = AppointmentRequest.objects.all()[:10]
-    new_appointments_count = AppointmentRequest.objects.filter(is_processed=False).count()
+    # Only the columns the template shows; large text fields stay in MySQL
+    lectures = Lecture.objects.only('id', 'title', 'created_at', 'is_published').order_by('-created_at')[:5]
+    services = Service.objects.only('id', 'name', 'created_at', 'is_published').order_by('-created_at')[:5]
+    contact_messages = ContactMessage.objects.only(
+        'id', 'name', 'email', 'message', 'created_at', 'is_read',
+    ).order_by('-created_at')[:10]
+    appointments = AppointmentRequest.objects.only(
+        'id', 'name', 'phone', 'service', 'car_model', 'preferred_date', 'created_at', 'is_processed',
+    ).order_by('-created_at')[:10]
+    counters = dashboard_counters()
     
     context = {
         'site_settings': site_settings,
-        'lectures': lectures,
-        'services': services,
+        # Not 'services': structured_data.html would render it into the
+        # public offer catalog and load every description
+        'recent_lectures': lectures,
+        'recent_services': services,
         'contact_messages': contact_messages,
         'appointments': appointments,
-        'new_appointments_count': new_appointments_count,
+        'counters': counters,
+        'new_appointments_count': counters.get('new_appointments', 0),
     }
     return render(request, 'pages/admin_dashboard.html', context)
 
 
-@csrf_exempt
-@require_http_methods(["POST"])
-def contact_form(request):
+def _is_staff(request):
+    return request.user.is_authenticated and request.user.is_staff
+
+
+def _event_stream(subscription):
+    """SSE frames for a WSGI worker; holds the worker thread until the stream ends"""
+    keepalive = settings.DASHBOARD_EVENTS_KEEPALIVE
+    deadline = time.monotonic() + settings.DASHBOARD_EVENTS_MAX_AGE
+    try:
+        yield f'retry: {settings.DASHBOARD_EVENTS_RETRY_MS}\n\n'
+        while (remaining := deadline - time.monotonic()) > 0:
+            event = subscription.get(min(keepalive, remaining))
+            yield events.sse_message(event) if event else ': keepalive\n\n'
+    finally:
+        subscription.close()
+
+
+async def _aevent_stream(subscription):
+    """SSE frames for an ASGI worker; waits on the event loop"""
+    keepalive = settings.DASHBOARD_EVENTS_KEEPALIVE
+    deadline = time.monotonic() + settings.DASHBOARD_EVENTS_MAX_AGE
+    try:
+        yield f'retry: {settings.DASHBOARD_EVENTS_RETRY_MS}\n\n'
+        while (remaining := deadline - time.monotonic()) > 0:
+            event = await subscription.get(min(keepalive, remaining))
+            yield events.sse_message(event) if event else ': keepalive\n\n'
+    finally:
+        await subscription.close()
+
+
+async def dashboard_events(request):
+    """
+    Server-sent events for the staff dashboard. The stream ends after
+    DASHBOARD_EVENTS_MAX_AGE seconds and the browser reconnects on its own.
+    """
+    if not await sync_to_async(_is_staff)(request):
+        return HttpResponseForbidden()
+    broker = events.get_broker()
+    if isinstance(request, ASGIRequest):
+        stream = _aevent_stream(await broker.asubscribe())
+    else:
+        stream = _event_stream(await sync_to_async(broker.subscribe)())
+    response = StreamingHttpResponse(stream, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Tell nginx to pass events through instead of buffering them
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@async_csrf_exempt
+@async_require_http_methods(["POST"])
+async def contact_form(request):
     """Handle contact form submission"""
     try:
-        data = json.loads(request.body)
+        data = fast_json.loads(request.body)
         # Honeypot
         if data.get('company'):
+            await metrics.arecord_form_submission('contact', 'spam')
             return JsonResponse({'success': True, 'message': 'پیام شما با موفقیت ارسال شد'})
 
         # Rate limit (5 per 10 minutes per IP)
         ip = request.META.get('REMOTE_ADDR', 'unknown')
         key = f"rl:contact:{ip}"
-        count = cache.get(key, 0)
+        count = await cache.aget(key, 0)
         if count >= 5:
+            await metrics.arecord_form_submission('contact', 'rate_limited')
             return JsonResponse({'success': False, 'message': 'تعداد درخواست‌ها زیاد است.稍后 دوباره تلاش کنید'})
-        cache.set(key, count + 1, 600)
+        await cache.aset(key, count + 1, 600)
         name = data.get('name', '').strip()
         email = data.get('email', '').strip()
         message = data.get('message', '').strip()
         
         # Validation
         if not name or not email or not message:
+            await metrics.arecord_form_submission('contact', 'invalid')
             return JsonResponse({'success': False, 'message': 'لطفاً تمام فیلدها را پر کنید'})
         
         # Create contact message
-        contact_message = ContactMessage.objects.create(
+        contact_message = await ContactMessage.objects.acreate(
             name=name,
             email=email,
             message=message
         )
         
-        # Send email notification to admin
-        try:
-            send_mail(
-                f'پیام جدید از {name}',
-                f'نام: {name}\nایمیل: {email}\nپیام:\n{message}',
-                settings.EMAIL_HOST_USER,
-                [settings.EMAIL_HOST_USER],
-                fail_silently=False,
-            )
-        except Exception as e:
-            # Log error but don't fail the request
-            print(f"Email sending failed: {e}")
+        # Notify admin without waiting for SMTP
+        await notify_admin(
+            f'پیام جدید از {name}',
+            f'نام: {name}\nایمیل: {email}\nپیام:\n{message}',
+            settings.EMAIL_HOST_USER,
+            [settings.EMAIL_HOST_USER],
+        )
         
+        await metrics.arecord_form_submission('contact', 'accepted')
         return JsonResponse({'success': True, 'message': 'پیام شما با موفقیت ارسال شد'})
         
     except Exception as e:
+        await metrics.arecord_form_submission('contact', 'error')
         return JsonResponse({'success': False, 'message': 'خطا در ارسال پیام'})
 
 
-@csrf_exempt
-@require_http_methods(["POST"])
-def appointment_form(request):
+@async_csrf_exempt
+@async_require_http_methods(["POST"])
+async def appointment_form(request):
     """Handle appointment submission from home quick form"""
     try:
-        data = json.loads(request.body)
+        data = fast_json.loads(request.body)
         # Honeypot
         if data.get('company'):
+            await metrics.arecord_form_submission('appointment_request', 'spam')
             return JsonResponse({'success': True, 'message': 'درخواست شما ثبت شد'})
 
         # Rate limit (5 per 10 minutes per IP)
         ip = request.META.get('REMOTE_ADDR', 'unknown')
         key = f"rl:appt:{ip}"
-        count = cache.get(key, 0)
+        count = await cache.aget(key, 0)
         if count >= 5:
+            await metrics.arecord_form_submission('appointment_request', 'rate_limited')
             return JsonResponse({'success': False, 'message': 'تعداد درخواست‌ها زیاد است.稍后 دوباره تلاش کنید'})
-        cache.set(key, count + 1, 600)
+        await cache.aset(key, count + 1, 600)
         name = data.get('name', '').strip()
         phone = data.get('phone', '').strip()
         email = (data.get('email') or '').strip()
@@ -304,6 +483,7 @@ def appointment_form(request):
         message = (data.get('message') or '').strip()
 
         if not name or not phone:
+            await metrics.arecord_form_submission('appointment_request', 'invalid')
             return JsonResponse({'success': False, 'message': 'نام و تلفن الزامی است'})
 
         # parse date if present
@@ -314,7 +494,7 @@ def appointment_form(request):
             except Exception:
                 parsed_date = None
 
-        appt = AppointmentRequest.objects.create(
+        appt = await AppointmentRequest.objects.acreate(
             name=name,
             phone=phone,
             email=email or None,
@@ -324,41 +504,41 @@ def appointment_form(request):
             message=message,
         )
 
-        # notify admin by email (best-effort)
-        try:
-            send_mail(
-                f'درخواست رزرو جدید از {name}',
-                f'نام: {name}\nتلفن: {phone}\nایمیل: {email or "-"}\nتاریخ: {preferred_date or "-"}\nخودرو: {car_model or "-"}\nسرویس: {service or "-"}\n\nپیام:\n{message or "-"}',
-                settings.EMAIL_HOST_USER,
-                [settings.EMAIL_HOST_USER],
-                fail_silently=True,
-            )
-        except Exception:
-            pass
+        # notify admin by email (best-effort, off the request path)
+        await notify_admin(
+            f'درخواست رزرو جدید از {name}',
+            f'نام: {name}\nتلفن: {phone}\nایمیل: {email or "-"}\nتاریخ: {preferred_date or "-"}\nخودرو: {car_model or "-"}\nسرویس: {service or "-"}\n\nپیام:\n{message or "-"}',
+            settings.EMAIL_HOST_USER,
+            [settings.EMAIL_HOST_USER],
+        )
 
+        await metrics.arecord_form_submission('appointment_request', 'accepted')
         return JsonResponse({'success': True, 'message': 'درخواست شما ثبت شد'})
     except Exception:
+        await metrics.arecord_form_submission('appointment_request', 'error')
         return JsonResponse({'success': False, 'message': 'خطا در ثبت درخواست'})
 
 
-@csrf_exempt
-def comment_form(request):
+@async_csrf_exempt
+async def comment_form(request):
     """Handle comment form submission"""
     if request.method != 'POST':
         return JsonResponse({'success': False, 'message': 'درخواست نامعتبر'})
     
     # Honeypot check
     if request.POST.get('company'):
+        await metrics.arecord_form_submission('comment', 'spam')
         return JsonResponse({'success': False, 'message': 'درخواست نامعتبر'})
     
     # Rate limiting
     client_ip = request.META.get('REMOTE_ADDR')
     cache_key = f'comment_rate_limit_{client_ip}'
-    if cache.get(cache_key):
+    if await cache.aget(cache_key):
+        await metrics.arecord_form_submission('comment', 'rate_limited')
         return JsonResponse({'success': False, 'message': 'لطفاً کمی صبر کنید و دوباره تلاش کنید'})
     
     # Set rate limit (5 minutes)
-    cache.set(cache_key, True, 300)
+    await cache.aset(cache_key, True, 300)
     
     try:
         name = request.POST.get('name', '').strip()
@@ -371,13 +551,15 @@ def comment_form(request):
         parent_id = request.POST.get('parent_id')
         
         if not all([name, email, comment_text]):
+            await metrics.arecord_form_submission('comment', 'invalid')
             return JsonResponse({'success': False, 'message': 'لطفاً تمام فیلدهای ضروری را پر کنید'})
         
         if rating < 1 or rating > 5:
+            await metrics.arecord_form_submission('comment', 'invalid')
             return JsonResponse({'success': False, 'message': 'امتیاز نامعتبر'})
         
         # Create comment
-        comment = Comment.objects.create(
+        comment = await Comment.objects.acreate(
             name=name,
             email=email,
             phone=phone,
@@ -388,21 +570,19 @@ def comment_form(request):
             parent_id=parent_id if parent_id else None,
         )
         
-        # Send email notification to admin
-        try:
-            send_mail(
-                'نظر جدید ثبت شد',
-                f'نظر جدید از {name} ({email}) با امتیاز {rating} ستاره:\n\n{comment_text}',
-                settings.DEFAULT_FROM_EMAIL,
-                [settings.DEFAULT_FROM_EMAIL],
-                fail_silently=True,
-            )
-        except:
-            pass
+        # Notify admin without waiting for SMTP
+        await notify_admin(
+            'نظر جدید ثبت شد',
+            f'نظر جدید از {name} ({email}) با امتیاز {rating} ستاره:\n\n{comment_text}',
+            settings.DEFAULT_FROM_EMAIL,
+            [settings.DEFAULT_FROM_EMAIL],
+        )
         
+        await metrics.arecord_form_submission('comment', 'accepted')
         return JsonResponse({'success': True, 'message': 'نظر شما با موفقیت ثبت شد و پس از تایید نمایش داده خواهد شد'})
         
     except Exception as e:
+        await metrics.arecord_form_submission('comment', 'error')
         return JsonResponse({'success': False, 'message': 'خطا در ثبت نظر. لطفاً دوباره تلاش کنید'})
 
 
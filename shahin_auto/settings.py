@@ -61,6 +61,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'main.middleware.PerformanceMiddleware',
+    'main.middleware.ReplicaRoutingMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -75,7 +77,7 @@ ROOT_URLCONF = 'shahin_auto.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'main.instrumentation.InstrumentedDjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -91,13 +93,20 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'shahin_auto.wsgi.application'
 
+# wsgi or asgi, as started by the container; selects sync or async health views
+SERVER_MODE = os.getenv('SERVER_MODE', 'wsgi')
+
 
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
+# DB_POOL switches to the pooled PyMySQL backend, which takes over connection
+# reuse from CONN_MAX_AGE
+DB_POOL = os.getenv('DB_POOL', 'False').lower() == 'true'
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.mysql',
+        'ENGINE': 'main.db_backends.mysql_pool' if DB_POOL else 'django.db.backends.mysql',
         'NAME': 'shahin_db',
         'USER': 'root',
         'PASSWORD': '232330scmj',
@@ -108,9 +117,32 @@ DATABASES = {
             'charset': 'utf8mb4',
             'use_unicode': True,
         },
+        # Keep connections open between requests and check them before reuse
+        'CONN_MAX_AGE': 0 if DB_POOL else int(os.getenv('DB_CONN_MAX_AGE', '60')),
+        'CONN_HEALTH_CHECKS': True,
+        'POOL_SIZE': int(os.getenv('DB_POOL_SIZE', '5')),
+        'POOL_RECYCLE': int(os.getenv('DB_POOL_RECYCLE', '1800')),
+        'POOL_TIMEOUT': int(os.getenv('DB_POOL_TIMEOUT', '10')),
     }
 }
 
+# Optional read replica for public GET traffic, see main.db_routers
+DB_REPLICA_HOST = os.getenv('DB_REPLICA_HOST', '')
+if DB_REPLICA_HOST:
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'HOST': DB_REPLICA_HOST,
+        'PORT': os.getenv('DB_REPLICA_PORT') or DATABASES['default']['PORT'],
+        'USER': os.getenv('DB_REPLICA_USER') or DATABASES['default']['USER'],
+        'PASSWORD': os.getenv('DB_REPLICA_PASSWORD') or DATABASES['default']['PASSWORD'],
+        'TEST': {'MIRROR': 'default'},
+    }
+READ_REPLICA = 'replica' if DB_REPLICA_HOST else None
+DATABASE_ROUTERS = ['main.db_routers.ReplicaRouter']
+# Reads stay on the primary this long after a client writes
+REPLICA_STICKY_SECONDS = int(os.getenv('REPLICA_STICKY_SECONDS', '5'))
+REPLICA_PRIMARY_PATHS = ['/admin/', '/admin-dashboard/', '/health/']
+
 # Using PyMySQL for MySQL database connection (pure Python, no compilation required)
 
 
@@ -206,7 +238,8 @@ if USE_S3:
             'BACKEND': 'main.storage_backends.MediaStorage',
         },
         'staticfiles': {
-            'BACKEND': 'main.storage_backends.StaticStorage',
+            # Hashed names uploaded as immutable, with .br/.gz siblings
+            'BACKEND': 'main.storage_backends.ManifestStaticStorage',
         },
     }
 
@@ -243,12 +276,23 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # Django Rest Framework settings
 REST_FRAMEWORK = {
+    # Skips the session for cookieless visitors, so public GETs don't vary on Cookie
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.SessionAuthentication',
+        'main.authentication.SessionCookieAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
     ],
+    # orjson when installed, with the stdlib json module as fallback
+    'DEFAULT_RENDERER_CLASSES': [
+        'main.fast_json.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'main.fast_json.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 10
 }
@@ -262,7 +306,9 @@ CORS_ALLOWED_ORIGINS = [
 CORS_ALLOW_CREDENTIALS = True
 
 # Email settings (for contact form)
-EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+# Mail is counted for /metrics, then delivered by EMAIL_DELIVERY_BACKEND
+EMAIL_BACKEND = 'main.email_backends.MetricsEmailBackend'
+EMAIL_DELIVERY_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
 EMAIL_HOST = 'smtp.gmail.com'
 EMAIL_PORT = 587
 EMAIL_USE_TLS = True
@@ -286,7 +332,46 @@ LOGOUT_REDIRECT_URL = '/'
 # Cache settings
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': 'main.instrumentation.InstrumentedLocMemCache',
         'LOCATION': 'unique-snowflake',
     }
-}
\ No newline at end of file
+}
+
+# Per-request DB/cache/template timings (Server-Timing header + main.performance log)
+PERFORMANCE_INSTRUMENTATION = os.getenv('PERFORMANCE_INSTRUMENTATION', 'False').lower() == 'true'
+
+# Prometheus metrics served at /metrics
+# METRICS_BACKEND: 'memory' (single process), 'redis' or 'directory' (shared by all workers)
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'False').lower() == 'true'
+METRICS_BACKEND = os.getenv('METRICS_BACKEND', 'memory')
+METRICS_REDIS_URL = os.getenv('METRICS_REDIS_URL', 'redis://localhost:6379/2')
+METRICS_DIRECTORY = os.getenv('METRICS_DIRECTORY', str(BASE_DIR / 'metrics'))
+# Optional bearer token required by /metrics
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+
+# Live staff dashboard events (server-sent events at /admin-dashboard/events/)
+# DASHBOARD_EVENTS_BACKEND: 'memory' (single process) or 'redis' (pub/sub, all workers)
+DASHBOARD_EVENTS_BACKEND = os.getenv('DASHBOARD_EVENTS_BACKEND', 'memory')
+DASHBOARD_EVENTS_REDIS_URL = os.getenv('DASHBOARD_EVENTS_REDIS_URL', 'redis://localhost:6379/0')
+DASHBOARD_EVENTS_CHANNEL = os.getenv('DASHBOARD_EVENTS_CHANNEL', 'shahin:dashboard')
+# Seconds between keepalive comments, and before the stream is closed so the browser reconnects
+DASHBOARD_EVENTS_KEEPALIVE = int(os.getenv('DASHBOARD_EVENTS_KEEPALIVE', '15'))
+DASHBOARD_EVENTS_MAX_AGE = int(os.getenv('DASHBOARD_EVENTS_MAX_AGE', '300'))
+DASHBOARD_EVENTS_RETRY_MS = int(os.getenv('DASHBOARD_EVENTS_RETRY_MS', '3000'))
+# Seconds the admin dashboard counters are cached; a new contact message,
+# appointment request, booking or comment invalidates them straight away
+DASHBOARD_COUNTERS_SECONDS = int(os.getenv('DASHBOARD_COUNTERS_SECONDS', '30'))
+
+# Upper bound on how long main.content_cache keeps an entry; saving a lecture,
+# service or category invalidates the affected entries straight away
+CONTENT_CACHE_SECONDS = int(os.getenv('CONTENT_CACHE_SECONDS', '3600'))
+
+# Slow-query / N+1 detection on a sample of requests (main.queries log, see perf_report)
+QUERY_INSPECTION_SAMPLE_RATE = float(os.getenv('QUERY_INSPECTION_SAMPLE_RATE', '0'))
+SLOW_QUERY_THRESHOLD_MS = float(os.getenv('SLOW_QUERY_THRESHOLD_MS', '100'))
+N_PLUS_ONE_THRESHOLD = int(os.getenv('N_PLUS_ONE_THRESHOLD', '5'))
+
+# Dependencies checked by /health/ready/ and /health/detail/, and how long
+# each worker reuses the result
+HEALTH_CHECKS = ['database', 'cache', 'storage']
+HEALTH_CACHE_SECONDS = float(os.getenv('HEALTH_CACHE_SECONDS', '5'))
@@ -31,9 +31,11 @@ CSRF_TRUSTED_ORIGINS = [
 ]
 
 # Database configuration for production
+DB_POOL = os.environ.get('DB_POOL', 'False').lower() == 'true'
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.mysql',
+        'ENGINE': 'main.db_backends.mysql_pool' if DB_POOL else 'django.db.backends.mysql',
         'NAME': os.environ.get('DB_NAME', 'shahin_db'),
         'USER': os.environ.get('DB_USER', 'root'),
         'PASSWORD': os.environ.get('DB_PASSWORD', '232330scmj'),
@@ -42,9 +44,28 @@ DATABASES = {
         'OPTIONS': {
             'init_command': "SET sql_mode='STRICT_TRANS_TABLES'",
         },
+        # Persistent connections, pinged before reuse after a request ends;
+        # MySQL's wait_timeout (8h by default) must stay above CONN_MAX_AGE
+        'CONN_MAX_AGE': 0 if DB_POOL else int(os.environ.get('DB_CONN_MAX_AGE', '60')),
+        'CONN_HEALTH_CHECKS': True,
+        'POOL_SIZE': int(os.environ.get('DB_POOL_SIZE', '5')),
+        'POOL_RECYCLE': int(os.environ.get('DB_POOL_RECYCLE', '1800')),
+        'POOL_TIMEOUT': int(os.environ.get('DB_POOL_TIMEOUT', '10')),
     }
 }
 
+# Optional read replica (a MySQL replica of db) for public GET traffic
+DB_REPLICA_HOST = os.environ.get('DB_REPLICA_HOST', '')
+if DB_REPLICA_HOST:
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'HOST': DB_REPLICA_HOST,
+        'PORT': os.environ.get('DB_REPLICA_PORT') or DATABASES['default']['PORT'],
+        'USER': os.environ.get('DB_REPLICA_USER') or DATABASES['default']['USER'],
+        'PASSWORD': os.environ.get('DB_REPLICA_PASSWORD') or DATABASES['default']['PASSWORD'],
+    }
+READ_REPLICA = 'replica' if DB_REPLICA_HOST else None
+
 # Using PyMySQL for MySQL database connection (pure Python, no compilation required)
 
 # Sites framework
@@ -98,7 +119,8 @@ if USE_S3:
             'BACKEND': 'main.storage_backends.MediaStorage',
         },
         'staticfiles': {
-            'BACKEND': 'main.storage_backends.StaticStorage',
+            # Hashed names uploaded as immutable, with .br/.gz siblings
+            'BACKEND': 'main.storage_backends.ManifestStaticStorage',
         },
     }
 
@@ -137,7 +159,9 @@ else:
             },
         },
         'staticfiles': {
-            'BACKEND': 'whitenoise.storage.CompressedStaticFilesStorage',
+            # Hashed names plus .br/.gz files; WhiteNoise serves hashed files
+            # with an immutable Cache-Control and picks the encoding per request
+            'BACKEND': 'main.storage_backends.CompressedManifestStaticStorage',
         },
     }
 
@@ -159,7 +183,8 @@ CSRF_COOKIE_SECURE = True
 SECURE_SSL_REDIRECT = False
 
 # Email settings
-EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+EMAIL_BACKEND = 'main.email_backends.MetricsEmailBackend'
+EMAIL_DELIVERY_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
 EMAIL_HOST = os.environ.get('EMAIL_HOST', 'smtp.gmail.com')
 EMAIL_PORT = int(os.environ.get('EMAIL_PORT', '587'))
 EMAIL_USE_TLS = os.environ.get('EMAIL_USE_TLS', 'True').lower() == 'true'
@@ -169,11 +194,45 @@ EMAIL_HOST_PASSWORD = os.environ.get('EMAIL_HOST_PASSWORD', 'your-app-password')
 # Cache configuration
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'BACKEND': 'main.instrumentation.InstrumentedRedisCache',
         'LOCATION': f"redis://{os.environ.get('REDIS_HOST', 'redis')}:{os.environ.get('REDIS_PORT', '6379')}/1",
-    }
+    },
+    # Separate database so clearing the page cache never logs anyone out
+    'sessions': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': f"redis://{os.environ.get('REDIS_HOST', 'redis')}:{os.environ.get('REDIS_PORT', '6379')}/3",
+    },
 }
 
+# Sessions live in Redis only; 'django.contrib.sessions.backends.cached_db'
+# keeps a MySQL copy that survives a Redis flush at the cost of a write per change
+SESSION_ENGINE = os.environ.get('SESSION_ENGINE', 'django.contrib.sessions.backends.cache')
+SESSION_CACHE_ALIAS = 'sessions'
+
+# Per-request DB/cache/template timings. Off by default: the Server-Timing
+# header tells every client how much database and cache work a URL costs
+PERFORMANCE_INSTRUMENTATION = os.environ.get('PERFORMANCE_INSTRUMENTATION', 'False').lower() == 'true'
+
+# Prometheus metrics, aggregated across gunicorn workers in Redis
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'True').lower() == 'true'
+METRICS_BACKEND = os.environ.get('METRICS_BACKEND', 'redis')
+METRICS_REDIS_URL = os.environ.get(
+    'METRICS_REDIS_URL',
+    f"redis://{os.environ.get('REDIS_HOST', 'redis')}:{os.environ.get('REDIS_PORT', '6379')}/2",
+)
+METRICS_DIRECTORY = os.environ.get('METRICS_DIRECTORY', '/app/metrics')
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
+# Dashboard events over Redis pub/sub, so every worker sees every event
+DASHBOARD_EVENTS_BACKEND = os.environ.get('DASHBOARD_EVENTS_BACKEND', 'redis')
+DASHBOARD_EVENTS_REDIS_URL = os.environ.get(
+    'DASHBOARD_EVENTS_REDIS_URL',
+    f"redis://{os.environ.get('REDIS_HOST', 'redis')}:{os.environ.get('REDIS_PORT', '6379')}/0",
+)
+
+# Inspect 1% of requests for slow queries and N+1 patterns
+QUERY_INSPECTION_SAMPLE_RATE = float(os.environ.get('QUERY_INSPECTION_SAMPLE_RATE', '0.01'))
+
 # Logging configuration
 LOGGING = {
     'version': 1,
@@ -191,6 +250,12 @@ LOGGING = {
             'filename': '/app/logs/django.log',
             'formatter': 'verbose',
         },
+        'queries_file': {
+            'level': 'INFO',
+            'class': 'logging.FileHandler',
+            'filename': '/app/logs/queries.log',
+            'formatter': 'verbose',
+        },
         'console': {
             'level': 'INFO',
             'class': 'logging.StreamHandler',
@@ -207,6 +272,16 @@ LOGGING = {
             'level': 'INFO',
             'propagate': False,
         },
+        'main.performance': {
+            'handlers': ['console', 'file'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+        'main.queries': {
+            'handlers': ['console', 'queries_file'],
+            'level': 'INFO',
+            'propagate': False,
+        },
     },
 }
 
@@ -216,6 +291,10 @@ CORS_ALLOWED_ORIGINS = [
     "https://www.shahinautoservice.ir",
 ]
 
-# Add WhiteNoise for static files (only if not using S3)
+# Add WhiteNoise for static files (only if not using S3), right after
+# SecurityMiddleware as WhiteNoise requires
 if not USE_S3:
-    MIDDLEWARE.insert(1, 'whitenoise.middleware.WhiteNoiseMiddleware')
+    MIDDLEWARE.insert(
+        MIDDLEWARE.index('django.middleware.security.SecurityMiddleware') + 1,
+        'whitenoise.middleware.WhiteNoiseMiddleware',
+    )
@@ -31,10 +31,6 @@ sitemaps = {
     'main': MainSitemap,
 }
 
-def health_view(_request):
-    return HttpResponse("ok", content_type="text/plain")
-
-
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('', include('main.urls')),
@@ -42,7 +38,6 @@ urlpatterns = [
     path('sitemap.xml', index, {'sitemaps': sitemaps}, name='django.contrib.sitemaps.views.index'),
     path('sitemap-<section>.xml', sitemap, {'sitemaps': sitemaps}, name='django.contrib.sitemaps.views.sitemap'),
     path('robots.txt', lambda r: HttpResponse('User-agent: *\nDisallow: /admin/\nDisallow: /api/\nAllow: /\nSitemap: https://shahinautoservice.ir/sitemap.xml', content_type='text/plain')),
-    path('health/', health_view, name='health'),
 ]
 
 # Serve media files in development
@@ -439,32 +439,44 @@ function openServiceModal(serviceSlug) {
     
     if (!modal || !title || !content) return;
     
-    // Show loading
-    content.innerHTML = '<div class="text-center py-8"><div class="loading-spinner mx-auto"></div></div>';
+    const render = (data, text) => {
+        title.textContent = data.name;
+        content.innerHTML = `
+            <div class="space-y-4">
+                ${data.image ? `<img src="${data.image}" alt="${data.name}" class="w-full h-48 object-cover rounded-lg">` : ''}
+                <p class="text-gray-600">${text}</p>
+                ${data.truncated ? `<a href="/service/${data.slug}/" class="inline-block text-primary-blue hover:text-blue-700">ادامه توضیحات</a>` : ''}
+                <div class="flex gap-2">
+                    ${data.instagram_link ? `<a href="${data.instagram_link}" target="_blank" class="flex-1 bg-gradient-to-r from-purple-500 to-pink-500 text-white text-center py-2 px-4 rounded-lg hover:from-purple-600 hover:to-pink-600 transition-all duration-300">مشاهده در اینستاگرام</a>` : ''}
+                    <a href="/service/${data.slug}/" class="flex-1 bg-primary-blue text-white text-center py-2 px-4 rounded-lg hover:bg-blue-700 transition-all duration-300">مشاهده آموزش</a>
+                </div>
+            </div>
+        `;
+    };
+
     modal.classList.remove('hidden');
     document.body.style.overflow = 'hidden';
+
+    // Pages embed quick-view data for the services they show (json_script)
+    const embedded = document.getElementById('service-quickview');
+    const preloaded = embedded ? JSON.parse(embedded.textContent)[serviceSlug] : null;
+    if (preloaded) {
+        render(preloaded, preloaded.excerpt);
+        return;
+    }
+
+    // Show loading
+    content.innerHTML = '<div class="text-center py-8"><div class="loading-spinner mx-auto"></div></div>';
     
     // Fetch service data
-    fetch(`/api/services/${serviceSlug}/`)
+    fetch(`/api/services/${serviceSlug}/?fields=name,slug,image,description,instagram_link`)
         .then(response => {
             if (!response.ok) {
                 throw new Error('Network response was not ok');
             }
             return response.json();
         })
-        .then(data => {
-            title.textContent = data.name;
-            content.innerHTML = `
-                <div class="space-y-4">
-                    <img src="${data.image}" alt="${data.name}" class="w-full h-48 object-cover rounded-lg">
-                    <p class="text-gray-600">${data.description}</p>
-                    <div class="flex gap-2">
-                        ${data.instagram_link ? `<a href="${data.instagram_link}" target="_blank" class="flex-1 bg-gradient-to-r from-purple-500 to-pink-500 text-white text-center py-2 px-4 rounded-lg hover:from-purple-600 hover:to-pink-600 transition-all duration-300">مشاهده در اینستاگرام</a>` : ''}
-                        <a href="/service/${data.slug}/" class="flex-1 bg-primary-blue text-white text-center py-2 px-4 rounded-lg hover:bg-blue-700 transition-all duration-300">مشاهده آموزش</a>
-                    </div>
-                </div>
-            `;
-        })
+        .then(data => render(data, data.description))
         .catch(error => {
             console.error('Error loading service:', error);
             content.innerHTML = '<p class="text-red-500 text-center">خطا در بارگذاری اطلاعات</p>';